@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -77,6 +78,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Background audit workers share this database with the web process
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
     }
 }
 
@@ -112,6 +118,94 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Outbound HTTP transport for audits: 'http1' (requests) or 'http2' (httpx,
+# negotiates HTTP/2 where the server supports it and falls back to HTTP/1.1)
+SEO_AUDIT_TRANSPORT = 'http1'
+
+# HTML engine for audits: 'tree' builds a BeautifulSoup tree; 'stream'
+# collects the facts the checks need in one HTMLParser pass while the page
+# downloads (see manage.py bench_engines).
+SEO_AUDIT_ENGINE = 'tree'
+
+# Allow auditing localhost/private addresses. Only for offline load tests
+# against the synthetic site (manage.py loadtest sets this for its server).
+SEO_AUDIT_ALLOW_PRIVATE_TARGETS = os.environ.get('SEO_AUDIT_ALLOW_PRIVATE_TARGETS') == '1'
+
+# Directory of the memory-mapped columnar store that every audit's page_info
+# is appended to (served by api/page-metrics). None disables it.
+SEO_AUDIT_METRICS_DIR = BASE_DIR / 'page_metrics'
+
+# Directory of the per-host internal link graphs (edge logs) that audits add
+# to; PageRank, click depth and orphan status are attached to each audit and
+# served site-wide by api/link-graph. None disables it.
+SEO_AUDIT_LINK_GRAPH_DIR = BASE_DIR / 'link_graph'
+
+# Per-host circuit breaker for outbound requests (see
+# seo_audit.services.circuit_breaker). State is per process and exposed by
+# api/metrics.
+SEO_AUDIT_CIRCUIT_BREAKER = {
+    'failure_threshold': 5,
+    'cooldown': 30,
+    'max_cooldown': 300,
+    'negative_ttl': 10,
+}
+
+# Admission control for audits run by the web process, and the order in
+# which audit_worker leases queued jobs (see seo_audit.services.scheduler).
+# Requests are 'interactive' (api/audit default), 'scheduled' (api/audit/jobs
+# default) or 'bulk'; tenants are the authenticated user or the client
+# address (see SEO_AUDIT_TRUST_CLIENT_HEADERS). None disables admission
+# control (queued jobs still lease by priority). `aging` stays well below
+# `queue_timeout`, so a waiting bulk request is promoted twice before it
+# would be rejected.
+SEO_AUDIT_SCHEDULER = {
+    'capacity': 8,                 # audits running at once in this process
+    'class_limits': {'bulk': 6},   # keep slots free for interactive requests
+    'tenant_limit': 4,             # concurrent audits per tenant
+    'tenant_limits': {},           # per-tenant overrides of tenant_limit
+    'tenant_weights': {},          # fair-share weights (default 1)
+    'aging': 10,                   # seconds of waiting that promote a request one class
+    'queue_timeout': 30,           # seconds to wait for a slot before a 503
+}
+
+# Whether the audit API trusts the client: the X-Tenant header then names the
+# tenant, and requests may ask for a priority class above the endpoint's
+# default. Enable only behind a proxy that sets or strips X-Tenant itself;
+# otherwise any client could pick its own tenant and jump the queue.
+# manage.py loadtest sets it for its own server, so that each simulated user
+# is a tenant of its own rather than all of them sharing 127.0.0.1's quota.
+SEO_AUDIT_TRUST_CLIENT_HEADERS = os.environ.get('SEO_AUDIT_TRUST_CLIENT_HEADERS') == '1'
+
+# Directory of the append-only response archive (see
+# seo_audit.services.archive). When set, every page, robots.txt and link probe
+# the auditor fetches is recorded there, and manage.py replay_archive can
+# re-run checks over the recorded pages without network access, e.g.
+# BASE_DIR / 'archive'. None disables recording.
+SEO_AUDIT_ARCHIVE_DIR = None
+
+# Worker processes that the audit views hand parsing and the on-page checks
+# to, so concurrent audits aren't serialized on the GIL (see
+# seo_audit.services.process_pool). None keeps everything in the web process.
+SEO_AUDIT_PROCESS_POOL = {
+    'processes': None,  # one per CPU
+    'max_tasks_per_child': 200,
+    'max_pending': None,  # two per process
+    'task_timeout': 30,
+    'queue_timeout': 5,
+}
+
+# Continuous re-auditing of Website records by manage.py monitor_websites
+# (see seo_audit.services.monitor). Each site runs every Website.interval
+# seconds at a fixed, hash-derived offset within it plus up to `jitter`
+# seconds; a site whose page content is unchanged is not re-checked.
+SEO_AUDIT_MONITOR = {
+    'concurrency': 8,       # audits running at once across all sites
+    'host_delay': 5,        # minimum seconds between audit starts on one host
+    'jitter': 60,           # random delay added to each start (at most 10% of the interval)
+    'queue_timeout': 3600,  # seconds a due audit may wait for a slot before it counts as failed
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -0,0 +1,221 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from ..services.latency import percentile
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and its descendants (Linux /proc only)"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except (OSError, ValueError):
+            continue
+    return total or None
+
+
+class MemorySampler:
+    """Samples server RSS in the background and keeps the peak"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_tree_rss(self.pid)
+            if rss:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+
+class LoadDriver:
+    """Send audit requests to the Django app at a fixed concurrency or arrival rate.
+
+    Each simulated user (or open-loop arrival) names its own X-Tenant, so the
+    app's per-tenant quota doesn't cap the whole run when it trusts that
+    header (SEO_AUDIT_TRUST_CLIENT_HEADERS).
+    """
+
+    def __init__(self, app_url, target_urls, endpoint='api/audit', timeout=120, poll_interval=0.25):
+        self.app_url = app_url.rstrip('/')
+        self.target_urls = target_urls
+        self.endpoint = endpoint.strip('/')
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.results = []
+        self._lock = threading.Lock()
+        self._csrf_token = None
+
+    def _session(self, tenant=None):
+        """A session carrying the CSRF cookie the audit endpoints require, as `tenant`"""
+        session = requests.Session()
+        if self._csrf_token is None:
+            session.get(f"{self.app_url}/", timeout=self.timeout)
+            self._csrf_token = session.cookies.get('csrftoken', '')
+        session.cookies.set('csrftoken', self._csrf_token)
+        session.headers.update({'X-CSRFToken': self._csrf_token, 'Content-Type': 'application/json'})
+        if tenant:
+            session.headers['X-Tenant'] = tenant
+        return session
+
+    def _send_one(self, session, target_url):
+        """Send one audit and record its latency; for api/audit/jobs, until the job has finished"""
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{self.app_url}/{self.endpoint}", data=json.dumps({'url': target_url}),
+                                    timeout=self.timeout)
+            body = response.content
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code >= 400:
+                outcome = f"http_{response.status_code}"
+            elif 'ndjson' in content_type or 'event-stream' in content_type:
+                outcome = 'error' if b'"event": "error"' in body else 'ok'
+            elif response.json().get('status') == 'queued':
+                outcome = self._wait_for_job(session, response.json()['job_id'], start)
+            else:
+                outcome = 'ok' if response.json().get('status') == 'success' else 'error'
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+        except requests.exceptions.RequestException:
+            outcome = 'connection_error'
+        except ValueError:
+            outcome = 'invalid_response'
+
+        with self._lock:
+            self.results.append((time.perf_counter() - start, outcome))
+
+    def _wait_for_job(self, session, job_id, start):
+        """Poll a queued audit until a worker finishes it; returns the outcome"""
+        while time.perf_counter() - start < self.timeout:
+            time.sleep(self.poll_interval)
+            response = session.get(f"{self.app_url}/api/audit/jobs/{job_id}", timeout=self.timeout)
+            if response.status_code >= 400:
+                return f"http_{response.status_code}"
+            status = response.json()['data']['status']
+            if status == 'succeeded':
+                return 'ok'
+            if status == 'dead':
+                return 'job_failed'
+        return 'timeout'
+
+    def run_closed(self, concurrency, duration=None, total=None):
+        """Closed loop: `concurrency` users each send a new audit as soon as the last one returns"""
+        deadline = time.perf_counter() + duration if duration else None
+        counter = iter(range(total)) if total else None
+        counter_lock = threading.Lock()
+
+        def user(index):
+            session = self._session(f"loadtest-user{index}")
+            rng = random.Random(index)
+            while True:
+                if deadline and time.perf_counter() >= deadline:
+                    return
+                if counter is not None:
+                    with counter_lock:
+                        if next(counter, None) is None:
+                            return
+                self._send_one(session, rng.choice(self.target_urls))
+
+        self._session()  # fetch the CSRF token once before the users start
+        return self._run_threads([threading.Thread(target=user, args=(i,)) for i in range(concurrency)])
+
+    def run_open(self, rate, duration, max_in_flight=1000):
+        """Open loop: Poisson arrivals at `rate` per second, regardless of response times"""
+        self._session()
+        rng = random.Random(0)
+        in_flight = threading.BoundedSemaphore(max_in_flight)
+        threads = []
+
+        def request(target_url, number):
+            try:
+                self._send_one(self._session(f"loadtest-arrival{number}"), target_url)
+            finally:
+                in_flight.release()
+
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival < start + duration:
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            if not in_flight.acquire(blocking=False):
+                with self._lock:
+                    self.results.append((0.0, 'dropped'))
+            else:
+                thread = threading.Thread(target=request, args=(rng.choice(self.target_urls), len(threads)))
+                thread.start()
+                threads.append(thread)
+            next_arrival += rng.expovariate(rate)
+
+        return self._run_threads(threads, started=True, start=start)
+
+    def _run_threads(self, threads, started=False, start=None):
+        start = start or time.perf_counter()
+        if not started:
+            for thread in threads:
+                thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def build_report(results, elapsed, memory_samples=None):
+    """Summarize (latency, outcome) pairs into the load test report"""
+    latencies = [latency for latency, outcome in results if outcome == 'ok']
+    outcomes = Counter(outcome for _, outcome in results)
+    total = len(results)
+
+    return {
+        'requests': total,
+        'succeeded': outcomes.get('ok', 0),
+        'elapsed': round(elapsed, 2),
+        'throughput': round(outcomes.get('ok', 0) / elapsed, 2) if elapsed else 0,
+        'error_rate': round((total - outcomes.get('ok', 0)) / total, 4) if total else 0,
+        'errors': {outcome: count for outcome, count in outcomes.items() if outcome != 'ok'},
+        'latency': {
+            'p50': _round(percentile(latencies, 50)),
+            'p95': _round(percentile(latencies, 95)),
+            'p99': _round(percentile(latencies, 99)),
+            'max': _round(max(latencies) if latencies else None),
+        },
+        'server_memory': {
+            'peak_mb': _mb(max(memory_samples)) if memory_samples else None,
+            'last_mb': _mb(memory_samples[-1]) if memory_samples else None,
+        },
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _mb(value):
+    return round(value / (1024 * 1024), 1)
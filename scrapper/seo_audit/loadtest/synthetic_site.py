@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ('audit', 'search', 'content', 'page', 'ranking', 'website', 'metadata', 'crawler', 'index',
+         'keyword', 'structure', 'heading', 'image', 'link', 'schema', 'sitemap', 'quality', 'visitor')
+
+
+class SiteConfig:
+    """Shape of the synthetic site served to the auditor"""
+
+    def __init__(self, pages=100, page_size=20 * 1024, link_count=30, latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, seed=0):
+        self.pages = pages
+        self.page_size = page_size
+        self.link_count = link_count
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.seed = seed
+
+
+def render_page(config, number):
+    """Deterministic HTML page of roughly config.page_size bytes"""
+    rng = random.Random(config.seed * 1000003 + number)
+
+    links = ''.join(
+        f'<li><a href="/page/{rng.randrange(config.pages)}">Related page</a></li>'
+        for _ in range(config.link_count)
+    )
+    head = (
+        f'<!DOCTYPE html><html><head><title>Synthetic page {number} about search engine audits</title>'
+        f'<meta name="description" content="{"Synthetic description for load testing the SEO auditor. " * 3}">'
+        f'<link rel="canonical" href="/page/{number}">'
+        f'<script type="application/ld+json">{{"@type": "WebPage", "name": "Page {number}"}}</script>'
+        f'</head><body><h1>Synthetic page number {number}</h1><ul>{links}</ul>'
+    )
+
+    paragraphs = []
+    size = len(head)
+    while size < config.page_size:
+        paragraph = '<h2>Section</h2><p>' + ' '.join(rng.choice(WORDS) for _ in range(80)) + '</p>' \
+                    f'<img src="/img/{rng.randrange(1000)}.png" alt="Illustration">'
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+
+    return (head + ''.join(paragraphs) + '</body></html>').encode('utf-8')
+
+
+class SyntheticSite:
+    """Local HTTP server that serves a configurable synthetic website"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or SiteConfig()
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                site._handle(self, send_body=True)
+
+            def do_HEAD(self):
+                site._handle(self, send_body=False)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def page_url(self, number):
+        return f"{self.url}/page/{number % self.config.pages}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, handler, send_body):
+        config = self.config
+        with self._lock:
+            self.requests_served += 1
+            delay = max(0.0, config.latency + self._rng.uniform(-config.latency_jitter, config.latency_jitter))
+            fail = self._rng.random() < config.error_rate
+
+        if delay:
+            time.sleep(delay)
+
+        path = handler.path.split('?')[0]
+        if fail:
+            status, content_type, body = 500, 'text/plain', b'synthetic error'
+        elif path == '/robots.txt':
+            status, content_type, body = 200, 'text/plain', f"User-agent: *\nSitemap: {self.url}/sitemap.xml\n".encode()
+        elif path == '/sitemap.xml':
+            status, content_type, body = 200, 'application/xml', self._sitemap()
+        elif path.startswith('/page/') and path[6:].isdigit() and int(path[6:]) < config.pages:
+            status, content_type, body = 200, 'text/html; charset=utf-8', render_page(config, int(path[6:]))
+        elif path.startswith('/img/'):
+            status, content_type, body = 200, 'image/png', b'\x89PNG\r\n\x1a\n'
+        else:
+            status, content_type, body = 404, 'text/plain', b'not found'
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if send_body:
+            handler.wfile.write(body)
+
+    def _sitemap(self):
+        urls = ''.join(f"<url><loc>{self.url}/page/{n}</loc></url>" for n in range(self.config.pages))
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        ).encode('utf-8')
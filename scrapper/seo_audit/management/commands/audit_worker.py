@@ -0,0 +1,58 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from seo_audit.services.job_queue import DEFAULT_VISIBILITY_TIMEOUT, JobQueue, Worker
+
+
+def _worker_main(index, options, stop_event):
+    # Each process needs its own database connection
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C
+
+    queue = JobQueue(
+        worker_id=f"{socket.gethostname()}:{os.getpid()}:{index}",
+        visibility_timeout=options['visibility_timeout'],
+    )
+    worker = Worker(queue, poll_interval=options['poll_interval'])
+    worker.run(stop_event=stop_event, max_jobs=options['max_jobs'], burst=options['burst'])
+    logging.info(f"Worker {queue.worker_id} exiting: {worker.processed} done, {worker.failed} failed")
+
+
+class Command(BaseCommand):
+    help = "Run background audit workers that lease jobs from the database queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--visibility-timeout', type=int, default=DEFAULT_VISIBILITY_TIMEOUT,
+                            help='Seconds a leased job stays invisible to other workers without a heartbeat')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit each worker after this many jobs')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        stop_event = multiprocessing.Event()
+        connections.close_all()  # don't share the parent's connection with forked children
+
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(i, options, stop_event), daemon=False)
+            for i in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        self.stdout.write(f"Started {len(processes)} audit worker(s)")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current job...")
+            stop_event.set()
+            for process in processes:
+                process.join()
@@ -0,0 +1,45 @@
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from seo_audit.loadtest.synthetic_site import SiteConfig, render_page
+from seo_audit.services.page_facts import PageFacts, parse_facts
+from seo_audit.services.seo_analyzer import SEOAnalyzer
+
+
+class Command(BaseCommand):
+    help = "Compare the tree (BeautifulSoup) and streaming (HTMLParser) engines on synthetic pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,200,2000', help='Page sizes in KB, comma separated')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        analyzer = SEOAnalyzer.parse_only()
+        names = [name for name in SEOAnalyzer.CHECKS if name not in SEOAnalyzer.NETWORK_CHECKS]
+        engines = {
+            'tree': lambda body: PageFacts.from_soup(BeautifulSoup(body, 'html.parser')),
+            'stream': lambda body: parse_facts(body, 'utf-8'),
+        }
+
+        for size in [int(kb) for kb in options['sizes'].split(',')]:
+            body = render_page(SiteConfig(page_size=size * 1024), 0)
+            results = {}
+            for name, extract in engines.items():
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    checks = analyzer.run_checks(extract(body), 'https://example.com/', names)
+                elapsed = (time.perf_counter() - start) / options['repeat']
+
+                tracemalloc.start()
+                analyzer.run_checks(extract(body), 'https://example.com/', names)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                results[name] = checks
+                self.stdout.write(f"{size:>6} KB {name:>6}: {elapsed * 1000:9.1f} ms  peak {peak / 2 ** 20:7.2f} MB")
+
+            if results['tree'] != results['stream']:
+                self.stderr.write(f"{size} KB: check results differ between engines")
@@ -0,0 +1,95 @@
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from seo_audit.services.frontier import URLFrontier
+
+
+def synthetic_urls(count, hosts, offset=0):
+    for i in range(offset, offset + count):
+        yield f"https://host{i % hosts}.example/section-{i % 97}/page-{i}?ref=nav"
+
+
+class Command(BaseCommand):
+    help = "Benchmark URL frontier enqueue/dequeue throughput and memory per million URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', type=int, default=1_000_000)
+        parser.add_argument('--hosts', type=int, default=1000)
+        parser.add_argument('--batch', type=int, default=1000, help='URLs per add()/pop() call')
+        parser.add_argument('--error-rate', type=float, default=0.01, help='Bloom filter false positive rate')
+        parser.add_argument('--path', help='Frontier directory (default: a temporary directory)')
+
+    def handle(self, *args, **options):
+        count, batch = options['urls'], options['batch']
+        path = options['path'] or tempfile.mkdtemp(prefix='frontier-')
+        per_million = 1_000_000 / count  # for the enqueue phase, which holds `count` URLs
+
+        try:
+            sample = min(count, 100_000)
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            frontier = URLFrontier(path, capacity=count + sample, error_rate=options['error_rate'])
+
+            start = time.perf_counter()
+            urls = synthetic_urls(count, options['hosts'])
+            while True:
+                chunk = [url for _, url in zip(range(batch), urls)]
+                if not chunk:
+                    break
+                frontier.add(chunk)
+            self._rate("enqueue (new)", count, time.perf_counter() - start)
+            rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+
+            # Rediscovered links: already seen, so the Bloom filter sends them to the exact check
+            start = time.perf_counter()
+            urls = list(synthetic_urls(sample, options['hosts']))
+            queued = sum(frontier.add(urls[i:i + batch]) for i in range(0, sample, batch))
+            self._rate("enqueue (seen)", sample, time.perf_counter() - start, f"{queued} queued")
+
+            # Fresh URLs again, to measure the "certainly new" path against a full filter
+            start = time.perf_counter()
+            urls = list(synthetic_urls(sample, options['hosts'], offset=count))
+            for i in range(0, sample, batch):
+                frontier.add(urls[i:i + batch])
+            self._rate("enqueue (new, full)", sample, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            popped = 0
+            while True:
+                rows = frontier.pop(batch)
+                if not rows:
+                    break
+                frontier.done(row[0] for row in rows)
+                popped += len(rows)
+            self._rate("dequeue + done", popped, time.perf_counter() - start)
+
+            frontier.close()
+            frontier = URLFrontier(path, capacity=count + sample, error_rate=options['error_rate'])
+            stats = frontier.stats()
+            frontier.close()
+        finally:
+            if not options['path']:
+                shutil.rmtree(path, ignore_errors=True)
+
+        tracemalloc.start()
+        seen = set(synthetic_urls(min(count, 1_000_000), options['hosts']))
+        set_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        set_per_million = set_bytes * 1_000_000 / len(seen)
+        del seen
+
+        stored = stats['seen'] / 1_000_000
+        self.stdout.write(f"Per million URLs ({stats['seen']} URLs stored, {options['hosts']} hosts):")
+        self.stdout.write(f"  Bloom filter        {stats['bloom_bytes'] / stored / 2 ** 20:>8.1f} MB "
+                          f"(estimated false positive rate {stats['bloom_false_positive_rate']:.4f})")
+        self.stdout.write(f"  SQLite on disk      {stats['disk_bytes'] / stored / 2 ** 20:>8.1f} MB")
+        self.stdout.write(f"  peak RSS growth     {rss_growth * per_million:>8.1f} MB (while enqueueing)")
+        self.stdout.write(f"  Python set of URLs  {set_per_million / 2 ** 20:>8.1f} MB (for comparison)")
+
+    def _rate(self, label, count, elapsed, note=''):
+        self.stdout.write(f"{label:<20} {count:>9} URLs {elapsed:>7.2f}s {count / elapsed if elapsed else 0:>10.0f} URLs/s"
+                          + (f"  ({note})" if note else ''))
@@ -0,0 +1,69 @@
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from seo_audit.services.link_graph import LinkGraph, SiteLinkGraph
+
+
+class Command(BaseCommand):
+    help = "Benchmark link graph construction, PageRank and click depth on a synthetic site"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1000000)
+        parser.add_argument('--links', type=int, default=20, help='Average outgoing links per page')
+        parser.add_argument('--store-pages', type=int, default=20000,
+                            help='Pages recorded through the on-disk edge log (0 to skip)')
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        rng = np.random.default_rng(0)
+
+        # Link targets are skewed towards low page numbers, like navigation hubs
+        out_degree = rng.poisson(options['links'], pages)
+        src = np.repeat(np.arange(pages, dtype=np.int32), out_degree)
+        dst = (pages * rng.random(len(src)) ** 3).astype(np.int32)
+        self.stdout.write(f"synthetic graph: {pages:,} pages, {len(src):,} raw links")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        graph = LinkGraph(pages, src, dst)
+        build = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"{'build':>12}: {build * 1000:9.1f} ms  ({graph.num_edges:,} edges, "
+                          f"CSR {graph.nbytes / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB)")
+
+        for name, run in [
+            ('pagerank', lambda: graph.pagerank()),
+            ('click depth', lambda: graph.click_depth(0)),
+            ('orphans', lambda: graph.orphans(0)),
+            ('dead ends', lambda: graph.dead_ends()),
+        ]:
+            start = time.perf_counter()
+            result = run()
+            self.stdout.write(f"{name:>12}: {(time.perf_counter() - start) * 1000:9.1f} ms  ({len(result):,} values)")
+
+        if options['store_pages']:
+            self._bench_store(options['store_pages'], options['links'], rng)
+
+    def _bench_store(self, pages, links, rng):
+        with tempfile.TemporaryDirectory() as path:
+            site = SiteLinkGraph(path, 'site.example')
+            start = time.perf_counter()
+            for page in range(pages):
+                targets = (pages * rng.random(rng.poisson(links)) ** 3).astype(int)
+                site.record_page(f"https://site.example/page/{page}",
+                                 [f"https://site.example/page/{t}" for t in targets])
+            record = time.perf_counter() - start
+            self.stdout.write(f"{'record':>12}: {pages:,} pages in {record:.2f}s ({pages / record:,.0f} pages/s)")
+
+            start = time.perf_counter()
+            site.page_metrics("https://site.example/page/0")
+            self.stdout.write(f"{'store build':>12}: {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+            start = time.perf_counter()
+            site.page_metrics("https://site.example/page/1")
+            self.stdout.write(f"{'cached':>12}: {(time.perf_counter() - start) * 1000:9.1f} ms")
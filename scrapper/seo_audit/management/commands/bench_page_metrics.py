@@ -0,0 +1,57 @@
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from seo_audit.services.metrics_store import PageMetricsStore
+
+
+class Command(BaseCommand):
+    help = "Benchmark appends and aggregate queries on the columnar page metrics store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--hosts', type=int, default=200)
+        parser.add_argument('--batch', type=int, default=10000, help='Rows per append batch')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as path:
+            store = PageMetricsStore(path)
+
+            start = time.perf_counter()
+            batch = []
+            for n in range(options['rows']):
+                url = f"https://site{rng.randrange(options['hosts'])}.example/page/{n}"
+                batch.append((url, {
+                    'title_length': rng.randint(0, 120),
+                    'meta_description_length': rng.randint(0, 300),
+                    'word_count': int(rng.lognormvariate(6.5, 0.8)),
+                    'images_count': rng.randint(0, 60),
+                    'internal_links': rng.randint(0, 300),
+                    'external_links': rng.randint(0, 50),
+                    'h1_count': rng.choice([0, 1, 1, 1, 2]),
+                    'load_time': rng.expovariate(2),
+                }, None))
+                if len(batch) == options['batch']:
+                    store.append_many(batch)
+                    batch = []
+            if batch:
+                store.append_many(batch)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"append: {options['rows']} rows in {elapsed:.2f}s "
+                              f"({options['rows'] / elapsed:,.0f} rows/s)")
+
+            queries = [
+                ('summary', lambda: store.summary('word_count')),
+                ('percentiles', lambda: store.percentiles('load_time')),
+                ('histogram', lambda: store.histogram('word_count', bins=50)),
+                ('threshold', lambda: store.threshold('title_length', minimum=30, maximum=60, limit=50)),
+                ('group_by_host', lambda: store.group_by_host('load_time')),
+                ('single host', lambda: store.percentiles('word_count', host='site7.example')),
+            ]
+            for name, query in queries:
+                start = time.perf_counter()
+                query()
+                self.stdout.write(f"{name:>14}: {(time.perf_counter() - start) * 1000:8.2f} ms")
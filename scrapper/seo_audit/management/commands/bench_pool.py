@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from seo_audit.loadtest.synthetic_site import SiteConfig, render_page
+from seo_audit.services.metrics import MetricsRegistry
+from seo_audit.services.process_pool import ProcessPool
+from seo_audit.services.seo_analyzer import SEOAnalyzer
+
+
+class Command(BaseCommand):
+    help = "Measure parse+check throughput of concurrent audits in-process versus on the process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=64)
+        parser.add_argument('--page-size', type=int, default=500, help='Page size in KB')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent audits (web server threads)')
+        parser.add_argument('--processes', default=None,
+                            help='Pool sizes to try, comma separated (default: 1, 2, 4, ... up to the CPU count)')
+        parser.add_argument('--engine', default='stream', choices=['stream', 'tree'])
+
+    def handle(self, *args, **options):
+        config = SiteConfig(pages=options['pages'], page_size=options['page_size'] * 1024)
+        bodies = [render_page(config, number) for number in range(options['pages'])]
+        names = [name for name in SEOAnalyzer.CHECKS if name not in SEOAnalyzer.NETWORK_CHECKS]
+        analyzer = SEOAnalyzer.parse_only(options['engine'])
+
+        def in_process(body):
+            page = analyzer.extract_facts(body, 'utf-8')
+            return {name: analyzer.run_check(name, page, 'https://example.com/') for name in names}
+
+        self._report('in-process', in_process, bodies, options['threads'])
+
+        if options['processes']:
+            sizes = [int(size) for size in options['processes'].split(',')]
+        else:
+            sizes = [1]
+            while sizes[-1] * 2 <= (os.cpu_count() or 1):
+                sizes.append(sizes[-1] * 2)
+
+        for processes in sizes:
+            pool = ProcessPool(processes=processes, max_pending=options['threads'], queue_timeout=60,
+                               metrics=MetricsRegistry()).start()
+            try:
+                self._report(f"pool x{processes}",
+                             lambda body: pool.process_page(body, 'https://example.com/', 'utf-8',
+                                                            options['engine'], names),
+                             bodies, options['threads'])
+            finally:
+                pool.close()
+
+    def _report(self, label, func, bodies, threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(func, bodies))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:>12}: {len(bodies) / elapsed:8.1f} pages/s ({elapsed:.2f}s)")
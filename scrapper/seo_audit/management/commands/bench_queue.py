@@ -0,0 +1,51 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from seo_audit.models import Job
+from seo_audit.services.job_queue import JobQueue, Worker, enqueue
+
+
+def _bench_worker(index, results):
+    connections.close_all()
+    queue = JobQueue(worker_id=f"bench:{index}")
+    worker = Worker(queue, poll_interval=0.01)
+    worker.run(burst=True)
+    results.put((worker.processed, queue.lease_conflicts))
+
+
+class Command(BaseCommand):
+    help = "Benchmark job queue throughput and lease contention with N local worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=500, help='Jobs to enqueue per run')
+        parser.add_argument('--processes', default='1,2,4,8', help='Comma-separated worker counts to try')
+        parser.add_argument('--job-seconds', type=float, default=0.0, help='Simulated work per job')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'workers':>8} {'jobs':>6} {'seconds':>8} {'jobs/s':>8} {'conflicts':>10}")
+
+        for count in [int(n) for n in options['processes'].split(',')]:
+            Job.objects.filter(kind='sleep').delete()
+            for _ in range(options['jobs']):
+                enqueue('sleep', {'seconds': options['job_seconds']})
+
+            connections.close_all()
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=_bench_worker, args=(i, results)) for i in range(count)]
+
+            start = time.perf_counter()
+            for process in processes:
+                process.start()
+            stats = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - start
+
+            processed = sum(s[0] for s in stats)
+            conflicts = sum(s[1] for s in stats)
+            self.stdout.write(f"{count:>8} {processed:>6} {elapsed:>8.2f} {processed / elapsed:>8.1f} {conflicts:>10}")
+
+        Job.objects.filter(kind='sleep').delete()
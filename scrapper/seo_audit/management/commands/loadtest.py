@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from seo_audit.loadtest.driver import LoadDriver, MemorySampler, build_report
+from seo_audit.loadtest.synthetic_site import SiteConfig, SyntheticSite
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = "Load-test the audit API offline against a local synthetic website"
+
+    def add_arguments(self, parser):
+        server = parser.add_argument_group('application server')
+        server.add_argument('--app-url', help='Test an already running app instead of starting one (run it with '
+                                              'SEO_AUDIT_TRUST_CLIENT_HEADERS=1, or all users share one tenant quota)')
+        server.add_argument('--server', choices=['runserver', 'gunicorn', 'uvicorn'], default='runserver',
+                            help='runserver (threaded WSGI), gunicorn (WSGI workers) or uvicorn (ASGI)')
+        server.add_argument('--workers', type=int, default=1, help='Worker processes for gunicorn/uvicorn')
+        server.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+        server.add_argument('--server-pid', type=int, help='PID to sample memory from when using --app-url')
+
+        site = parser.add_argument_group('synthetic site')
+        site.add_argument('--pages', type=int, default=100)
+        site.add_argument('--page-size', type=int, default=20 * 1024, help='Approximate HTML bytes per page')
+        site.add_argument('--links', type=int, default=30, help='Links per page')
+        site.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+        site.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- seconds of latency jitter')
+        site.add_argument('--error-rate', type=float, default=0.0, help='Fraction of responses that are 500s')
+
+        load = parser.add_argument_group('load')
+        load.add_argument('--concurrency', type=int, default=10, help='Concurrent users (closed loop)')
+        load.add_argument('--rate', type=float, help='Arrivals per second (open loop); overrides --concurrency')
+        load.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        load.add_argument('--requests', type=int, help='Stop after this many requests (closed loop)')
+        load.add_argument('--endpoint', default='api/audit',
+                          help='api/audit, api/audit/stream, api/audit/stream/async or api/audit/jobs '
+                               '(jobs are timed until an audit_worker finishes them)')
+        load.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        config = SiteConfig(
+            pages=options['pages'],
+            page_size=options['page_size'],
+            link_count=options['links'],
+            latency=options['latency'],
+            latency_jitter=options['jitter'],
+            error_rate=options['error_rate'],
+        )
+
+        with SyntheticSite(config) as site:
+            server = None
+            app_url = options['app_url']
+            server_pid = options['server_pid']
+            if not app_url:
+                server, app_url = self._start_server(options)
+                server_pid = server.pid
+
+            try:
+                report = self._run(options, site, app_url, server_pid)
+            finally:
+                if server:
+                    server.terminate()
+                    server.wait(timeout=10)
+
+        report['config'] = {
+            'server': 'external' if options['app_url'] else options['server'],
+            'workers': options['workers'],
+            'threads': options['threads'],
+            'endpoint': options['endpoint'],
+            'mode': f"rate={options['rate']}/s" if options['rate'] else f"concurrency={options['concurrency']}",
+            'site': vars(config),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+    def _run(self, options, site, app_url, server_pid):
+        targets = [site.page_url(n) for n in range(options['pages'])]
+        driver = LoadDriver(app_url, targets, endpoint=options['endpoint'])
+        sampler = MemorySampler(server_pid).start()
+
+        try:
+            if options['rate']:
+                elapsed = driver.run_open(options['rate'], options['duration'])
+            else:
+                duration = None if options['requests'] else options['duration']
+                elapsed = driver.run_closed(options['concurrency'], duration=duration, total=options['requests'])
+        finally:
+            sampler.stop()
+
+        return build_report(driver.results, elapsed, sampler.samples)
+
+    def _start_server(self, options):
+        port = _free_port()
+        address = f"127.0.0.1:{port}"
+
+        if options['server'] == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', address]
+        elif options['server'] == 'gunicorn':
+            command = [sys.executable, '-m', 'gunicorn', 'scrapper.wsgi', '--bind', address,
+                       '--workers', str(options['workers']), '--threads', str(options['threads'])]
+        else:
+            command = [sys.executable, '-m', 'uvicorn', 'scrapper.asgi:application', '--host', '127.0.0.1',
+                       '--port', str(port), '--workers', str(options['workers'])]
+
+        # Trusted X-Tenant headers give every simulated user its own tenant quota
+        env = dict(os.environ, SEO_AUDIT_ALLOW_PRIVATE_TARGETS='1', SEO_AUDIT_TRUST_CLIENT_HEADERS='1')
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        app_url = f"http://{address}"
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{options['server']} exited with code {server.returncode}; is it installed?")
+            try:
+                requests.get(app_url, timeout=1)
+                return server, app_url
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f"{options['server']} did not start listening on {address}")
+
+    def _print_report(self, report):
+        latency = report['latency']
+        memory = report['server_memory']
+        config = report['config']
+
+        self.stdout.write(f"Server:      {config['server']} (workers={config['workers']}, threads={config['threads']})")
+        self.stdout.write(f"Load:        {config['mode']} against {config['endpoint']}")
+        self.stdout.write(f"Requests:    {report['requests']} ({report['succeeded']} ok) in {report['elapsed']}s")
+        self.stdout.write(f"Throughput:  {report['throughput']} audits/s")
+        self.stdout.write(f"Latency:     p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s "
+                          f"max={latency['max']}s")
+        self.stdout.write(f"Error rate:  {report['error_rate'] * 100:.2f}% {report['errors'] or ''}")
+        self.stdout.write(f"Server RSS:  peak={memory['peak_mb']}MB last={memory['last_mb']}MB")
@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from seo_audit.services.metrics import registry
+from seo_audit.services.monitor import Monitor
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Re-audit every enabled Website on its interval, re-running only the checks whose inputs changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Audits running at once (default: settings)')
+        parser.add_argument('--host-delay', type=float, help='Minimum seconds between audits of one host')
+        parser.add_argument('--jitter', type=float, help='Maximum random delay added to each start')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between checks for due sites')
+        parser.add_argument('--metrics-port', type=int, default=0,
+                            help='Serve Prometheus metrics on this port (default: off)')
+        parser.add_argument('--once', action='store_true', help='Audit the sites that are due now, then exit')
+
+    def handle(self, *args, **options):
+        config = dict(getattr(settings, 'SEO_AUDIT_MONITOR', None) or {})
+        for name in ('concurrency', 'host_delay', 'jitter'):
+            if options[name] is not None:
+                config[name] = options[name]
+
+        monitor = Monitor(**config)
+        registry.register_collector(monitor.collect)
+
+        if options['metrics_port']:
+            server = ThreadingHTTPServer(('', options['metrics_port']), MetricsHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
+
+        stop_event = threading.Event()
+        self.stdout.write(f"Monitoring websites with {monitor.concurrency} concurrent audits")
+        try:
+            monitor.run(stop_event, poll_interval=options['poll_interval'], once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running audits...")
+            stop_event.set()
+
+        self.stdout.write(json.dumps(monitor.snapshot()))
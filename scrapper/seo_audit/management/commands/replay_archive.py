@@ -0,0 +1,97 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from seo_audit.services.archive import ResponseArchive
+from seo_audit.services.seo_analyzer import ENGINES, SEOAnalyzer
+from seo_audit.services.sitemap import parse_lastmod
+from seo_audit.services.transport import ReplayTransport
+
+_analyzer = None
+_names = None
+
+
+def _init_worker(path, as_of, engine, names):
+    global _analyzer, _names
+    _analyzer = SEOAnalyzer(transport=ReplayTransport(ResponseArchive(path), as_of), engine=engine)
+    _analyzer.link_graph = None  # replays must not add to the live link graphs
+    _names = names
+
+
+def _replay(url):
+    try:
+        return _analyzer.analyze(url, _names)
+    except Exception as e:
+        return {'url': url, 'error': str(e)}
+
+
+class Command(BaseCommand):
+    help = "Re-run checks over archived pages without network access, writing one JSON result per line"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', help='Archive directory (default: settings.SEO_AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--checks', help='Comma separated checks to run (default: all)')
+        parser.add_argument('--since', help='Only pages recorded at or after this ISO date')
+        parser.add_argument('--until', help='Only pages recorded at or before this ISO date; robots.txt and '
+                                            'link probes are also served as they were then')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many pages')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--engine', choices=ENGINES, help='HTML engine (default: settings.SEO_AUDIT_ENGINE)')
+        parser.add_argument('--quiet', action='store_true', help='Only print the summary')
+
+    def handle(self, *args, **options):
+        path = options['archive'] or getattr(settings, 'SEO_AUDIT_ARCHIVE_DIR', None)
+        if not path or not os.path.isdir(path):
+            raise CommandError("No archive: pass --archive or set SEO_AUDIT_ARCHIVE_DIR")
+
+        names = None
+        if options['checks']:
+            names = [name.strip() for name in options['checks'].split(',') if name.strip()]
+            unknown = [name for name in names if name not in SEOAnalyzer.CHECKS]
+            if unknown:
+                raise CommandError(f"Unknown checks: {', '.join(unknown)}")
+
+        dates = {}
+        for option in ('since', 'until'):
+            if options[option]:
+                dates[option] = parse_lastmod(options[option])
+                if dates[option] is None:
+                    raise CommandError(f"Invalid --{option} date: {options[option]}")
+
+        urls = ResponseArchive(path).urls('page', since=dates.get('since'), until=dates.get('until'))
+        if options['limit']:
+            urls = urls[:options['limit']]
+
+        initargs = (path, dates.get('until'), options['engine'], names)
+        start = time.perf_counter()
+        if options['processes'] > 1:
+            connections.close_all()  # don't share the parent's connection with forked children
+            with multiprocessing.Pool(options['processes'], initializer=_init_worker, initargs=initargs) as pool:
+                summary = self._write(pool.imap(_replay, urls, chunksize=8), options['quiet'])
+        else:
+            _init_worker(*initargs)
+            summary = self._write(map(_replay, urls), options['quiet'])
+        elapsed = time.perf_counter() - start
+
+        pages = sum(summary['pages'].values())
+        self.stderr.write(f"Replayed {pages} pages in {elapsed:.2f}s "
+                          f"({pages / elapsed if elapsed else 0:.1f} pages/s, {options['processes']} processes)")
+        self.stderr.write(f"  pages: {dict(summary['pages'])}")
+        for name, statuses in sorted(summary['checks'].items()):
+            self.stderr.write(f"  {name}: {dict(statuses)}")
+
+    def _write(self, results, quiet):
+        summary = {'pages': Counter(), 'checks': {}}
+        for result in results:
+            summary['pages']['error' if 'error' in result else 'ok'] += 1
+            for name, check in result.get('checks', {}).items():
+                summary['checks'].setdefault(name, Counter())[check['status']] += 1
+            if not quiet:
+                self.stdout.write(json.dumps(result))
+        return summary
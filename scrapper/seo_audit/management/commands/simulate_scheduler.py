@@ -0,0 +1,125 @@
+import heapq
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from seo_audit.services.latency import percentile
+from seo_audit.services.metrics import MetricsRegistry
+from seo_audit.services.scheduler import AuditScheduler, SchedulingPolicy
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FifoPolicy(SchedulingPolicy):
+    """Baseline without classes, quotas or fair sharing"""
+
+    def order(self, waiting, running):
+        return sorted((((-waited,), item) for _, _, waited, item in waiting), key=lambda entry: entry[0])
+
+
+class Command(BaseCommand):
+    help = ("Simulate interactive audits competing with bulk load, FIFO versus the priority scheduler "
+            "as configured in settings.SEO_AUDIT_SCHEDULER")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, help='Audits running at once (default: settings)')
+        parser.add_argument('--aging', type=float, help='Seconds of waiting that promote a request (default: settings)')
+        parser.add_argument('--tenant-limit', type=int, help='Concurrent audits per tenant (default: settings)')
+        parser.add_argument('--bulk-limit', type=int, help='Slots bulk audits may take (default: settings)')
+        parser.add_argument('--duration', type=float, default=300, help='Simulated seconds of arrivals')
+        parser.add_argument('--interactive-rate', type=float, default=2.0, help='Interactive audits per second')
+        parser.add_argument('--interactive-seconds', type=float, default=1.0, help='Mean interactive audit time')
+        parser.add_argument('--bulk-seconds', type=float, default=2.0, help='Mean bulk audit time')
+        parser.add_argument('--bulk-loads', default='0,0.5,1,2',
+                            help='Bulk arrival rates as fractions of the capacity left after interactive load')
+        parser.add_argument('--tenants', type=int, default=5, help='Interactive tenants')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        config = dict(getattr(settings, 'SEO_AUDIT_SCHEDULER', None) or {})
+        for name in ('capacity', 'aging', 'tenant_limit'):
+            if options[name] is not None:
+                config[name] = options[name]
+        if options['bulk_limit'] is not None:
+            config['class_limits'] = dict(config.get('class_limits') or {}, bulk=options['bulk_limit'])
+        capacity = config.setdefault('capacity', 8)
+
+        policies = {
+            'fifo': lambda clock: AuditScheduler(capacity, clock=clock, metrics=MetricsRegistry(), policy=FifoPolicy()),
+            'scheduler': lambda clock: AuditScheduler(clock=clock, metrics=MetricsRegistry(), **config),
+        }
+
+        self.stdout.write("Scheduler: " + ", ".join(f"{name}={config[name]}" for name in sorted(config)))
+
+        spare = capacity - options['interactive_rate'] * options['interactive_seconds']
+        self.stdout.write(f"{'bulk load':>9} {'policy':>10} {'int p50':>8} {'int p95':>8} {'int p99':>8} "
+                          f"{'bulk p95':>9} {'bulk max':>9} {'bulk done':>10}")
+        for load in [float(value) for value in options['bulk_loads'].split(',')]:
+            bulk_rate = max(0.0, load * spare / options['bulk_seconds'])
+            for name, make in policies.items():
+                waits = self._simulate(make, bulk_rate, options)
+                interactive, bulk = waits['interactive'], waits['bulk']
+                self.stdout.write(
+                    f"{load:>9.2f} {name:>10} {percentile(interactive, 50) or 0:>8.2f} "
+                    f"{percentile(interactive, 95) or 0:>8.2f} {percentile(interactive, 99) or 0:>8.2f} "
+                    f"{percentile(bulk, 95) or 0:>9.2f} "
+                    f"{max(bulk, default=0):>9.2f} {len(bulk):>10}"
+                )
+
+    def _simulate(self, make, bulk_rate, options):
+        rng = random.Random(options['seed'])
+        clock = VirtualClock()
+        scheduler = make(clock)
+
+        events = []
+        sequence = 0
+
+        def schedule(at, kind, data):
+            nonlocal sequence
+            sequence += 1
+            heapq.heappush(events, (at, sequence, kind, data))
+
+        def arrivals(rate, kind):
+            at = 0.0
+            while rate > 0:
+                at += rng.expovariate(rate)
+                if at > options['duration']:
+                    break
+                schedule(at, 'arrive', kind)
+
+        arrivals(options['interactive_rate'], 'interactive')
+        arrivals(bulk_rate, 'bulk')
+
+        waits = {'interactive': [], 'bulk': []}
+        kinds = {}
+
+        def start(tickets):
+            for ticket in tickets:
+                kind = kinds.pop(ticket)
+                waits[kind].append(ticket.waited)
+                mean = options['interactive_seconds'] if kind == 'interactive' else options['bulk_seconds']
+                schedule(clock.now + rng.expovariate(1 / mean), 'finish', ticket)
+
+        while events:
+            clock.now, _, event, data = heapq.heappop(events)
+            if clock.now > options['duration'] * 2:
+                break  # don't drain an overloaded bulk backlog forever
+            if event == 'arrive':
+                if data == 'interactive':
+                    tenant = f"user{rng.randrange(options['tenants'])}"
+                else:
+                    tenant = 'crawler'
+                ticket = scheduler.submit(data, tenant)
+                kinds[ticket] = data
+            else:
+                scheduler.finish(data)
+            start(scheduler.dispatch())
+
+        return waits
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seo_audit', '0002_website_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageAudit',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('url', models.URLField(db_index=True, max_length=2048)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('html_hash', models.CharField(default='', max_length=64)),
+                ('artifact_hashes', models.JSONField(default=dict)),
+                ('checks', models.JSONField(default=dict)),
+                ('checked_at', models.JSONField(default=dict)),
+                ('page_info', models.JSONField(default=dict)),
+            ],
+        ),
+    ]
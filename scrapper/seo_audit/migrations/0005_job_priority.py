@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seo_audit', '0004_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='priority',
+            field=models.CharField(choices=[('interactive', 'Interactive'), ('scheduled', 'Scheduled'), ('bulk', 'Bulk')], default='scheduled', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='tenant',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'priority', 'run_after'], name='seo_audit_j_status_d43e95_idx'),
+        ),
+    ]
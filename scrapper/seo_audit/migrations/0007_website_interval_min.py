@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:35
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seo_audit', '0006_website_monitoring'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='website',
+            name='interval',
+            field=models.PositiveIntegerField(default=86400, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
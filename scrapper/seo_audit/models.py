@@ -1,3 +1,4 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 
 # Create your models here.
@@ -15,4 +16,110 @@ class TagsCounter(models.Model):
 class Website(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=120)
-    url = models.URLField(default="")
\ No newline at end of file
+    url = models.URLField(default="")
+    # Monitoring: re-audited every `interval` seconds while enabled
+    enabled = models.BooleanField(default=True)
+    interval = models.PositiveIntegerField(default=24 * 60 * 60, validators=[MinValueValidator(1)])
+    next_run_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, default="", blank=True)
+    last_error = models.TextField(default="", blank=True)
+    last_duration = models.FloatField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, default="", blank=True)
+    last_result = models.JSONField(null=True, blank=True)
+
+class PageAudit(models.Model):
+    id = models.AutoField(primary_key=True)
+    url = models.URLField(max_length=2048, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    html_hash = models.CharField(max_length=64, default="")
+    artifact_hashes = models.JSONField(default=dict)
+    checks = models.JSONField(default=dict)
+    checked_at = models.JSONField(default=dict)
+    page_info = models.JSONField(default=dict)
+
+    @classmethod
+    def latest_for(cls, url):
+        """Return the most recent stored audit of a URL as a result dict, or None"""
+        record = cls.objects.filter(url=url).order_by('-created_at', '-id').first()
+        return record.to_result() if record else None
+
+    @classmethod
+    def record(cls, result):
+        """Store an incremental audit result"""
+        return cls.objects.create(
+            url=result['url'],
+            html_hash=result['fingerprint']['html'],
+            artifact_hashes=result['fingerprint']['artifacts'],
+            checks=result['checks'],
+            checked_at=result['checked_at'],
+            page_info=result['page_info'],
+        )
+
+    def to_result(self):
+        return {
+            'url': self.url,
+            'timestamp': self.created_at.isoformat(),
+            'checks': self.checks,
+            'page_info': self.page_info,
+            'fingerprint': {'html': self.html_hash, 'artifacts': self.artifact_hashes},
+            'checked_at': self.checked_at,
+        }
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    DEAD = 'dead'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (DEAD, 'Dead'),
+    ]
+
+    PRIORITY_CHOICES = [
+        ('interactive', 'Interactive'),
+        ('scheduled', 'Scheduled'),
+        ('bulk', 'Bulk'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=50, default='audit')
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='scheduled')
+    tenant = models.CharField(max_length=100, default="", blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField()
+    leased_by = models.CharField(max_length=100, default="", blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(default="", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['status', 'lease_expires_at']),
+            models.Index(fields=['status', 'priority', 'run_after']),
+        ]
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'priority': self.priority,
+            'tenant': self.tenant,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'result': self.result,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,197 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+RECORDS_FILE = 'records.log'
+
+# What a record holds: 'page' is an audited page (GET, body), 'resource' any
+# other GET (robots.txt), 'probe' a link probe (HEAD, status and headers only).
+KINDS = ('page', 'resource', 'probe')
+
+
+class NotArchivedError(requests.exceptions.ConnectionError):
+    """Raised by a replay for a URL the archive has no record of"""
+
+
+class ArchivedResponse:
+    """One archived response, with its body decompressed"""
+
+    def __init__(self, header, content):
+        self.kind = header['kind']
+        self.url = header['url']
+        self.final_url = header.get('final_url') or header['url']
+        self.status_code = header['status']
+        self.headers = CaseInsensitiveDict(header.get('headers') or {})
+        self.content = content
+        self.date = header['date']
+        self.digest = header.get('digest')
+
+
+class ResponseArchive:
+    """Append-only, content-addressed archive of fetched responses.
+
+    Modelled on WARC: records.log is a sequence of records, each a JSON header
+    line followed by a zlib-compressed payload (the decoded body). A body whose
+    SHA-256 digest is already stored is written as a 'revisit' record that
+    refers to the earlier payload instead of repeating it, so re-fetching an
+    unchanged page costs one header line. Appends take an exclusive flock, so
+    several processes can record into the same archive.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok=True)
+        self.records_path = os.path.join(self.path, RECORDS_FILE)
+        self._by_url = {}      # url -> [(date, kind, header), ...] in append order
+        self._payloads = {}    # digest -> (offset, length) of the stored payload
+        self._scanned = 0      # bytes of records.log already indexed
+        self._lock = threading.Lock()
+
+    # -- writing -----------------------------------------------------------
+
+    def record(self, kind, url, status, headers, content=None, final_url=None):
+        """Append a response; returns its header"""
+        if kind not in KINDS:
+            raise Exception(f"Unknown archive record kind: {kind}")
+
+        header = {
+            'kind': kind,
+            'url': url,
+            'final_url': final_url if final_url and final_url != url else None,
+            'status': status,
+            'headers': {str(name): str(value) for name, value in dict(headers or {}).items()},
+            'date': datetime.now(timezone.utc).isoformat(),
+        }
+
+        payload = b''
+        if content is not None:
+            header['digest'] = 'sha256:' + hashlib.sha256(content).hexdigest()
+            header['size'] = len(content)
+
+        with self._lock, open(self.records_path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if content is not None:
+                    if header['digest'] in self._payloads:
+                        header['type'] = 'revisit'
+                    else:
+                        header['type'] = 'response'
+                        payload = zlib.compress(content, 6)
+                else:
+                    header['type'] = 'metadata'
+                header['length'] = len(payload)
+
+                offset = f.seek(0, os.SEEK_END)
+                line = json.dumps(header, sort_keys=True).encode('utf-8') + b'\n'
+                f.write(line + payload + b'\n')
+                f.flush()
+                self._index(header, offset + len(line))
+                self._scanned = f.tell()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return header
+
+    # -- reading -----------------------------------------------------------
+
+    def _refresh(self):
+        """Index records appended since the last scan (by any process)"""
+        # Callers hold self._lock
+        if not os.path.exists(self.records_path):
+            return
+        with open(self.records_path, 'rb') as f:
+            f.seek(self._scanned)
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # end of file, or a record still being written
+                header = json.loads(line)
+                payload_offset = f.tell()
+                f.seek(header['length'] + 1, os.SEEK_CUR)
+                if f.tell() > os.fstat(f.fileno()).st_size:
+                    break
+                self._index(header, payload_offset)
+                self._scanned = f.tell()
+
+    def _index(self, header, payload_offset):
+        if header['type'] == 'response':
+            self._payloads.setdefault(header['digest'], (payload_offset, header['length']))
+        self._by_url.setdefault(header['url'], []).append((header['date'], header['kind'], header))
+
+    def _content(self, header):
+        if 'digest' not in header:
+            return None
+        offset, length = self._payloads[header['digest']]
+        with open(self.records_path, 'rb') as f:
+            f.seek(offset)
+            return zlib.decompress(f.read(length))
+
+    def lookup(self, url, kinds=KINDS, as_of=None):
+        """The latest response for url among `kinds`, recorded no later than
+        `as_of` (an ISO date or datetime), or None"""
+        as_of = _isoformat(as_of)
+        with self._lock:
+            self._refresh()
+            candidates = [header for date, kind, header in self._by_url.get(url, ())
+                          if kind in kinds and (as_of is None or date <= as_of)]
+            if not candidates:
+                return None
+            header = candidates[-1]
+            return ArchivedResponse(header, self._content(header))
+
+    def urls(self, kind='page', since=None, until=None):
+        """URLs with at least one record of `kind` dated within [since, until]"""
+        since, until = _isoformat(since), _isoformat(until)
+        with self._lock:
+            self._refresh()
+            return [
+                url for url, records in self._by_url.items()
+                if any(k == kind and (since is None or date >= since) and (until is None or date <= until)
+                       for date, k, _ in records)
+            ]
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            records = [header for entries in self._by_url.values() for _, _, header in entries]
+        return {
+            'records': len(records),
+            'urls': len(self._by_url),
+            'payloads': len(self._payloads),
+            'revisits': sum(1 for header in records if header['type'] == 'revisit'),
+            'body_bytes': sum(header.get('size', 0) for header in records),
+            'stored_bytes': self._scanned,
+        }
+
+
+def _isoformat(value):
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+_archive = None
+
+
+def default_archive():
+    """Process-wide archive at settings.SEO_AUDIT_ARCHIVE_DIR, or None if recording is off"""
+    global _archive
+    try:
+        from django.conf import settings
+        path = getattr(settings, 'SEO_AUDIT_ARCHIVE_DIR', None) if settings.configured else None
+    except ImportError:
+        path = None
+    if not path:
+        return None
+    if _archive is None or _archive.path != str(path):
+        _archive = ResponseArchive(path)
+    return _archive
@@ -0,0 +1,228 @@
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from .metrics import registry
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    """Raised without touching the network when a host's circuit is open or it is
+    in the negative cache"""
+
+
+class HostCircuit:
+    def __init__(self, cooldown):
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.last_error = None
+
+
+class CircuitBreakers:
+    """Per-host circuit breakers plus a short-lived negative cache.
+
+    `failure_threshold` consecutive failures (timeouts, connection errors, a
+    page answering 502/503/504) open a host's circuit. After `cooldown`
+    seconds one trial request is let through (half-open): success closes the
+    circuit, failure re-opens it with the cool-down doubled up to
+    `max_cooldown`. DNS and connection-refused
+    failures additionally put the host in a negative cache for `negative_ttl`
+    seconds, so nothing waits on a host that just proved unreachable.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30, max_cooldown=300, negative_ttl=10, metrics=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.negative_ttl = negative_ttl
+        self.metrics = metrics or registry
+        self._circuits = {}
+        self._negative = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url):
+        return urlparse(url).netloc.lower()
+
+    def _circuit(self, host):
+        if host not in self._circuits:
+            self._circuits[host] = HostCircuit(self.cooldown)
+        return self._circuits[host]
+
+    def _transition(self, host, circuit, state):
+        circuit.state = state
+        self.metrics.inc('seo_audit_circuit_transitions_total', host=host, to=state)
+
+    def _reject(self, host, reason, message):
+        self.metrics.inc('seo_audit_circuit_rejections_total', host=host, reason=reason)
+        raise HostUnavailableError(message)
+
+    def before_request(self, url):
+        """Raise HostUnavailableError if a request to this host should not be sent"""
+        host = self.host(url)
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None and circuit.state == OPEN:
+                retry_in = circuit.opened_at + circuit.cooldown - now
+                if retry_in > 0:
+                    self._reject(host, 'open',
+                                 f"Host {host} is unavailable after {circuit.failures} consecutive failures "
+                                 f"({circuit.last_error}); retrying in {retry_in:.1f}s")
+
+            negative = self._negative.get(host)
+            if negative is not None:
+                expires_at, error = negative
+                if now < expires_at:
+                    self._reject(host, 'negative_cache',
+                                 f"Host {host} is unreachable ({error}); retrying in {expires_at - now:.1f}s")
+                del self._negative[host]
+
+            if circuit is None or circuit.state == CLOSED:
+                return
+            if circuit.state == OPEN:
+                self._transition(host, circuit, HALF_OPEN)
+            if circuit.trial_in_flight:
+                self._reject(host, 'half_open', f"Host {host} is recovering; a trial request is in progress")
+            circuit.trial_in_flight = True
+
+    def available(self, url):
+        """Whether before_request would currently let a request through (no side effects)"""
+        host = self.host(url)
+        now = time.monotonic()
+        with self._lock:
+            negative = self._negative.get(host)
+            if negative is not None and now < negative[0]:
+                return False
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN:
+                return now >= circuit.opened_at + circuit.cooldown
+            return not circuit.trial_in_flight
+
+    def record_success(self, url):
+        host = self.host(url)
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                return
+            circuit.failures = 0
+            circuit.trial_in_flight = False
+            if circuit.state != CLOSED:
+                circuit.cooldown = self.cooldown
+                self._transition(host, circuit, CLOSED)
+
+    def record_failure(self, url, error=None):
+        host = self.host(url)
+        now = time.monotonic()
+        with self._lock:
+            if error is not None and is_connect_failure(error):
+                self._negative[host] = (now + self.negative_ttl, _describe(error))
+
+            circuit = self._circuit(host)
+            circuit.failures += 1
+            circuit.last_error = _describe(error) if error is not None else 'server error'
+            if circuit.state == HALF_OPEN:
+                circuit.cooldown = min(circuit.cooldown * 2, self.max_cooldown)
+            elif circuit.state == OPEN or circuit.failures < self.failure_threshold:
+                return
+
+            circuit.trial_in_flight = False
+            circuit.opened_at = now
+            circuit.times_opened += 1
+            self._transition(host, circuit, OPEN)
+
+    def release(self, url):
+        """End a half-open trial that gave no verdict either way"""
+        with self._lock:
+            circuit = self._circuits.get(self.host(url))
+            if circuit is not None:
+                circuit.trial_in_flight = False
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            hosts = {
+                host: {
+                    'state': circuit.state,
+                    'consecutive_failures': circuit.failures,
+                    'times_opened': circuit.times_opened,
+                    'retry_in': round(max(0.0, circuit.opened_at + circuit.cooldown - now), 1)
+                    if circuit.state == OPEN else None,
+                    'last_error': circuit.last_error,
+                }
+                for host, circuit in self._circuits.items()
+            }
+            negative = {host: round(expires_at - now, 1) for host, (expires_at, _) in self._negative.items()
+                        if expires_at > now}
+        return {'hosts': hosts, 'negative_cache': negative}
+
+    def collect(self):
+        """Metric samples for the registry"""
+        snapshot = self.snapshot()
+        samples = [('seo_audit_negative_cache_entries', {}, len(snapshot['negative_cache']))]
+        for host, circuit in snapshot['hosts'].items():
+            samples.append(('seo_audit_circuit_state', {'host': host}, STATE_VALUES[circuit['state']]))
+            samples.append(('seo_audit_circuit_consecutive_failures', {'host': host},
+                            circuit['consecutive_failures']))
+        return samples
+
+
+def is_connect_failure(error):
+    """True for DNS resolution and connection-refused style errors, at any depth of
+    the exception chain (requests wraps urllib3, our httpx mapping keeps __context__)"""
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, (socket.gaierror, ConnectionRefusedError)):
+            return True
+        name = type(current).__name__
+        if name in ('NewConnectionError', 'NameResolutionError', 'ConnectError'):
+            return True
+        pending.extend([current.__cause__, current.__context__, getattr(current, 'reason', None)])
+        pending.extend(arg for arg in getattr(current, 'args', ()) if isinstance(arg, BaseException))
+    return False
+
+
+def _describe(error):
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if is_connect_failure(error):
+        return 'connection failed'
+    return type(error).__name__
+
+
+_breakers = None
+
+
+def default_breakers():
+    """Process-wide breakers, configured from settings.SEO_AUDIT_CIRCUIT_BREAKER"""
+    global _breakers
+    if _breakers is None:
+        options = {}
+        try:
+            from django.conf import settings
+            if settings.configured:
+                options = getattr(settings, 'SEO_AUDIT_CIRCUIT_BREAKER', {})
+        except ImportError:
+            pass
+        _breakers = CircuitBreakers(**options)
+        registry.register_collector(_breakers.collect)
+    return _breakers
@@ -0,0 +1,187 @@
+import hashlib
+import re
+import time
+from datetime import datetime
+
+from .transport import content_charset
+from .seo_analyzer import SEOAnalyzer
+
+# Sub-artifacts each check reads. A check is recomputed only when one of its
+# inputs hashes differently from the previous audit.
+CHECK_INPUTS = {
+    'title_tag': ('head',),
+    'meta_description': ('head',),
+    'h1_tag': ('headings',),
+    'header_hierarchy': ('headings',),
+    'content_length': ('text',),
+    'keyword_density': ('text',),
+    'alt_text': ('images',),
+    'canonical_url': ('head',),
+    'meta_robots': ('head',),
+    'xml_sitemap': ('head', 'links'),
+    'schema_markup': ('schema',),
+    'broken_links': ('links',),
+}
+
+# Maximum age in seconds before a network-dependent check is re-run even if
+# its inputs are unchanged (the remote side can change without the page changing)
+NETWORK_FRESHNESS = {
+    'xml_sitemap': 24 * 60 * 60,
+    'broken_links': 6 * 60 * 60,
+}
+
+_WHITESPACE = re.compile(rb'\s+')
+
+
+def _digest(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_html(body):
+    """Hash raw HTML with whitespace runs collapsed"""
+    return _digest(_WHITESPACE.sub(b' ', body).strip())
+
+
+def hash_artifacts(page):
+    """Hash the parts of a page's PageFacts that the checks depend on"""
+    head = [page.title, page.meta_description, page.meta_robots, page.canonical, page.has_xml_link]
+    headings = [page.heading_levels, page.first_h1_text]
+    images = [page.images, page.images_missing_alt, page.images_empty_alt]
+
+    return {
+        'head': _digest(repr(head)),
+        'headings': _digest(repr(headings)),
+        'text': _digest(repr([page.word_count, sorted(page.word_counts.items())])),
+        'links': _digest('\x00'.join(page.anchors)),
+        'images': _digest(repr(images)),
+        'schema': _digest(repr(page.json_ld_blocks)),
+    }
+
+
+def diff_audits(previous, current):
+    """Structured diff between two audit results"""
+    if not previous:
+        return None
+
+    previous_artifacts = previous['fingerprint']['artifacts']
+    current_artifacts = current['fingerprint']['artifacts']
+
+    checks = {}
+    for name, result in current['checks'].items():
+        before = previous['checks'].get(name)
+        if before is None or before.get('status') != result.get('status') or \
+                before.get('details') != result.get('details'):
+            checks[name] = {'before': before, 'after': result}
+
+    page_info = {}
+    for key, value in current['page_info'].items():
+        if key == 'load_time':
+            continue
+        if previous['page_info'].get(key) != value:
+            page_info[key] = {'before': previous['page_info'].get(key), 'after': value}
+
+    return {
+        'previous_timestamp': previous.get('timestamp'),
+        'html_changed': previous['fingerprint']['html'] != current['fingerprint']['html'],
+        'changed_artifacts': sorted(k for k in current_artifacts if previous_artifacts.get(k) != current_artifacts[k]),
+        'checks': checks,
+        'page_info': page_info,
+    }
+
+
+class IncrementalAuditor:
+    """Re-audit pages, recomputing only the checks whose inputs changed"""
+
+    def __init__(self, analyzer=None, freshness=None):
+        self.analyzer = analyzer or SEOAnalyzer()
+        self.freshness = dict(NETWORK_FRESHNESS, **(freshness or {}))
+
+    def audit(self, url, previous=None):
+        """Audit a URL, reusing check results from `previous` where possible"""
+        start_time = time.time()
+        self.analyzer.start_deadline()
+
+        try:
+            response = self.analyzer._fetch_page(url)
+            body = response.content
+            html_hash = hash_html(body)
+
+            charset = content_charset(response.headers.get('content-type'))
+
+            page = None
+            if previous and previous['fingerprint']['html'] == html_hash:
+                # Byte-identical page (modulo whitespace): skip parsing entirely
+                artifacts = dict(previous['fingerprint']['artifacts'])
+                changed = set()
+            else:
+                page = self.analyzer.extract_facts(body, charset)
+                artifacts = hash_artifacts(page)
+                previous_artifacts = previous['fingerprint']['artifacts'] if previous else {}
+                changed = {k for k, v in artifacts.items() if previous_artifacts.get(k) != v}
+
+            now = time.time()
+            to_run = self._checks_to_run(previous, changed, now)
+
+            if to_run and page is None:
+                page = self.analyzer.extract_facts(body, charset)
+
+            checks = {}
+            checked_at = {}
+            for name in self.analyzer.CHECKS:
+                if name in to_run:
+                    checks[name] = self.analyzer.run_check(name, page, url)
+                    checked_at[name] = now
+                else:
+                    checks[name] = previous['checks'][name]
+                    checked_at[name] = previous['checked_at'][name]
+
+            load_time = time.time() - start_time
+            if changed or not previous:
+                page_info = self.analyzer._calculate_page_info(page, response, load_time)
+            else:
+                page_info = dict(previous['page_info'], load_time=round(load_time, 2))
+
+            result = {
+                'url': url,
+                'timestamp': datetime.now().isoformat(),
+                'checks': checks,
+                'page_info': page_info,
+                'fingerprint': {'html': html_hash, 'artifacts': artifacts},
+                'checked_at': checked_at,
+                'link_graph': self._link_graph(page, url, response, 'links' in changed or not previous),
+                'incremental': {
+                    'recomputed': [name for name in self.analyzer.CHECKS if name in to_run],
+                    'reused': [name for name in self.analyzer.CHECKS if name not in to_run],
+                },
+            }
+            result['diff'] = diff_audits(previous, result)
+            return result
+
+        except Exception as e:
+            raise Exception(f"Analysis failed: {str(e)}")
+
+    def _link_graph(self, page, url, response, links_changed):
+        """Record the page's links if they changed, otherwise just look up its metrics"""
+        link_graph = self.analyzer.link_graph
+        if link_graph is None:
+            return None
+        if links_changed:
+            return self.analyzer.record_links(page, url, response.url)
+        return link_graph.page_metrics(response.url or url)
+
+    def _checks_to_run(self, previous, changed, now):
+        """Names of checks that cannot be reused from the previous audit"""
+        if not previous:
+            return set(self.analyzer.CHECKS)
+
+        to_run = set()
+        for name, inputs in CHECK_INPUTS.items():
+            if name not in previous['checks'] or name not in previous.get('checked_at', {}):
+                to_run.add(name)
+            elif changed.intersection(inputs):
+                to_run.add(name)
+            elif name in self.freshness and now - previous['checked_at'][name] > self.freshness[name]:
+                to_run.add(name)
+        return to_run
@@ -0,0 +1,226 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections, connections
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import Job
+from .metrics_store import record_result
+from .scheduler import PRIORITIES, default_policy, record_wait
+from .seo_analyzer import SEOAnalyzer
+
+DEFAULT_VISIBILITY_TIMEOUT = 120  # seconds a lease stays valid without a heartbeat
+BACKOFF_BASE = 5  # seconds before the first retry, doubled on each attempt
+BACKOFF_MAX = 15 * 60
+
+
+def _run_audit(payload):
+    with SEOAnalyzer() as analyzer:
+        result = analyzer.analyze(payload['url'])
+    record_result(result)
+    return result
+
+
+def _run_sleep(payload):
+    # Used by the queue benchmark to measure queue overhead without network I/O
+    time.sleep(payload.get('seconds', 0))
+    return {'slept': payload.get('seconds', 0)}
+
+
+HANDLERS = {
+    'audit': _run_audit,
+    'sleep': _run_sleep,
+}
+
+
+def enqueue(kind, payload, max_attempts=5, delay=0, priority='scheduled', tenant=''):
+    """Add a job to the queue and return it"""
+    if kind not in HANDLERS:
+        raise Exception(f"Unknown job kind: {kind}")
+    if priority not in PRIORITIES:
+        raise Exception(f"Unknown priority: {priority}")
+
+    return Job.objects.create(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts,
+        priority=priority,
+        tenant=tenant,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with full jitter for the given attempt number"""
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _available(now):
+    """Jobs that are ready to run or whose lease has expired"""
+    return Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, lease_expires_at__lt=now)
+
+
+class JobQueue:
+    """Lease-based job queue stored in the Django database.
+
+    Jobs are leased in SchedulingPolicy order: priority class (with aging),
+    then the tenant's share of running jobs, then age; tenants at their
+    concurrency quota wait.
+    """
+
+    def __init__(self, worker_id=None, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT, batch_size=10, policy=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.batch_size = batch_size
+        self.policy = policy or default_policy()
+        self.lease_conflicts = 0
+
+    def _candidates(self, now):
+        """IDs of the next jobs to try, best first"""
+        waiting = []
+        for priority in PRIORITIES:
+            # The oldest few of each class; aging can lift any of them to the top
+            rows = Job.objects.filter(_available(now), priority=priority).order_by('run_after', 'id').values_list(
+                'id', 'tenant', 'run_after')[:self.batch_size]
+            waiting.extend((priority, tenant, (now - run_after).total_seconds(), job_id)
+                           for job_id, tenant, run_after in rows)
+        if not waiting:
+            return []
+
+        running = dict(Job.objects.filter(status=Job.RUNNING, lease_expires_at__gte=now).values_list(
+            'tenant').annotate(count=Count('id')).values_list('tenant', 'count'))
+        ranked = self.policy.order(waiting, running)
+
+        # Workers polling together would otherwise all race for the same head
+        # row, so shuffle among the equally ranked best jobs
+        best = [job_id for rank, job_id in ranked if rank[:2] == ranked[0][0][:2]][:self.batch_size]
+        random.shuffle(best)
+        return best + [job_id for _, job_id in ranked if job_id not in best]
+
+    def lease(self):
+        """Claim the next available job, or return None if the queue is empty"""
+        now = timezone.now()
+        candidates = self._candidates(now)
+
+        for job_id in candidates:
+            # Compare-and-swap: only one worker's UPDATE can match the row
+            claimed = Job.objects.filter(_available(now), id=job_id).update(
+                status=Job.RUNNING,
+                leased_by=self.worker_id,
+                lease_expires_at=now + timedelta(seconds=self.visibility_timeout),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                job = Job.objects.get(id=job_id)
+                if job.attempts > job.max_attempts:
+                    # Lease kept expiring (e.g. the worker crashed mid-job)
+                    self._dead_letter(job, job.last_error or 'Lease expired too many times')
+                    continue
+                record_wait(job.priority, (now - job.run_after).total_seconds())
+                return job
+            self.lease_conflicts += 1
+
+        return None
+
+    def heartbeat(self, job):
+        """Extend the lease on a job this worker holds; False if it was lost"""
+        return Job.objects.filter(id=job.id, status=Job.RUNNING, leased_by=self.worker_id).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=self.visibility_timeout)
+        ) == 1
+
+    def complete(self, job, result):
+        """Mark a leased job as succeeded"""
+        return Job.objects.filter(id=job.id, status=Job.RUNNING, leased_by=self.worker_id).update(
+            status=Job.SUCCEEDED,
+            result=result,
+            lease_expires_at=None,
+            finished_at=timezone.now(),
+        ) == 1
+
+    def fail(self, job, error):
+        """Schedule a retry with backoff, or dead-letter once attempts run out"""
+        if job.attempts >= job.max_attempts:
+            return self._dead_letter(job, error)
+
+        return Job.objects.filter(id=job.id, status=Job.RUNNING, leased_by=self.worker_id).update(
+            status=Job.QUEUED,
+            last_error=error,
+            leased_by="",
+            lease_expires_at=None,
+            run_after=timezone.now() + timedelta(seconds=backoff_delay(job.attempts)),
+        ) == 1
+
+    def _dead_letter(self, job, error):
+        logging.error(f"Job {job.id} moved to dead letter after {job.attempts} attempts: {error}")
+        return Job.objects.filter(id=job.id, leased_by=self.worker_id).update(
+            status=Job.DEAD,
+            last_error=error,
+            lease_expires_at=None,
+            finished_at=timezone.now(),
+        ) == 1
+
+
+class Worker:
+    """Lease jobs from the queue and run them until stopped"""
+
+    def __init__(self, queue=None, poll_interval=1.0):
+        self.queue = queue or JobQueue()
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.failed = 0
+
+    def run(self, stop_event=None, max_jobs=0, burst=False):
+        """Process jobs until stop_event is set, max_jobs is reached, or (burst) the queue is empty"""
+        while not (stop_event and stop_event.is_set()):
+            if max_jobs and self.processed + self.failed >= max_jobs:
+                break
+
+            close_old_connections()
+            job = self.queue.lease()
+            if job is None:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            self.run_job(job)
+
+    def run_job(self, job):
+        """Run one leased job, keeping its lease alive while it executes"""
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop_heartbeat), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = HANDLERS[job.kind](job.payload)
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+            self.failed += 1
+            self.queue.fail(job, str(e))
+        else:
+            self.processed += 1
+            if not self.queue.complete(job, result):
+                logging.warning(f"Job {job.id} finished after its lease was lost; result discarded")
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+    def _heartbeat(self, job, stop):
+        interval = self.queue.visibility_timeout / 3
+        try:
+            while not stop.wait(interval):
+                try:
+                    if not self.queue.heartbeat(job):
+                        return
+                except Exception as e:
+                    logging.warning(f"Heartbeat for job {job.id} failed: {str(e)}")
+        finally:
+            # This thread opened its own DB connection
+            connections.close_all()
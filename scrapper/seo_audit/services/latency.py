@@ -0,0 +1,160 @@
+import math
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+
+from .metrics import registry
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted sequence (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class HostLatency:
+    """Latency statistics for one host: an EWMA with mean deviation, plus a
+    window of recent samples used as a small quantile sketch."""
+
+    def __init__(self, window=128, alpha=0.125, beta=0.25):
+        self.alpha = alpha
+        self.beta = beta
+        self.samples = deque(maxlen=window)
+        self.ewma = None
+        self.deviation = 0.0
+        self.timeouts = 0
+
+    def add(self, seconds):
+        # Same smoothing as TCP's RTO estimator (RFC 6298)
+        if self.ewma is None:
+            self.ewma = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation = (1 - self.beta) * self.deviation + self.beta * abs(self.ewma - seconds)
+            self.ewma = (1 - self.alpha) * self.ewma + self.alpha * seconds
+        self.samples.append(seconds)
+
+    def percentile(self, pct):
+        return percentile(self.samples, pct)
+
+
+class LatencyTracker:
+    """Per-host response-time statistics shared by all transports in a process.
+
+    Timeouts derived from them sit between `min_timeout` and the caller's fixed
+    timeout, which acts as the ceiling: a fast host gets a tight timeout, a slow
+    one keeps the old behavior. Hosts with fewer than `min_samples` observations
+    use the fixed timeout unchanged.
+    """
+
+    def __init__(self, min_timeout=1.0, min_samples=5, timeout_multiplier=3, hedge_percentile=95,
+                 min_hedge_delay=0.05, window=128):
+        self.min_timeout = min_timeout
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge_percentile = hedge_percentile
+        self.window = window
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url):
+        return urlparse(url).netloc.lower()
+
+    def _stats(self, url):
+        host = self.host(url)
+        if host not in self._hosts:
+            self._hosts[host] = HostLatency(self.window)
+        return self._hosts[host]
+
+    def record(self, url, seconds):
+        """Record time to response headers for a completed request"""
+        with self._lock:
+            self._stats(url).add(seconds)
+
+    def record_timeout(self, url, timeout):
+        """A timed-out request counts as a sample at the timeout, so the next one is looser"""
+        with self._lock:
+            stats = self._stats(url)
+            stats.add(timeout)
+            stats.timeouts += 1
+
+    def timeout(self, url, default):
+        """Timeout for the next request to this host, never above `default`"""
+        with self._lock:
+            stats = self._hosts.get(self.host(url))
+            if stats is None or len(stats.samples) < self.min_samples:
+                return default
+            adaptive = max(stats.percentile(99) * self.timeout_multiplier, stats.ewma + 4 * stats.deviation)
+        return min(default, max(self.min_timeout, adaptive))
+
+    def hedge_delay(self, url):
+        """How long to wait before hedging a request to this host (None = don't hedge yet)"""
+        with self._lock:
+            stats = self._hosts.get(self.host(url))
+            if stats is None or len(stats.samples) < self.min_samples:
+                return None
+            # Hedging requests that are fast anyway only adds load
+            return max(self.min_hedge_delay, stats.percentile(self.hedge_percentile))
+
+    def snapshot(self):
+        """Per-host statistics, for diagnostics"""
+        with self._lock:
+            return {
+                host: {
+                    'samples': len(stats.samples),
+                    'ewma': round(stats.ewma, 4),
+                    'p50': round(stats.percentile(50), 4),
+                    f'p{self.hedge_percentile}': round(stats.percentile(self.hedge_percentile), 4),
+                    'p99': round(stats.percentile(99), 4),
+                    'timeouts': stats.timeouts,
+                }
+                for host, stats in self._hosts.items()
+            }
+
+    def collect(self):
+        """Metric samples for the registry"""
+        samples = []
+        for host, stats in self.snapshot().items():
+            for stat in ('ewma', 'p50', f'p{self.hedge_percentile}', 'p99'):
+                samples.append(('seo_audit_host_latency_seconds', {'host': host, 'stat': stat}, stats[stat]))
+            samples.append(('seo_audit_host_timeouts_total', {'host': host}, stats['timeouts']))
+        return samples
+
+
+class Deadline:
+    """Hard cap on the wall-clock time of one audit"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise requests.exceptions.Timeout(f"Audit deadline of {self.seconds}s exceeded")
+
+    def clamp(self, timeout):
+        """The smaller of `timeout` and the time left, raising once none is left"""
+        self.check()
+        return min(timeout, self.remaining())
+
+
+_tracker = LatencyTracker()
+registry.register_collector(_tracker.collect)
+
+
+def default_tracker():
+    """Process-wide tracker, so statistics outlive the per-audit transports"""
+    return _tracker
@@ -0,0 +1,341 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import numpy as np
+
+# Edge records are (source, target, audit sequence). Every audit of a page also
+# writes (source, NO_TARGET, sequence) so a page that drops all its links still
+# supersedes its older edges.
+EDGE_DTYPE = np.dtype([('src', np.int32), ('dst', np.int32), ('seq', np.int32)])
+NO_TARGET = -1
+
+
+def normalize_url(url):
+    """Canonical node key for a URL: no fragment, lowercase host, '/' for an empty path"""
+    url, _ = urldefrag(url)
+    parsed = urlparse(url)
+    return parsed._replace(netloc=parsed.netloc.lower(), path=parsed.path or '/').geturl()
+
+
+def extract_links(base_url, hrefs, same_host=False):
+    """Absolute http(s) URLs for the hrefs found on a page at base_url (only its own host's with same_host)"""
+    base_host = urlparse(base_url).netloc
+    links = []
+    for href in hrefs:
+        href = href.strip()
+        if not href or href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
+            continue
+        full_url = urljoin(base_url, href)
+        parsed_url = urlparse(full_url)
+        if parsed_url.scheme in ('http', 'https') and (not same_host or parsed_url.netloc == base_host):
+            links.append(full_url)
+    return links
+
+
+class LinkGraph:
+    """Directed graph in CSR form (indptr/indices) with vectorized analyses"""
+
+    def __init__(self, num_nodes, src, dst, audited=None):
+        # Deduplicate edges and drop self-links, then sort by source for CSR
+        keep = src != dst
+        keys = src[keep].astype(np.int64) * num_nodes + dst[keep]
+        keys.sort()
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        src = (keys // num_nodes).astype(np.int32)
+        self.indices = (keys % num_nodes).astype(np.int32)
+
+        self.num_nodes = num_nodes
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.indptr[1:])
+        self.out_degree = np.diff(self.indptr)
+        self.in_degree = np.bincount(self.indices, minlength=num_nodes)
+        # Nodes whose outgoing links we actually know (pages that were audited)
+        self.audited = audited if audited is not None else np.ones(num_nodes, dtype=bool)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.out_degree.nbytes + \
+            self.in_degree.nbytes + self.audited.nbytes
+
+    def pagerank(self, damping=0.85, tol=1e-8, max_iter=100):
+        """Power-iteration PageRank; dangling nodes redistribute rank uniformly"""
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0)
+
+        edge_src = np.repeat(np.arange(n, dtype=np.int32), self.out_degree)
+        dangling = self.out_degree == 0
+        inv_out = np.zeros(n)
+        np.divide(1.0, self.out_degree, out=inv_out, where=~dangling)
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            contrib = (rank * inv_out)[edge_src]
+            new_rank = np.bincount(self.indices, weights=contrib, minlength=n)
+            new_rank = damping * (new_rank + rank[dangling].sum() / n) + (1 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def click_depth(self, root):
+        """Breadth-first link distance from root (-1 where unreachable)"""
+        depth = np.full(self.num_nodes, -1, dtype=np.int32)
+        if root is None or root >= self.num_nodes:
+            return depth
+
+        depth[root] = 0
+        frontier = np.array([root], dtype=np.int64)
+        level = 0
+        while len(frontier):
+            level += 1
+            # Gather every neighbour of the frontier in one shot
+            starts = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - starts
+            total = counts.sum()
+            if not total:
+                break
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            neighbours = self.indices[offsets]
+            depth[neighbours[depth[neighbours] == -1]] = level
+            frontier = np.flatnonzero(depth == level)
+        return depth
+
+    def orphans(self, root=None):
+        """Audited pages with no incoming internal links (the home page excluded)"""
+        mask = self.audited & (self.in_degree == 0)
+        if root is not None:
+            mask[root] = False
+        return np.flatnonzero(mask)
+
+    def dead_ends(self):
+        """Audited pages with no outgoing internal links"""
+        return np.flatnonzero(self.audited & (self.out_degree == 0))
+
+
+class SiteLinkGraph:
+    """Append-only on-disk edge log for one host, with a cached CSR build"""
+
+    def __init__(self, path, host, rebuild_interval=60, small_graph_edges=200000):
+        self.path = path
+        self.host = host
+        self.rebuild_interval = rebuild_interval
+        self.small_graph_edges = small_graph_edges
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._urls = []
+        self._ids = {}
+        self._nodes_offset = 0
+        self._graph = None
+        self._analysis = None
+        self._built_at = 0
+        self._built_edges = -1
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load_nodes(self):
+        """Read node URLs appended (possibly by other processes) since the last load"""
+        try:
+            with open(self._file('nodes.txt'), 'rb') as nodes:
+                nodes.seek(self._nodes_offset)
+                for line in nodes:
+                    if not line.endswith(b'\n'):
+                        break
+                    self._ids[line[:-1].decode('utf-8')] = len(self._urls)
+                    self._urls.append(line[:-1].decode('utf-8'))
+                    self._nodes_offset += len(line)
+        except FileNotFoundError:
+            pass
+
+    def _node_ids(self, urls, nodes_file):
+        ids = []
+        for url in urls:
+            if url not in self._ids:
+                self._ids[url] = len(self._urls)
+                self._urls.append(url)
+                line = url.encode('utf-8') + b'\n'
+                nodes_file.write(line)
+                self._nodes_offset += len(line)
+            ids.append(self._ids[url])
+        return ids
+
+    def record_page(self, url, links):
+        """Replace a page's outgoing internal links"""
+        with self._lock, open(self._file('.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._load_nodes()
+                with open(self._file('nodes.txt'), 'ab') as nodes_file:
+                    ids = self._node_ids([normalize_url(url)] + [normalize_url(link) for link in links], nodes_file)
+
+                with open(self._file('edges.bin'), 'ab') as edges_file:
+                    seq = edges_file.tell() // EDGE_DTYPE.itemsize
+                    records = np.empty(len(ids), dtype=EDGE_DTYPE)
+                    records['src'] = ids[0]
+                    records['dst'] = [NO_TARGET] + ids[1:]
+                    records['seq'] = seq
+                    edges_file.write(records.tobytes())
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def graph(self):
+        """Current graph and its analyses, rebuilt when stale"""
+        with self._lock:
+            try:
+                edge_count = os.path.getsize(self._file('edges.bin')) // EDGE_DTYPE.itemsize
+            except FileNotFoundError:
+                edge_count = 0
+
+            stale = edge_count != self._built_edges and (
+                self._graph is None
+                or edge_count <= self.small_graph_edges
+                or time.time() - self._built_at >= self.rebuild_interval
+            )
+            if stale:
+                self._build(edge_count)
+            return self._graph, self._analysis
+
+    def _build(self, edge_count):
+        self._load_nodes()
+        num_nodes = len(self._urls)
+
+        records = np.fromfile(self._file('edges.bin'), dtype=EDGE_DTYPE, count=edge_count) \
+            if edge_count else np.empty(0, dtype=EDGE_DTYPE)
+
+        # Keep only each page's most recent audit
+        latest_seq = np.full(num_nodes, -1, dtype=np.int32)
+        np.maximum.at(latest_seq, records['src'], records['seq'])
+        current = (records['seq'] == latest_seq[records['src']]) & (records['dst'] != NO_TARGET)
+
+        graph = LinkGraph(num_nodes, records['src'][current], records['dst'][current], audited=latest_seq >= 0)
+        root = self._ids.get(normalize_url(f"https://{self.host}/"))
+        if root is None:
+            root = self._ids.get(normalize_url(f"http://{self.host}/"))
+        rank = graph.pagerank()
+        rank_order = np.argsort(-rank, kind='stable')
+        positions = np.empty(num_nodes, dtype=np.int64)
+        positions[rank_order] = np.arange(1, num_nodes + 1)
+
+        self._graph = graph
+        self._analysis = {
+            'root': root,
+            'pagerank': rank,
+            'rank_order': rank_order,
+            'positions': positions,
+            'depth': graph.click_depth(root),
+            'orphans': set(graph.orphans(root).tolist()),
+        }
+        self._built_at = time.time()
+        self._built_edges = edge_count
+
+    def page_metrics(self, url):
+        """Link-structure facts for one page, from the current graph"""
+        graph, analysis = self.graph()
+        node = self._ids.get(normalize_url(url))
+        if graph is None or node is None or node >= graph.num_nodes:
+            return None
+
+        rank = analysis['pagerank']
+        return {
+            'pagerank': round(float(rank[node] * graph.num_nodes), 4),  # 1.0 = site average
+            'pagerank_position': int(analysis['positions'][node]),
+            'click_depth': int(analysis['depth'][node]) if analysis['root'] is not None else None,
+            'incoming_links': int(graph.in_degree[node]),
+            'outgoing_links': int(graph.out_degree[node]),
+            'is_orphan': node in analysis['orphans'],
+            'is_dead_end': bool(graph.audited[node] and graph.out_degree[node] == 0),
+            'site_pages': int(graph.audited.sum()),
+            'site_links': graph.num_edges,
+        }
+
+    def site_report(self, limit=50):
+        """Site-wide view: top pages by PageRank, orphans, dead ends, depth distribution"""
+        graph, analysis = self.graph()
+        if graph is None:
+            return None
+
+        depth = analysis['depth'][graph.audited]
+        reachable = depth[depth >= 0]
+        return {
+            'pages': int(graph.audited.sum()),
+            'nodes': graph.num_nodes,
+            'links': graph.num_edges,
+            'top_pages': [
+                {'url': self._urls[n], 'pagerank': round(float(analysis['pagerank'][n] * graph.num_nodes), 4)}
+                for n in analysis['rank_order'][:limit]
+            ],
+            'orphans': [self._urls[n] for n in sorted(analysis['orphans'])[:limit]],
+            'dead_ends': [self._urls[n] for n in graph.dead_ends()[:limit]],
+            'unreachable_pages': int((depth == -1).sum()),
+            'depth_histogram': np.bincount(reachable).tolist() if len(reachable) else [],
+        }
+
+
+class LinkGraphRegistry:
+    """One SiteLinkGraph per host under a common directory"""
+
+    def __init__(self, path, **options):
+        self.path = str(path)
+        self.options = options
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def site(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._sites:
+                self._sites[host] = SiteLinkGraph(os.path.join(self.path, host.replace(':', '_')), host,
+                                                  **self.options)
+            return self._sites[host]
+
+    def record_page(self, url, links):
+        """Store a page's internal links and return its link metrics"""
+        try:
+            site = self.site(url)
+            site.record_page(url, links)
+            return site.page_metrics(url)
+        except Exception as e:
+            logging.error(f"Link graph update failed for {url}: {str(e)}")
+            return None
+
+    def page_metrics(self, url):
+        try:
+            return self.site(url).page_metrics(url)
+        except Exception as e:
+            logging.error(f"Link graph lookup failed for {url}: {str(e)}")
+            return None
+
+    def site_report(self, url, limit=50):
+        """Site-wide report for the host of `url`, or None if it was never audited"""
+        host = urlparse(url).netloc.lower()
+        if not host or not os.path.isdir(os.path.join(self.path, host.replace(':', '_'))):
+            return None
+        return self.site(url).site_report(limit)
+
+
+_registry = None
+
+
+def default_link_graph():
+    """Process-wide registry at settings.SEO_AUDIT_LINK_GRAPH_DIR, or None if disabled"""
+    global _registry
+    from django.conf import settings
+
+    path = getattr(settings, 'SEO_AUDIT_LINK_GRAPH_DIR', None)
+    if not path:
+        return None
+    if _registry is None or _registry.path != str(path):
+        _registry = LinkGraphRegistry(path)
+    return _registry
@@ -0,0 +1,56 @@
+import threading
+
+
+class MetricsRegistry:
+    """In-process counters plus collectors that report gauges on demand.
+
+    Each process (web worker, audit_worker child) keeps its own registry;
+    samples are (name, labels, value) and render as JSON or Prometheus text.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, collector):
+        """collector() returns an iterable of (name, labels, value) samples"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def samples(self):
+        with self._lock:
+            counters = list(self._counters.items())
+            collectors = list(self._collectors)
+
+        samples = [(name, dict(labels), value) for (name, labels), value in counters]
+        for collector in collectors:
+            samples.extend(collector())
+        return sorted(samples, key=lambda sample: (sample[0], sorted(sample[1].items())))
+
+    def snapshot(self):
+        """{metric name: [{'labels': {...}, 'value': v}, ...]}"""
+        result = {}
+        for name, labels, value in self.samples():
+            result.setdefault(name, []).append({'labels': labels, 'value': value})
+        return result
+
+    def render_text(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for name, labels, value in self.samples():
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in sorted(labels.items()))
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
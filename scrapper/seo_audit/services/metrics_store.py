@@ -0,0 +1,352 @@
+import fcntl
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import numpy as np
+
+# page_info fields stored as columns, with their on-disk dtype
+METRIC_COLUMNS = {
+    'title_length': np.int32,
+    'meta_description_length': np.int32,
+    'word_count': np.int32,
+    'images_count': np.int32,
+    'internal_links': np.int32,
+    'external_links': np.int32,
+    'h1_count': np.int32,
+    'load_time': np.float32,
+}
+
+# Bookkeeping columns
+INDEX_COLUMNS = {
+    'timestamp': np.float64,
+    'host_id': np.int32,
+    'url_hash': np.uint64,
+    'url_offset': np.int64,
+}
+
+COLUMNS = dict(METRIC_COLUMNS, **INDEX_COLUMNS)
+
+INITIAL_CAPACITY = 4096
+
+# Upper bounds on query parameters that size a response
+MAX_BINS = 1000
+MAX_LIMIT = 10000
+
+
+def check_range(value, name, minimum, maximum):
+    """Return value, raising ValueError if it lies outside [minimum, maximum] (or is NaN)"""
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def _locked(method):
+    """Run a method under the store's thread lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def url_hash(url):
+    return np.uint64(int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little'))
+
+
+class PageMetricsStore:
+    """Append-only columnar store of page_info metrics, memory-mapped from disk.
+
+    Each metric is a fixed-width NumPy column in its own file, so aggregate
+    queries are vectorized scans over contiguous arrays. URLs are kept in a
+    side file and addressed by offset; hosts are dictionary-encoded.
+
+    The flock on writes only orders processes; within a process, one store is
+    shared by request threads, so refreshes, reads and appends also hold a
+    thread lock (remapping swaps _columns and _count under readers).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._columns = {}
+        self._capacity = 0
+        self._count = 0
+        self._hosts = []
+        self._host_ids = {}
+        self._meta_mtime = None
+        self._latest = None  # cached "latest audit of its URL" mask, valid for _count rows
+        self._lock = threading.RLock()
+        self._refresh()
+
+    # -- storage ---------------------------------------------------------
+
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    @_locked
+    def _refresh(self):
+        """Pick up rows appended by other processes"""
+        try:
+            mtime = os.stat(self._meta_path()).st_mtime_ns
+        except FileNotFoundError:
+            if not self._columns:
+                self._map_columns(INITIAL_CAPACITY)
+            return
+
+        if mtime == self._meta_mtime:
+            return
+
+        with open(self._meta_path()) as f:
+            meta = json.load(f)
+        self._meta_mtime = mtime
+        self._count = meta['count']
+        self._hosts = meta['hosts']
+        self._host_ids = {host: i for i, host in enumerate(self._hosts)}
+        if meta['capacity'] != self._capacity:
+            self._map_columns(meta['capacity'])
+
+    def _map_columns(self, capacity):
+        for name, dtype in COLUMNS.items():
+            column_path = self._column_path(name)
+            size = capacity * np.dtype(dtype).itemsize
+            with open(column_path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._columns[name] = np.memmap(column_path, dtype=dtype, mode='r+', shape=(capacity,))
+        self._capacity = capacity
+
+    def _write_meta(self):
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'count': self._count, 'capacity': self._capacity, 'hosts': self._hosts}, f)
+        os.replace(tmp_path, self._meta_path())
+        self._meta_mtime = os.stat(self._meta_path()).st_mtime_ns
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(os.path.join(self.path, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # -- writes ------------------------------------------------------------
+
+    def append(self, url, page_info, timestamp=None):
+        """Append one page's metrics"""
+        self.append_many([(url, page_info, timestamp)])
+
+    def append_many(self, rows):
+        """Append (url, page_info, timestamp) rows in one locked batch"""
+        with self._write_lock():
+            needed = self._count + len(rows)
+            if needed > self._capacity:
+                capacity = self._capacity
+                while capacity < needed:
+                    capacity *= 2
+                self._map_columns(capacity)
+
+            with open(os.path.join(self.path, 'urls.txt'), 'ab') as urls:
+                for offset, (url, page_info, timestamp) in enumerate(rows):
+                    row = self._count + offset
+                    host = urlparse(url).netloc.lower()
+                    if host not in self._host_ids:
+                        self._host_ids[host] = len(self._hosts)
+                        self._hosts.append(host)
+
+                    for name in METRIC_COLUMNS:
+                        self._columns[name][row] = page_info.get(name) or 0
+                    self._columns['timestamp'][row] = timestamp or time.time()
+                    self._columns['host_id'][row] = self._host_ids[host]
+                    self._columns['url_hash'][row] = url_hash(url)
+                    self._columns['url_offset'][row] = urls.tell()
+                    urls.write(url.encode('utf-8') + b'\n')
+
+            for column in self._columns.values():
+                column.flush()
+            self._count = needed
+            self._write_meta()
+
+    # -- reads -------------------------------------------------------------
+
+    @_locked
+    def __len__(self):
+        self._refresh()
+        return self._count
+
+    @_locked
+    def column(self, name):
+        """Read-only view of a column's filled rows"""
+        if name not in COLUMNS:
+            raise Exception(f"Unknown metric: {name}")
+        self._refresh()
+        return self._columns[name][:self._count]
+
+    @_locked
+    def rows(self, host=None, since=None, latest=True):
+        """Indices of rows matching the filters (latest audit per URL by default)"""
+        self._refresh()
+        mask = np.ones(self._count, dtype=bool)
+
+        if host is not None:
+            host_id = self._host_ids.get(host.lower())
+            if host_id is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.column('host_id') == host_id
+        if since is not None:
+            mask &= self.column('timestamp') >= since
+
+        if latest:
+            mask &= self._latest_mask()
+        return np.flatnonzero(mask)
+
+    def _latest_mask(self):
+        """Boolean mask of rows that hold the most recent audit of their URL"""
+        if self._latest is None or len(self._latest) != self._count:
+            # np.unique returns first occurrences, so search the reversed column
+            hashes = self.column('url_hash')[::-1]
+            _, first = np.unique(hashes, return_index=True)
+            latest = np.zeros(self._count, dtype=bool)
+            latest[self._count - 1 - first] = True
+            self._latest = latest
+        return self._latest
+
+    @_locked
+    def values(self, metric, **filters):
+        return self.column(metric)[self.rows(**filters)]
+
+    @_locked
+    def url(self, row):
+        with open(os.path.join(self.path, 'urls.txt'), 'rb') as urls:
+            urls.seek(int(self.column('url_offset')[row]))
+            return urls.readline().rstrip(b'\n').decode('utf-8')
+
+    @_locked
+    def summary(self, metric, **filters):
+        values = self.values(metric, **filters)
+        if not len(values):
+            return {'count': 0}
+        return {
+            'count': int(len(values)),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': round(float(values.mean()), 3),
+            'std': round(float(values.std()), 3),
+        }
+
+    @_locked
+    def percentiles(self, metric, percentiles=(50, 90, 95, 99), **filters):
+        for p in percentiles:
+            check_range(p, 'percentile', 0, 100)
+        values = self.values(metric, **filters)
+        if not len(values):
+            return {}
+        results = np.percentile(values, percentiles)
+        return {str(p): round(float(v), 3) for p, v in zip(percentiles, results)}
+
+    @_locked
+    def histogram(self, metric, bins=20, **filters):
+        check_range(bins, 'bins', 1, MAX_BINS)
+        values = self.values(metric, **filters)
+        if not len(values):
+            return {'counts': [], 'edges': []}
+        counts, edges = np.histogram(values, bins=bins)
+        return {'counts': counts.tolist(), 'edges': [round(float(e), 3) for e in edges]}
+
+    @_locked
+    def threshold(self, metric, minimum=None, maximum=None, limit=100, **filters):
+        """URLs whose metric lies outside [minimum, maximum], most extreme first"""
+        check_range(limit, 'limit', 0, MAX_LIMIT)
+        rows = self.rows(**filters)
+        values = self.column(metric)[rows]
+
+        mask = np.zeros(len(rows), dtype=bool)
+        if minimum is not None:
+            mask |= values < minimum
+        if maximum is not None:
+            mask |= values > maximum
+
+        matched_rows = rows[mask]
+        matched_values = values[mask]
+        # Distance outside the interval, whichever side of it the value is on
+        distance = np.zeros(len(matched_values))
+        if minimum is not None:
+            distance = np.maximum(distance, minimum - matched_values.astype(np.float64))
+        if maximum is not None:
+            distance = np.maximum(distance, matched_values.astype(np.float64) - maximum)
+        order = np.argsort(-distance, kind='stable')[:limit]
+
+        return {
+            'count': int(mask.sum()),
+            'pages': [{'url': self.url(matched_rows[i]), 'value': float(matched_values[i])} for i in order],
+        }
+
+    @_locked
+    def group_by_host(self, metric, percentile=95, **filters):
+        """Per-host count, mean and a percentile in a single vectorized pass"""
+        check_range(percentile, 'percentile', 0, 100)
+        filters.pop('host', None)
+        rows = self.rows(**filters)
+        if not len(rows):
+            return {}
+
+        host_ids = self.column('host_id')[rows]
+        values = self.column(metric)[rows].astype(np.float64)
+
+        counts = np.bincount(host_ids, minlength=len(self._hosts))
+        sums = np.bincount(host_ids, weights=values, minlength=len(self._hosts))
+
+        # Sort by (host, value); each host's percentile is an offset into its run
+        order = np.lexsort((values, host_ids))
+        sorted_values = values[order]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        present = np.flatnonzero(counts)
+        positions = starts[present] + np.ceil(percentile / 100 * counts[present]).astype(np.int64) - 1
+        host_percentiles = sorted_values[np.maximum(positions, starts[present])]
+
+        return {
+            self._hosts[host_id]: {
+                'count': int(counts[host_id]),
+                'mean': round(float(sums[host_id] / counts[host_id]), 3),
+                f'p{percentile}': float(value),
+            }
+            for host_id, value in zip(present, host_percentiles)
+        }
+
+
+_store = None
+
+
+def get_store():
+    """Process-wide store at settings.SEO_AUDIT_METRICS_DIR, or None if disabled"""
+    global _store
+    from django.conf import settings
+
+    path = getattr(settings, 'SEO_AUDIT_METRICS_DIR', None)
+    if not path:
+        return None
+    if _store is None or _store.path != str(path):
+        _store = PageMetricsStore(str(path))
+    return _store
+
+
+def record_result(result):
+    """Append an audit result's page_info to the store; never fails the audit"""
+    try:
+        store = get_store()
+        if store is not None:
+            store.append(result['url'], result['page_info'])
+    except Exception as e:
+        logging.error(f"Could not record page metrics for {result.get('url')}: {str(e)}")
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from django.db import close_old_connections, connections
+
+from ..models import Website
+from .incremental import IncrementalAuditor
+from .metrics import registry
+from .latency import percentile
+from .metrics_store import record_result
+from .scheduler import AuditScheduler
+from .seo_analyzer import SEOAnalyzer
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+# Jitter never moves a start by more than this fraction of the site's interval
+MAX_JITTER_FRACTION = 0.1
+
+
+def phase(key, interval):
+    """Fixed offset in [0, interval) seconds for key, taken from a hash of it.
+
+    Sites sharing an interval are spread uniformly over it, and a site keeps
+    its offset across restarts and as other sites are added or removed.
+    """
+    digest = hashlib.sha1(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * interval
+
+
+def next_slot(key, interval, after, jitter=0, rng=random):
+    """First start of key's slot grid (phase + k * interval) later than `after`, plus random jitter"""
+    if not interval or interval < 1:
+        raise ValueError(f"interval must be at least 1 second, not {interval!r}")
+    offset = phase(key, interval)
+    slots = math.floor((after.timestamp() - offset) / interval) + 1
+    start = offset + slots * interval + rng.uniform(0, min(jitter, interval * MAX_JITTER_FRACTION))
+    return datetime.fromtimestamp(start, tz=timezone.utc)
+
+
+def _percentiles(samples):
+    stats = {f'p{pct}': percentile(samples, pct) for pct in (50, 95, 99, 100)}
+    return {stat: None if value is None else round(value, 4) for stat, value in stats.items()}
+
+
+def _monitored():
+    return Website.objects.filter(enabled=True).exclude(url='')
+
+
+class Monitor:
+    """Re-audits every enabled Website on its own interval.
+
+    Each site starts at a fixed offset within its interval (see phase()) plus
+    up to `jitter` seconds, so a large fleet spreads its audits evenly instead
+    of firing together. Due sites are claimed with a compare-and-swap on
+    next_run_at, so several monitors can share one database. At most
+    `concurrency` audits run at once, one per host, and audits of the same
+    host start at least `host_delay` seconds apart. Audits are incremental (see
+    IncrementalAuditor): an unchanged page is not parsed again, and only the
+    network checks older than their `freshness` are re-run.
+    """
+
+    def __init__(self, concurrency=8, host_delay=5, jitter=60, queue_timeout=3600, analyzer_factory=None,
+                 freshness=None, metrics=None, window=1024, rng=None):
+        self.concurrency = concurrency
+        self.host_delay = host_delay
+        self.jitter = jitter
+        self.analyzer_factory = analyzer_factory or SEOAnalyzer
+        self.freshness = freshness
+        self.metrics = metrics or registry
+        self.rng = rng or random.Random()
+        self.scheduler = AuditScheduler(capacity=concurrency, tenant_limit=1, aging=0,
+                                        queue_timeout=queue_timeout, metrics=self.metrics)
+        # Threads waiting out a host delay don't hold a slot, so allow some extra
+        self.max_in_flight = concurrency * 4
+        self._in_flight = 0
+        self._host_next = {}  # host -> monotonic time its next audit may start
+        self._drift = deque(maxlen=window)
+        self._runs = deque(maxlen=window)
+        self._invalid = set()  # (site id, interval) pairs already reported as unschedulable
+        self._lock = threading.Lock()
+
+    # -- scheduling ----------------------------------------------------------
+
+    def _next_slot(self, site, after):
+        """next_slot for site, or None (reported once) if its interval can't be scheduled"""
+        try:
+            return next_slot(site.url, site.interval, after, self.jitter, self.rng)
+        except ValueError as e:
+            if (site.id, site.interval) not in self._invalid:
+                self._invalid.add((site.id, site.interval))
+                logging.error(f"Not monitoring {site.url}: {str(e)}")
+            return None
+
+    def schedule_new(self, now):
+        """Give enabled sites without a next run their first slot"""
+        for site in _monitored().filter(next_run_at__isnull=True).only('id', 'url', 'interval'):
+            first = self._next_slot(site, now)
+            if first is not None:
+                Website.objects.filter(id=site.id, next_run_at__isnull=True).update(next_run_at=first)
+
+    def claim_due(self, now, limit):
+        """Claim up to `limit` due sites, moving each one's next_run_at to its next slot.
+
+        Returns (site, planned start) pairs. A site that fell several intervals
+        behind is audited once and then resumes its grid, rather than catching up.
+        """
+        claimed = []
+        due = _monitored().filter(next_run_at__lte=now).order_by('next_run_at')[:limit]
+        for site in due:
+            planned = site.next_run_at
+            following = self._next_slot(site, now)
+            if following is None:
+                # Unscheduled until its interval is fixed (schedule_new retries it)
+                Website.objects.filter(id=site.id, next_run_at=planned).update(next_run_at=None)
+                continue
+            if Website.objects.filter(id=site.id, next_run_at=planned).update(next_run_at=following):
+                claimed.append((site, planned))
+        return claimed
+
+    def _host_wait(self, host):
+        """Seconds until an audit of host may start, reserving that start"""
+        with self._lock:
+            now = time.monotonic()
+            if len(self._host_next) > 10000:
+                self._host_next = {h: t for h, t in self._host_next.items() if t > now}
+            start = max(now, self._host_next.get(host, 0))
+            self._host_next[host] = start + self.host_delay
+        return start - now
+
+    # -- running -------------------------------------------------------------
+
+    def run(self, stop_event=None, poll_interval=5.0, once=False):
+        """Audit due sites until stop_event is set, or (once) until the currently due sites are done"""
+        with ThreadPoolExecutor(self.max_in_flight, thread_name_prefix='monitor') as executor:
+            while not (stop_event and stop_event.is_set()):
+                close_old_connections()
+                now = datetime.now(timezone.utc)
+                self.schedule_new(now)
+                with self._lock:
+                    free = self.max_in_flight - self._in_flight
+                claimed = self.claim_due(now, free) if free > 0 else []
+                for site, planned in claimed:
+                    with self._lock:
+                        self._in_flight += 1
+                    executor.submit(self._run_site, site, planned)
+
+                if once and not claimed:
+                    with self._lock:
+                        if not self._in_flight:
+                            break
+                if stop_event:
+                    stop_event.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+
+    def _run_site(self, site, planned):
+        try:
+            return self.audit_site(site, planned)
+        except Exception as e:
+            logging.error(f"Monitoring {site.url} failed: {str(e)}")
+            return FAILED
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            connections.close_all()  # this worker thread's own connection
+
+    def audit_site(self, site, planned):
+        """Audit one claimed site and store the outcome on it; returns the outcome"""
+        host = urlsplit(site.url).hostname or ''
+        wait = self._host_wait(host)
+        if wait > 0:
+            time.sleep(wait)
+
+        fields = {'last_error': ''}
+        started, start_time = datetime.now(timezone.utc), time.time()
+        try:
+            with self.scheduler.slot('scheduled', host):
+                started, start_time = datetime.now(timezone.utc), time.time()
+                self._observe_drift((started - planned).total_seconds())
+                outcome, changes = self._audit(site)
+                fields.update(changes)
+        except Exception as e:
+            outcome = FAILED
+            fields['last_error'] = str(e)
+            logging.error(f"Monitoring {site.url} failed: {str(e)}")
+
+        duration = time.time() - start_time
+        self._observe_run(outcome, duration)
+        Website.objects.filter(id=site.id).update(last_run_at=started, last_status=outcome,
+                                                  last_duration=round(duration, 4), **fields)
+        return outcome
+
+    def _audit(self, site):
+        """(outcome, fields to update) for one audit of site.
+
+        The outcome is UNCHANGED when neither the page nor any check result
+        changed since the previous audit, even if stale network checks ran.
+        """
+        previous = site.last_result if site.last_result and 'fingerprint' in site.last_result else None
+        with self.analyzer_factory() as analyzer:
+            result = IncrementalAuditor(analyzer, freshness=self.freshness).audit(site.url, previous=previous)
+
+        if result['incremental']['recomputed']:
+            record_result(result)
+        diff = result['diff']
+        outcome = CHANGED if diff is None or diff['html_changed'] or diff['checks'] else UNCHANGED
+        return outcome, {'content_hash': result['fingerprint']['html'], 'last_result': result}
+
+    # -- metrics ---------------------------------------------------------------
+
+    def _observe_drift(self, seconds):
+        with self._lock:
+            self._drift.append(seconds)
+        self.metrics.inc('seo_audit_monitor_drift_seconds_sum', seconds)
+        self.metrics.inc('seo_audit_monitor_drift_seconds_count')
+
+    def _observe_run(self, outcome, seconds):
+        with self._lock:
+            self._runs.append(seconds)
+        self.metrics.inc('seo_audit_monitor_runs_total', outcome=outcome)
+        self.metrics.inc('seo_audit_monitor_run_seconds_sum', seconds, outcome=outcome)
+        self.metrics.inc('seo_audit_monitor_run_seconds_count', outcome=outcome)
+
+    def snapshot(self):
+        with self._lock:
+            drift, runs, in_flight = list(self._drift), list(self._runs), self._in_flight
+        return {
+            'in_flight': in_flight,
+            'drift': _percentiles(drift),
+            'run': _percentiles(runs),
+        }
+
+    def collect(self):
+        """Metric samples for the registry"""
+        snapshot = self.snapshot()
+        samples = [('seo_audit_monitor_in_flight', {}, snapshot['in_flight'])]
+        for name in ('drift', 'run'):
+            for stat, value in snapshot[name].items():
+                if value is not None:
+                    samples.append((f'seo_audit_monitor_{name}_seconds', {'stat': stat}, value))
+        return samples
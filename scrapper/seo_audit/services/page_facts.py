@@ -0,0 +1,304 @@
+import codecs
+import re
+from collections import Counter
+from html.parser import HTMLParser
+
+WORD_RE = re.compile(r'\w+')
+TRAILING_WORD_RE = re.compile(r'\w+\Z')
+SITEMAP_HREF_RE = re.compile(r'sitemap.*\.xml', re.I)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+# Bytes buffered to look for a BOM or <meta charset> before decoding starts
+SNIFF_BYTES = 4096
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+NON_TEXT_ELEMENTS = ('script', 'style', 'template')
+HEADINGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+
+class PageFacts:
+    """The flat facts every SEO check and page_info needs, independent of how
+    the page was parsed.
+
+    `title`, `meta_description`, `meta_robots` and `canonical` are None when
+    the tag is absent (or, for the title, has no single text child, matching
+    BeautifulSoup's `.string`).
+    """
+
+    def __init__(self):
+        self.title = None
+        self.meta_description = None
+        self.meta_robots = None
+        self.canonical = None
+        self.heading_levels = []
+        self.first_h1_text = None
+        self.images = 0
+        self.images_missing_alt = 0
+        self.images_empty_alt = 0
+        self.anchors = []
+        self.has_xml_link = False
+        self.json_ld_blocks = 0
+        self.word_count = 0
+        self.word_counts = Counter()
+
+    @property
+    def h1_count(self):
+        return self.heading_levels.count(1)
+
+    @property
+    def has_sitemap_link(self):
+        return self.has_xml_link or any(SITEMAP_HREF_RE.search(href) for href in self.anchors)
+
+    def add_words(self, text):
+        words = WORD_RE.findall(text)
+        self.word_count += len(words)
+        self.word_counts.update(word.lower() for word in words)
+
+    def as_dict(self):
+        """Comparable representation, used by the parity tests"""
+        return {name: dict(value) if isinstance(value, Counter) else value for name, value in vars(self).items()}
+
+    @classmethod
+    def from_soup(cls, soup):
+        """Facts from a BeautifulSoup tree (the tree-based engine)"""
+        facts = cls()
+
+        title_tag = soup.find('title')
+        facts.title = title_tag.string if title_tag and title_tag.string else None
+
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        if meta_desc:
+            facts.meta_description = meta_desc.get('content', '')
+        robots_meta = soup.find('meta', {'name': 'robots'})
+        if robots_meta:
+            facts.meta_robots = robots_meta.get('content', '')
+        canonical = soup.find('link', {'rel': 'canonical'})
+        if canonical:
+            facts.canonical = canonical.get('href') or None
+
+        headings = soup.find_all(HEADINGS)
+        facts.heading_levels = [int(h.name[1]) for h in headings]
+        first_h1 = soup.find('h1')
+        facts.first_h1_text = first_h1.get_text() if first_h1 else None
+
+        for img in soup.find_all('img'):
+            facts.images += 1
+            alt = img.get('alt')
+            if alt is None:
+                facts.images_missing_alt += 1
+            elif not alt.strip():
+                facts.images_empty_alt += 1
+
+        facts.anchors = [link.get('href') for link in soup.find_all('a', href=True)]
+        facts.has_xml_link = soup.find('link', {'type': 'application/xml'}) is not None
+        facts.json_ld_blocks = len(soup.find_all('script', {'type': 'application/ld+json'}))
+        facts.add_words(soup.get_text())
+        return facts
+
+
+class FactParser(HTMLParser):
+    """Single forward pass over the HTML that collects PageFacts without a tree.
+
+    Feed it text or bytes chunks as they arrive (feed / feed_bytes), then call
+    close() for the facts. Memory stays flat apart from the facts themselves:
+    the tokenizer only buffers an unfinished tag, and text is reduced to word
+    counts as it streams past.
+    """
+
+    def __init__(self, charset=None):
+        super().__init__(convert_charrefs=True)
+        self.facts = PageFacts()
+        self.charset = charset
+        self.encoding = None         # the one actually used, once sniffed
+        self.started = False
+        self._head = b''
+        self._decoder = None
+        self._skip_depth = 0         # inside script/style/template
+        self._title_state = None     # None: not seen, 'open', 'done'
+        self._title_parts = []
+        self._title_simple = True
+        self._seen_canonical = False
+        self._h1_depth = 0
+        self._h1_parts = None
+        self._word_tail = ''
+
+    # -- input -------------------------------------------------------------
+
+    def feed_bytes(self, chunk):
+        self.started = True
+        if self._decoder is None:
+            # Hold the start of the document until its encoding can be sniffed
+            self._head += chunk
+            if len(self._head) < SNIFF_BYTES:
+                return
+            chunk = self._start_decoding()
+        self.feed(self._decoder.decode(chunk))
+
+    def _start_decoding(self):
+        """Create the decoder for the buffered head; returns the head"""
+        head, self._head = self._head, b''
+        self.encoding = sniff_charset(head, self.charset)
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        return head
+
+    def feed(self, data):
+        self.started = True
+        super().feed(data)
+
+    def close(self):
+        if self._decoder is None and self._head:
+            head = self._start_decoding()
+            super().feed(self._decoder.decode(head))
+        if self._decoder is not None:
+            super().feed(self._decoder.decode(b'', final=True))
+        super().close()
+        self._flush_words()
+        if self._title_state == 'open':
+            self._finish_title()
+        if self._h1_parts is not None and self.facts.first_h1_text is None:
+            self.facts.first_h1_text = ''.join(self._h1_parts)
+        return self.facts
+
+    # -- text --------------------------------------------------------------
+
+    def _text(self, data):
+        if self._skip_depth:
+            return
+        if self._title_state == 'open':
+            self._title_parts.append(data)
+        if self._h1_depth and self.facts.first_h1_text is None:
+            self._h1_parts.append(data)
+
+        # Hold back a trailing partial word, it may continue in the next chunk
+        data = self._word_tail + data
+        match = TRAILING_WORD_RE.search(data)
+        if match:
+            self._word_tail = match.group()
+            data = data[:match.start()]
+        else:
+            self._word_tail = ''
+        self.facts.add_words(data)
+
+    def _flush_words(self):
+        self.facts.add_words(self._word_tail)
+        self._word_tail = ''
+
+    def handle_data(self, data):
+        self._text(data)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA['):
+            self._text(data[6:])
+
+    def handle_comment(self, data):
+        if self._title_state == 'open':
+            self._title_simple = False
+
+    # -- tags --------------------------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs)
+        if tag in NON_TEXT_ELEMENTS:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs)
+
+    def _start(self, tag, attrs):
+        facts = self.facts
+        attrs = {name: '' if value is None else value for name, value in attrs}
+
+        if self._title_state == 'open':
+            self._title_simple = False
+
+        if tag == 'title':
+            if self._title_state is None:
+                self._title_state = 'open'
+        elif tag == 'meta':
+            name = attrs.get('name')
+            if name == 'description' and facts.meta_description is None:
+                facts.meta_description = attrs.get('content', '')
+            elif name == 'robots' and facts.meta_robots is None:
+                facts.meta_robots = attrs.get('content', '')
+        elif tag == 'link':
+            if 'canonical' in attrs.get('rel', '').split() and not self._seen_canonical:
+                self._seen_canonical = True
+                facts.canonical = attrs.get('href') or None
+            if attrs.get('type') == 'application/xml':
+                facts.has_xml_link = True
+        elif tag in HEADINGS:
+            facts.heading_levels.append(int(tag[1]))
+            if tag == 'h1' and facts.first_h1_text is None:
+                if self._h1_parts is None:
+                    self._h1_parts = []
+                self._h1_depth += 1
+        elif tag == 'img':
+            facts.images += 1
+            alt = attrs.get('alt')
+            if alt is None:
+                facts.images_missing_alt += 1
+            elif not alt.strip():
+                facts.images_empty_alt += 1
+        elif tag == 'a':
+            if 'href' in attrs:
+                facts.anchors.append(attrs['href'])
+        elif tag == 'script':
+            if attrs.get('type') == 'application/ld+json':
+                facts.json_ld_blocks += 1
+
+    def handle_endtag(self, tag):
+        if tag in NON_TEXT_ELEMENTS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == 'title' and self._title_state == 'open':
+            self._finish_title()
+        elif tag == 'h1' and self._h1_depth:
+            self._h1_depth -= 1
+            if not self._h1_depth and self.facts.first_h1_text is None:
+                self.facts.first_h1_text = ''.join(self._h1_parts)
+
+    def _finish_title(self):
+        self._title_state = 'done'
+        title = ''.join(self._title_parts)
+        self.facts.title = title if self._title_simple and title else None
+
+
+def sniff_charset(head, charset=None):
+    """Encoding for a document starting with the bytes `head`.
+
+    A BOM wins, then the HTTP `charset`, then a <meta> charset declaration.
+    Undeclared documents are UTF-8 when `head` is valid UTF-8 and otherwise
+    windows-1252, the usual legacy encoding.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    declared = [charset]
+    match = META_CHARSET_RE.search(head)
+    if match:
+        declared.append(match.group(1).decode('ascii'))
+    for name in declared:
+        try:
+            if name:
+                return codecs.lookup(name).name
+        except LookupError:
+            pass
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+
+def parse_facts(html, charset=None):
+    """PageFacts for a complete document (str or bytes) in one streaming pass"""
+    parser = FactParser(charset)
+    if isinstance(html, bytes):
+        parser.feed_bytes(html)
+    else:
+        parser.feed(html)
+    return parser.close()
@@ -0,0 +1,238 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from .metrics import registry
+
+# Extra seconds the caller waits past task_timeout before assuming the worker is stuck
+RESULT_GRACE = 5
+
+
+class PoolBusyError(Exception):
+    """Raised when every slot of the pool stays taken for longer than queue_timeout"""
+
+
+class TaskTimeoutError(Exception):
+    """Raised inside a worker process when a task runs past its time limit"""
+
+
+# -- worker process side -----------------------------------------------------
+
+_analyzers = {}
+
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C
+    # Import the parsing stack up front, so the first real task doesn't pay for it
+    from . import seo_analyzer  # noqa: F401
+
+
+def _on_alarm(signum, frame):
+    raise TaskTimeoutError("Page processing exceeded its time limit")
+
+
+def _ping(_):
+    time.sleep(0.05)  # long enough for the tasks to spread over all workers
+    return os.getpid()
+
+
+def _run_task(time_limit, func, args):
+    # Pool workers run tasks on their main thread, so SIGALRM can interrupt them
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def process_page(content, url, charset, engine, names):
+    """Runs in a worker: extract PageFacts from a raw body and run the named on-page checks"""
+    from .seo_analyzer import SEOAnalyzer
+
+    if engine not in _analyzers:
+        # Workers only parse, so they hold no transport, breakers or link graph files
+        _analyzers[engine] = SEOAnalyzer.parse_only(engine)
+    analyzer = _analyzers[engine]
+
+    page = analyzer.extract_facts(content, charset)
+    return page, {name: analyzer.run_check(name, page, url) for name in names}
+
+
+# -- web process side --------------------------------------------------------
+
+class ProcessPool:
+    """Warm, bounded pool of worker processes for the CPU-bound parse and check stage.
+
+    Parsing holds the GIL, so under a threaded server concurrent audits of large
+    pages would share one core; here they spread over `processes` cores. At most
+    `max_pending` tasks are queued or running: callers wait up to `queue_timeout`
+    for a slot and then get PoolBusyError. Each worker is replaced after
+    `max_tasks_per_child` tasks to bound its memory, and a task is interrupted
+    after `task_timeout` seconds. A worker that doesn't even respond to that
+    (stuck in C code) gets its pool retired: new tasks go to a fresh pool and
+    the old one is terminated once its other tasks had time to finish.
+    """
+
+    def __init__(self, processes=None, max_tasks_per_child=200, max_pending=None, task_timeout=30,
+                 queue_timeout=5, metrics=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_pending = max_pending or self.processes * 2
+        self.task_timeout = task_timeout
+        self.queue_timeout = queue_timeout
+        self.metrics = metrics or registry
+        self.retired = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._in_flight = {}  # pool -> tasks submitted and not yet finished
+        self._lock = threading.Lock()
+        # Spawned, not forked: forking a multi-threaded web process can copy held locks
+        self._context = multiprocessing.get_context('spawn')
+
+    def _current_pool(self):
+        # Callers hold self._lock
+        if self._pool is None:
+            self._pool = self._context.Pool(self.processes, initializer=_init_worker,
+                                            maxtasksperchild=self.max_tasks_per_child)
+            self._in_flight[self._pool] = 0
+        return self._pool
+
+    def start(self):
+        """Start the workers and wait until each has imported the parsing stack"""
+        with self._lock:
+            pool = self._current_pool()
+        pool.map(_ping, range(self.processes), chunksize=1)
+        return self
+
+    def process_page(self, content, url, charset, engine, names):
+        """(PageFacts, {check name: result}) for a downloaded body, computed in a worker"""
+        return self.submit(process_page, content, url, charset, engine, names)
+
+    def submit(self, func, *args):
+        """Run func(*args) in a worker and return its result, raising its exception"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.metrics.inc('seo_audit_pool_tasks_total', outcome='rejected')
+            raise PoolBusyError(f"Server busy: all {self.max_pending} page processing slots are in use")
+
+        with self._lock:
+            pool = self._current_pool()
+            self._in_flight[pool] += 1
+
+        def finished(_):
+            self._finished(pool)
+
+        try:
+            result = pool.apply_async(_run_task, (self.task_timeout, func, args), callback=finished,
+                                      error_callback=finished)
+        except Exception:
+            self._finished(pool)
+            raise
+
+        try:
+            value = result.get(self.task_timeout + RESULT_GRACE)
+        except multiprocessing.TimeoutError:
+            self.metrics.inc('seo_audit_pool_tasks_total', outcome='timeout')
+            self._retire(pool)
+            raise Exception(f"Page processing did not finish within {self.task_timeout}s")
+        except TaskTimeoutError:
+            self.metrics.inc('seo_audit_pool_tasks_total', outcome='timeout')
+            raise Exception(f"Page processing did not finish within {self.task_timeout}s")
+        except Exception:
+            self.metrics.inc('seo_audit_pool_tasks_total', outcome='error')
+            raise
+
+        self.metrics.inc('seo_audit_pool_tasks_total', outcome='ok')
+        return value
+
+    def _finished(self, pool):
+        # Runs on the pool's result thread; a terminated pool's slots were already returned
+        with self._lock:
+            if not self._in_flight.get(pool):
+                return
+            self._in_flight[pool] -= 1
+        self._slots.release()
+
+    def _retire(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.retired += 1
+        logging.error(f"Retiring process pool after a task ignored its {self.task_timeout}s time limit")
+        threading.Thread(target=self._reap, args=(pool,), daemon=True).start()
+
+    def _reap(self, pool):
+        pool.close()
+        # Every other task is interrupted by task_timeout at the latest
+        deadline = time.monotonic() + self.task_timeout + RESULT_GRACE
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._in_flight.get(pool, 0) <= 1:
+                    break
+            time.sleep(0.1)
+        pool.terminate()
+        pool.join()
+
+        with self._lock:
+            stranded = self._in_flight.pop(pool, 0)
+        for _ in range(stranded):
+            self._slots.release()
+
+    def pending(self):
+        with self._lock:
+            return sum(self._in_flight.values())
+
+    def snapshot(self):
+        return {
+            'processes': self.processes,
+            'max_pending': self.max_pending,
+            'pending': self.pending(),
+            'retired_pools': self.retired,
+        }
+
+    def collect(self):
+        """Metric samples for the registry"""
+        snapshot = self.snapshot()
+        return [
+            ('seo_audit_pool_processes', {}, snapshot['processes']),
+            ('seo_audit_pool_pending', {}, snapshot['pending']),
+            ('seo_audit_pool_max_pending', {}, snapshot['max_pending']),
+            ('seo_audit_pool_retired_total', {}, snapshot['retired_pools']),
+        ]
+
+    def close(self):
+        with self._lock:
+            pools = list(self._in_flight)
+            self._pool = None
+            self._in_flight.clear()
+        for pool in pools:
+            pool.terminate()
+            pool.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """Process-wide pool configured from settings.SEO_AUDIT_PROCESS_POOL, or None if disabled.
+
+    Started on first use and kept warm for the life of the process.
+    """
+    global _pool
+    from django.conf import settings
+
+    options = getattr(settings, 'SEO_AUDIT_PROCESS_POOL', None)
+    if options is None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool(**options).start()
+            registry.register_collector(_pool.collect)
+            atexit.register(_pool.close)
+    return _pool
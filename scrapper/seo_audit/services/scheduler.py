@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from .latency import percentile
+from .metrics import registry
+
+# Priority classes, highest first
+PRIORITIES = ('interactive', 'scheduled', 'bulk')
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a request waits longer than queue_timeout for an audit slot"""
+
+
+class SchedulingPolicy:
+    """Orders waiting audits: by priority class, then by the tenant's share of
+    running audits relative to its weight, then by time waited.
+
+    Every `aging` seconds of waiting promotes a request by one class, so bulk
+    work is never starved by a steady stream of interactive requests. Tenants
+    already running `tenant_limit` audits (or their entry in `tenant_limits`)
+    are skipped until one of their audits finishes.
+    """
+
+    def __init__(self, aging=10, tenant_limit=None, tenant_limits=None, tenant_weights=None):
+        self.aging = aging
+        self.tenant_limit = tenant_limit
+        self.tenant_limits = tenant_limits or {}
+        self.tenant_weights = tenant_weights or {}
+
+    def level(self, priority, waited):
+        """Effective class index (0 = interactive) after `waited` seconds"""
+        level = PRIORITIES.index(priority)
+        if self.aging:
+            level -= int(waited // self.aging)
+        return max(0, level)
+
+    def limit(self, tenant):
+        return self.tenant_limits.get(tenant, self.tenant_limit)
+
+    def order(self, waiting, running):
+        """(rank, item) pairs for the entries of `waiting` ((priority, tenant,
+        waited seconds, item) tuples) that may start now, best first.
+        `running` maps tenant -> audits running."""
+        ranked = []
+        for priority, tenant, waited, item in waiting:
+            limit = self.limit(tenant)
+            if limit is not None and running.get(tenant, 0) >= limit:
+                continue
+            share = running.get(tenant, 0) / self.tenant_weights.get(tenant, 1)
+            ranked.append(((self.level(priority, waited), share, -waited), item))
+        ranked.sort(key=lambda entry: entry[0])
+        return ranked
+
+
+class Ticket:
+    """One request for an audit slot"""
+
+    def __init__(self, priority, tenant, enqueued_at):
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued_at = enqueued_at
+        self.granted_at = None
+
+    @property
+    def waited(self):
+        return self.granted_at - self.enqueued_at
+
+
+class AuditScheduler:
+    """Admits at most `capacity` concurrent audits in this process.
+
+    Requests queue as Tickets and are granted slots in SchedulingPolicy
+    order. `class_limits` caps the slots one class may hold (e.g. bulk at
+    capacity - 2), so some are always free for interactive requests when they
+    arrive. acquire()/release() block; submit()/dispatch()/finish() are the
+    same steps without blocking, which lets the simulation drive the
+    scheduler on a virtual clock.
+    """
+
+    def __init__(self, capacity=8, class_limits=None, queue_timeout=30, policy=None, metrics=None,
+                 clock=time.monotonic, window=1024, **policy_options):
+        self.capacity = capacity
+        self.class_limits = class_limits or {}
+        self.queue_timeout = queue_timeout
+        self.policy = policy or SchedulingPolicy(**policy_options)
+        self.metrics = metrics or registry
+        self.clock = clock
+        self._waiting = []
+        self._running = Counter()        # tenant -> granted tickets
+        self._running_class = Counter()  # priority -> granted tickets
+        self._waits = {priority: deque(maxlen=window) for priority in PRIORITIES}
+        self._cond = threading.Condition(threading.RLock())
+
+    # -- non-blocking steps ------------------------------------------------
+
+    def submit(self, priority='interactive', tenant=''):
+        if priority not in PRIORITIES:
+            raise Exception(f"Unknown priority: {priority}")
+        ticket = Ticket(priority, tenant, self.clock())
+        with self._cond:
+            self._waiting.append(ticket)
+        return ticket
+
+    def dispatch(self):
+        """Grant free slots to waiting tickets; returns the tickets granted"""
+        granted = []
+        with self._cond:
+            while self._waiting and sum(self._running_class.values()) < self.capacity:
+                now = self.clock()
+                candidates = [
+                    (ticket.priority, ticket.tenant, now - ticket.enqueued_at, ticket)
+                    for ticket in self._waiting
+                    if self._running_class[ticket.priority] < self.class_limits.get(ticket.priority, self.capacity)
+                ]
+                ranked = self.policy.order(candidates, self._running)
+                if not ranked:
+                    break
+                ticket = ranked[0][1]
+                self._waiting.remove(ticket)
+                ticket.granted_at = now
+                self._running[ticket.tenant] += 1
+                self._running_class[ticket.priority] += 1
+                self._observe(ticket)
+                granted.append(ticket)
+            if granted:
+                self._cond.notify_all()
+        return granted
+
+    def finish(self, ticket):
+        with self._cond:
+            self._running[ticket.tenant] -= 1
+            if not self._running[ticket.tenant]:
+                del self._running[ticket.tenant]
+            self._running_class[ticket.priority] -= 1
+
+    def cancel(self, ticket):
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+
+    # -- blocking API --------------------------------------------------------
+
+    def acquire(self, priority='interactive', tenant='', timeout=None):
+        """Wait for a slot; raises QueueTimeoutError after `timeout` (default queue_timeout) seconds"""
+        ticket = self.submit(priority, tenant)
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        with self._cond:
+            self.dispatch()
+            while ticket.granted_at is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.cancel(ticket)
+                    self.metrics.inc('seo_audit_scheduler_rejected_total', priority=priority)
+                    raise QueueTimeoutError(f"Server busy: no audit slot became free within "
+                                            f"{self.queue_timeout if timeout is None else timeout}s")
+                self._cond.wait(remaining)
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            self.finish(ticket)
+            self.dispatch()
+
+    @contextmanager
+    def slot(self, priority='interactive', tenant='', timeout=None):
+        ticket = self.acquire(priority, tenant, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # -- metrics ---------------------------------------------------------------
+
+    def _observe(self, ticket):
+        self._waits[ticket.priority].append(ticket.waited)
+        record_wait(ticket.priority, ticket.waited, self.metrics)
+
+    def snapshot(self):
+        with self._cond:
+            waiting = Counter(ticket.priority for ticket in self._waiting)
+            snapshot = {}
+            for priority in PRIORITIES:
+                snapshot[priority] = {'waiting': waiting[priority], 'running': self._running_class[priority]}
+                for pct in (50, 95, 99):
+                    wait = percentile(self._waits[priority], pct)
+                    snapshot[priority][f'wait_p{pct}'] = None if wait is None else round(wait, 4)
+            return snapshot
+
+    def collect(self):
+        """Metric samples for the registry"""
+        samples = []
+        for priority, stats in self.snapshot().items():
+            samples.append(('seo_audit_scheduler_waiting', {'priority': priority}, stats['waiting']))
+            samples.append(('seo_audit_scheduler_running', {'priority': priority}, stats['running']))
+            for stat in ('wait_p50', 'wait_p95', 'wait_p99'):
+                if stats[stat] is not None:
+                    samples.append(('seo_audit_scheduler_wait_seconds',
+                                    {'priority': priority, 'stat': stat[5:]}, stats[stat]))
+        return samples
+
+
+def record_wait(priority, seconds, metrics=None):
+    """Count one queue wait of a priority class (also used by the job queue)"""
+    metrics = metrics or registry
+    metrics.inc('seo_audit_queue_wait_seconds_sum', seconds, priority=priority)
+    metrics.inc('seo_audit_queue_wait_seconds_count', priority=priority)
+
+
+def _options():
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, 'SEO_AUDIT_SCHEDULER', None)
+    except ImportError:
+        pass
+    return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def default_scheduler():
+    """Process-wide scheduler configured from settings.SEO_AUDIT_SCHEDULER, or None if disabled"""
+    global _scheduler
+    options = _options()
+    if options is None:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = AuditScheduler(**options)
+            registry.register_collector(_scheduler.collect)
+    return _scheduler
+
+
+def default_policy():
+    """The policy part of settings.SEO_AUDIT_SCHEDULER, for ordering queued jobs"""
+    options = _options() or {}
+    return SchedulingPolicy(**{name: options[name] for name in
+                               ('aging', 'tenant_limit', 'tenant_limits', 'tenant_weights') if name in options})
+
+
+@contextmanager
+def audit_slot(priority='interactive', tenant=''):
+    """Hold a slot of the default scheduler for the duration of an audit (no-op when disabled)"""
+    scheduler = default_scheduler()
+    if scheduler is None:
+        yield None
+        return
+    with scheduler.slot(priority, tenant) as ticket:
+        yield ticket
@@ -1,87 +1,272 @@
 import logging
-import re
 import time
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from .archive import NotArchivedError
+from .circuit_breaker import HostUnavailableError
+from .link_graph import default_link_graph, extract_links
+from .page_facts import FactParser, PageFacts, parse_facts
+from .process_pool import PoolBusyError
+from .transport import content_charset, make_transport
+
+# 'tree' parses into a BeautifulSoup tree and reads the facts from it;
+# 'stream' collects them in one pass while the body downloads.
+ENGINES = ('tree', 'stream')
+
 
 class SEOAnalyzer:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    # Check name -> whether the check also needs the page URL. Each name maps
+    # onto a `_check_<name>` method.
+    CHECKS = {
+        'title_tag': False,
+        'meta_description': False,
+        'h1_tag': False,
+        'header_hierarchy': False,
+        'content_length': False,
+        'keyword_density': False,
+        'alt_text': False,
+        'canonical_url': True,
+        'meta_robots': False,
+        'xml_sitemap': True,
+        'schema_markup': False,
+        'broken_links': True,
+    }
+
+    # Checks that make their own HTTP requests
+    NETWORK_CHECKS = ('xml_sitemap', 'broken_links')
+
+    def __init__(self, transport=None, link_graph=None, engine=None, pool=None):
+        self.engine = _checked_engine(engine)
+        # With a ProcessPool, parsing and the on-page checks run in its worker
+        # processes; otherwise everything runs in this one.
+        self.pool = pool
+        self._owns_transport = transport is None
+        self.transport = transport or make_transport()
+        self.session = self.transport.session
+        self.link_graph = link_graph or default_link_graph()
         self.timeout = 30
         self.max_content_size = 10 * 1024 * 1024  # 10MB
-
-    def analyze(self, url):
-        """Main analysis method"""
+        self.max_audit_time = 60  # hard cap across the page fetch and all network checks
+
+    @classmethod
+    def parse_only(cls, engine=None):
+        """Analyzer for extract_facts and the on-page checks alone.
+
+        It has no transport, session or link graph, so it opens no connections
+        or link graph files; the network checks and analyze() can't run on it.
+        """
+        analyzer = cls.__new__(cls)
+        analyzer.engine = _checked_engine(engine)
+        analyzer.pool = analyzer.transport = analyzer.session = analyzer.link_graph = None
+        analyzer._owns_transport = False
+        return analyzer
+
+    def close(self):
+        """Release the connections of a transport this analyzer created itself"""
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze(self, url, names=None, response=None):
+        """Main analysis method; `response` is an already fetched page to analyze instead of fetching url"""
         start_time = time.time()
+        self.start_deadline()
 
         try:
-            # Fetch page content
-            response = self._fetch_page(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Fetch and parse page content, running the on-page checks
+            names = list(names or self.CHECKS)
+            response, page, checks = self._process_page(url, names, response)
 
-            # Extract page content
-            page_content = self._extract_page_content(soup, response)
-
-
-            # Perform all SEO checks
-            checks = {
-                'title_tag': self._check_title_tag(soup),
-                'meta_description': self._check_meta_description(soup),
-                'h1_tag': self._check_h1_tag(soup),
-                'header_hierarchy': self._check_header_hierarchy(soup),
-                'content_length': self._check_content_length(soup),
-                'keyword_density': self._check_keyword_density(soup),
-                'alt_text': self._check_alt_text(soup),
-                'canonical_url': self._check_canonical_url(soup, url),
-                'meta_robots': self._check_meta_robots(soup),
-                'xml_sitemap': self._check_xml_sitemap(soup, url),
-                'schema_markup': self._check_schema_markup(soup),
-                'broken_links': self._check_broken_links(soup, url)
-            }
+            # Perform the network checks
+            for name in names:
+                if name in self.NETWORK_CHECKS:
+                    checks[name] = self.run_check(name, page, url)
+            checks = {name: checks[name] for name in names}
 
             # Calculate page info
-            page_info = self._calculate_page_info(soup, response, time.time() - start_time)
+            page_info = self._calculate_page_info(page, response, time.time() - start_time)
 
             return {
                 'url': url,
                 'timestamp': datetime.now().isoformat(),
                 'checks': checks,
-                'page_info': page_info
+                'page_info': page_info,
+                'link_graph': self.record_links(page, url, response.url),
+                'transfer': getattr(response, 'transfer', None)
             }
 
+        except PoolBusyError:
+            raise
+        except Exception as e:
+            raise Exception(f"Analysis failed: {str(e)}")
+
+    def iter_analyze(self, url, names=None):
+        """Analyze a page, yielding events as results become available.
+
+        Yields a `page_info` event right after parsing, a `check` event for each
+        on-page check, a `check` event for each network check as it resolves,
+        and finally a `summary` event holding the same result as analyze().
+        """
+        start_time = time.time()
+        self.start_deadline()
+
+        names = list(names or self.CHECKS)
+        try:
+            response, page, on_page = self._process_page(url, names)
+        except PoolBusyError:
+            raise
         except Exception as e:
             raise Exception(f"Analysis failed: {str(e)}")
 
-    def _fetch_page(self, url):
-        """Fetch page content with proper error handling"""
+        network_names = [name for name in names if name in self.NETWORK_CHECKS]
+
+        with ThreadPoolExecutor(max_workers=max(len(network_names), 1)) as executor:
+            # Start the slow checks first so they overlap with the on-page ones
+            futures = {executor.submit(self.run_check, name, page, url): name for name in network_names}
+
+            page_info = self._calculate_page_info(page, response, time.time() - start_time)
+            yield {'event': 'page_info', 'data': page_info}
+
+            checks = {}
+            for name in names:
+                if name not in self.NETWORK_CHECKS:
+                    checks[name] = on_page[name]
+                    yield {'event': 'check', 'name': name, 'data': checks[name]}
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    checks[name] = future.result()
+                except Exception as e:
+                    logging.error(f"{name} check failed: {str(e)}")
+                    checks[name] = {
+                        'status': 'failed',
+                        'details': 'Check could not be completed',
+                        'issue': str(e),
+                        'recommendation': 'Try running the audit again'
+                    }
+                yield {'event': 'check', 'name': name, 'data': checks[name]}
+
+        yield {
+            'event': 'summary',
+            'data': {
+                'url': url,
+                'timestamp': datetime.now().isoformat(),
+                'checks': {name: checks[name] for name in names},
+                'page_info': page_info,
+                'link_graph': self.record_links(page, url, response.url),
+                'transfer': getattr(response, 'transfer', None),
+                'total_time': round(time.time() - start_time, 2)
+            }
+        }
+
+    def start_deadline(self):
+        """Start the per-audit time budget shared by every request the transport makes"""
+        return self.transport.start_deadline(self.max_audit_time)
+
+    def record_links(self, page, url, final_url=None):
+        """Add the page's internal links to the site link graph and return its link metrics.
+
+        After a redirect the page is recorded under `final_url`: its links are
+        resolved against it and belong to its host's graph.
+        """
+        if self.link_graph is None:
+            return None
+        source = final_url or url
+        return self.link_graph.record_page(source, self._extract_internal_links(self.page_facts(page), source))
+
+    def page_facts(self, page):
+        """PageFacts for a parsed page (a BeautifulSoup tree is converted)"""
+        if isinstance(page, PageFacts):
+            return page
+        return PageFacts.from_soup(page)
+
+    def run_checks(self, page, url, names=None):
+        """Run the named checks (all of them by default) against a parsed page"""
+        page = self.page_facts(page)
+        checks = {}
+        for name in (names or self.CHECKS):
+            checks[name] = self.run_check(name, page, url)
+        return checks
+
+    def run_check(self, name, page, url):
+        """Run a single check by name against PageFacts or a BeautifulSoup tree"""
+        if name not in self.CHECKS:
+            raise Exception(f"Unknown check: {name}")
+
+        page = self.page_facts(page)
+        check = getattr(self, f'_check_{name}')
+        if self.CHECKS[name]:
+            return check(page, url)
+        return check(page)
+
+    def _process_page(self, url, names, response=None):
+        """Fetch a page (unless `response` is given) and run the on-page checks among `names`.
+
+        Returns (response, PageFacts, {check name: result}). The page is always
+        fetched here; with a pool, only the raw body goes to a worker process.
+        """
+        on_page = [name for name in names if name not in self.NETWORK_CHECKS]
+        if response is not None and self.pool is None:
+            page = self.extract_facts(response.content, content_charset(response.headers.get('content-type')))
+            return response, page, {name: self.run_check(name, page, url) for name in on_page}
+        if self.pool is not None:
+            response = response or self._fetch_page(url)
+            charset = content_charset(response.headers.get('content-type'))
+            page, checks = self.pool.process_page(response.content, url, charset, self.engine, on_page)
+            return response, page, checks
+
+        response, page = self._load_page(url)
+        return response, page, {name: self.run_check(name, page, url) for name in on_page}
+
+    def extract_facts(self, content, charset=None):
+        """PageFacts for a downloaded body with the configured engine"""
+        if self.engine == 'tree':
+            return PageFacts.from_soup(BeautifulSoup(content, 'html.parser', from_encoding=charset))
+        return parse_facts(content, charset)
+
+    def _load_page(self, url):
+        """Fetch a page and extract its facts with the configured engine"""
+        if self.engine == 'tree':
+            response = self._fetch_page(url)
+            return response, self.extract_facts(response.content, content_charset(response.headers.get('content-type')))
+
+        parser = FactParser()
+        response = self._fetch_page(url, parser)
+        if not parser.started:
+            # The fetcher didn't stream (e.g. an already downloaded body)
+            parser.charset = content_charset(response.headers.get('content-type'))
+            parser.feed_bytes(response.content)
+        return response, parser.close()
+
+    def _fetch_page(self, url, parser=None):
+        """Fetch page content with proper error handling.
+
+        With a FactParser, body chunks are fed to it while they download.
+        """
+        validate = self._validate_response
+        on_chunk = None
+        if parser is not None:
+            def validate(response):
+                self._validate_response(response)
+                parser.charset = content_charset(response.headers.get('content-type'))
+            on_chunk = parser.feed_bytes
+
         try:
-            response = self.session.get(
-                url,
-                timeout=self.timeout,
-                allow_redirects=True,
-                stream=True
-            )
-            response.raise_for_status()
-
-            # Check content type
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' not in content_type:
-                raise Exception("URL does not return HTML content")
-
-            # Check content size
-            content_length = response.headers.get('content-length')
-            if content_length and int(content_length) > self.max_content_size:
-                raise Exception("Page content too large")
-
-            return response
+            return self.transport.fetch(url, self.timeout, self.max_content_size, validate=validate,
+                                        on_chunk=on_chunk)
 
+        except (HostUnavailableError, NotArchivedError) as e:
+            raise Exception(str(e))
         except requests.exceptions.Timeout:
             raise Exception("Request timeout - page took too long to load")
         except requests.exceptions.ConnectionError:
@@ -91,21 +276,21 @@ class SEOAnalyzer:
         except Exception as e:
             raise Exception(f"Failed to fetch page: {str(e)}")
 
-    def _extract_page_content(self, soup, response):
-        """Extract and clean page content"""
-        # Remove script and style elements
-        text_soup = BeautifulSoup(str(soup), 'html.parser')
-        # Remove script and style elements
-        for script in text_soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
+    def _validate_response(self, response):
+        """Reject non-HTML or oversized responses before downloading the body"""
+        # Check content type
+        content_type = response.headers.get('content-type', '').lower()
+        if 'text/html' not in content_type:
+            raise Exception("URL does not return HTML content")
 
-        return text_soup.get_text()
+        # Check content size
+        content_length = response.headers.get('content-length')
+        if content_length and int(content_length) > self.max_content_size:
+            raise Exception("Page content too large")
 
-    def _check_title_tag(self, soup):
+    def _check_title_tag(self, page):
         """Check title tag presence and length"""
-        title_tag = soup.find('title')
-
-        if not title_tag or not title_tag.string:
+        if not page.title:
             return {
                 'status': 'failed',
                 'details': 'Title tag missing',
@@ -113,7 +298,7 @@ class SEOAnalyzer:
                 'recommendation': 'Add a descriptive title tag between 50-60 characters'
             }
 
-        title_length = len(title_tag.string.strip())
+        title_length = len(page.title.strip())
 
         if title_length < 30:
             return {
@@ -135,11 +320,9 @@ class SEOAnalyzer:
                 'details': f'Title tag present with {title_length} characters'
             }
 
-    def _check_meta_description(self, soup):
+    def _check_meta_description(self, page):
         """Check meta description presence and length"""
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-
-        if not meta_desc or not meta_desc.get('content'):
+        if not page.meta_description:
             return {
                 'status': 'failed',
                 'details': 'Meta description missing',
@@ -147,7 +330,7 @@ class SEOAnalyzer:
                 'recommendation': 'Add a compelling meta description between 150-160 characters'
             }
 
-        desc_length = len(meta_desc.get('content', '').strip())
+        desc_length = len(page.meta_description.strip())
 
         if desc_length < 120:
             return {
@@ -169,11 +352,11 @@ class SEOAnalyzer:
                 'details': f'Meta description present with {desc_length} characters'
             }
 
-    def _check_h1_tag(self, soup):
+    def _check_h1_tag(self, page):
         """Check H1 tag presence and uniqueness"""
-        h1_tags = soup.find_all('h1')
+        h1_count = page.h1_count
 
-        if not h1_tags:
+        if not h1_count:
             return {
                 'status': 'failed',
                 'details': 'No H1 tag found',
@@ -181,15 +364,15 @@ class SEOAnalyzer:
                 'recommendation': 'Add a single, descriptive H1 tag to the page'
             }
 
-        if len(h1_tags) > 1:
+        if h1_count > 1:
             return {
                 'status': 'failed',
-                'details': f'Multiple H1 tags found ({len(h1_tags)})',
+                'details': f'Multiple H1 tags found ({h1_count})',
                 'issue': 'Page has multiple H1 tags',
                 'recommendation': 'Use only one H1 tag per page'
             }
 
-        h1_text = h1_tags[0].get_text().strip()
+        h1_text = page.first_h1_text.strip()
         h1_length = len(h1_text)
 
         if h1_length < 10:
@@ -212,11 +395,11 @@ class SEOAnalyzer:
                 'details': f'Single H1 tag found with {h1_length} characters'
             }
 
-    def _check_header_hierarchy(self, soup):
+    def _check_header_hierarchy(self, page):
         """Check proper header hierarchy (H1-H6)"""
-        headers = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+        header_levels = page.heading_levels
 
-        if not headers:
+        if not header_levels:
             return {
                 'status': 'failed',
                 'details': 'No header tags found',
@@ -224,8 +407,6 @@ class SEOAnalyzer:
                 'recommendation': 'Add proper header hierarchy starting with H1'
             }
 
-        header_levels = [int(h.name[1]) for h in headers]
-
         # Check if starts with H1
         if header_levels[0] != 1:
             return {
@@ -250,15 +431,12 @@ class SEOAnalyzer:
 
         return {
             'status': 'passed',
-            'details': f'Proper header hierarchy with {len(headers)} headers'
+            'details': f'Proper header hierarchy with {len(header_levels)} headers'
         }
 
-    def _check_content_length(self, soup):
+    def _check_content_length(self, page):
         """Check content length and basic readability"""
-        # Extract main content text
-        text_content = soup.get_text()
-        words = re.findall(r'\b\w+\b', text_content.lower())
-        word_count = len(words)
+        word_count = page.word_count
 
         if word_count < 300:
             return {
@@ -278,12 +456,11 @@ class SEOAnalyzer:
                 'details': f'Good content length with {word_count} words'
             }
 
-    def _check_keyword_density(self, soup):
+    def _check_keyword_density(self, page):
         """Analyze keyword density and distribution"""
-        text_content = soup.get_text().lower()
-        words = re.findall(r'\b\w+\b', text_content)
+        total_words = page.word_count
 
-        if len(words) < 100:
+        if total_words < 100:
             return {
                 'status': 'failed',
                 'details': 'Insufficient content for keyword analysis',
@@ -291,8 +468,8 @@ class SEOAnalyzer:
                 'recommendation': 'Add more content to enable keyword analysis'
             }
 
-        # Count word frequency
-        word_counts = Counter(words)
+        # Word frequencies (lowercased)
+        word_counts = page.word_counts
 
         # Remove common stop words
         stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is',
@@ -313,7 +490,7 @@ class SEOAnalyzer:
 
         # Get top keywords
         top_keywords = sorted(filtered_words.items(), key=lambda x: x[1], reverse=True)[:5]
-        max_density = (top_keywords[0][1] / len(words)) * 100
+        max_density = (top_keywords[0][1] / total_words) * 100
 
         if max_density > 3:
             return {
@@ -335,48 +512,32 @@ class SEOAnalyzer:
                 'details': f'Good keyword density ({max_density:.1f}%)'
             }
 
-    def _check_alt_text(self, soup):
+    def _check_alt_text(self, page):
         """Check image alt text presence"""
-        images = soup.find_all('img')
-
-        if not images:
+        if not page.images:
             return {
                 'status': 'passed',
                 'details': 'No images found on page'
             }
 
-        missing_alt = []
-        empty_alt = []
-
-        for img in images:
-            src = img.get('src', 'unknown')
-            alt = img.get('alt')
-
-            if alt is None:
-                missing_alt.append(src)
-            elif not alt.strip():
-                empty_alt.append(src)
-
-        total_issues = len(missing_alt) + len(empty_alt)
+        total_issues = page.images_missing_alt + page.images_empty_alt
 
         if total_issues == 0:
             return {
                 'status': 'passed',
-                'details': f'All {len(images)} images have alt text'
+                'details': f'All {page.images} images have alt text'
             }
         else:
             return {
                 'status': 'failed',
-                'details': f'{total_issues} out of {len(images)} images missing alt text',
+                'details': f'{total_issues} out of {page.images} images missing alt text',
                 'issue': 'Some images lack descriptive alt attributes',
                 'recommendation': 'Add descriptive alt text to all images for accessibility and SEO'
             }
 
-    def _check_canonical_url(self, soup, original_url):
+    def _check_canonical_url(self, page, original_url):
         """Check for canonical URL presence"""
-        canonical = soup.find('link', {'rel': 'canonical'})
-
-        if not canonical or not canonical.get('href'):
+        if not page.canonical:
             return {
                 'status': 'failed',
                 'details': 'Canonical URL missing',
@@ -384,7 +545,7 @@ class SEOAnalyzer:
                 'recommendation': 'Add canonical URL to prevent duplicate content issues'
             }
 
-        canonical_url = canonical.get('href')
+        canonical_url = page.canonical
 
         # Basic validation
         if not canonical_url.startswith(('http://', 'https://')):
@@ -400,17 +561,15 @@ class SEOAnalyzer:
             'details': 'Canonical URL properly set'
         }
 
-    def _check_meta_robots(self, soup):
+    def _check_meta_robots(self, page):
         """Check meta robots tag configuration"""
-        robots_meta = soup.find('meta', {'name': 'robots'})
-
-        if not robots_meta:
+        if page.meta_robots is None:
             return {
                 'status': 'passed',
                 'details': 'No robots meta tag (defaults to index,follow)'
             }
 
-        content = robots_meta.get('content', '').lower()
+        content = page.meta_robots.lower()
 
         if 'noindex' in content:
             return {
@@ -425,7 +584,7 @@ class SEOAnalyzer:
             'details': f'Meta robots configured: {content}'
         }
 
-    def _check_xml_sitemap(self, soup, url):
+    def _check_xml_sitemap(self, page, url):
         """Check for XML sitemap references"""
         # Check robots.txt for sitemap
         try:
@@ -433,7 +592,7 @@ class SEOAnalyzer:
             base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
             robots_url = f"{base_url}/robots.txt"
 
-            robots_response = self.session.get(robots_url, timeout=10)
+            robots_response = self.transport.get(robots_url, timeout=10)
             if robots_response.status_code == 200:
                 if 'sitemap:' in robots_response.text.lower():
                     return {
@@ -442,10 +601,7 @@ class SEOAnalyzer:
                     }
 
             # Check for sitemap link in HTML
-            sitemap_link = soup.find('link', {'type': 'application/xml'}) or \
-                           soup.find('a', href=re.compile(r'sitemap.*\.xml', re.I))
-
-            if sitemap_link:
+            if page.has_sitemap_link:
                 return {
                     'status': 'passed',
                     'details': 'XML sitemap link found in HTML'
@@ -466,15 +622,12 @@ class SEOAnalyzer:
                 'recommendation': 'Ensure XML sitemap is accessible and referenced'
             }
 
-    def _check_schema_markup(self, soup):
+    def _check_schema_markup(self, page):
         """Check for structured data markup"""
-        # Check for JSON-LD
-        json_ld = soup.find_all('script', {'type': 'application/ld+json'})
-
         schema_types = []
 
-        if json_ld:
-            schema_types.append(f'JSON-LD ({len(json_ld)} blocks)')
+        if page.json_ld_blocks:
+            schema_types.append(f'JSON-LD ({page.json_ld_blocks} blocks)')
 
         if schema_types:
             return {
@@ -489,9 +642,9 @@ class SEOAnalyzer:
                 'recommendation': 'Implement relevant schema markup (Organization, Article, etc.)'
             }
 
-    def _check_broken_links(self, soup, base_url):
+    def _check_broken_links(self, page, base_url):
         """Check for broken internal links (basic check)"""
-        links = soup.find_all('a', href=True)
+        links = page.anchors
 
         if not links:
             return {
@@ -499,32 +652,19 @@ class SEOAnalyzer:
                 'details': 'No links found to check'
             }
 
-        internal_links = []
         broken_links = []
-
-        parsed_base = urlparse(base_url)
-
-        for link in links[:20]:  # Limit to first 20 links for performance
-            href = link.get('href')
-
-            # Skip non-HTTP links
-            if href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
+        # Limit to first 20 links for performance
+        internal_links = extract_links(base_url, links[:20], same_host=True)
+
+        # Probe each distinct URL once; HTTP/2 transports multiplex these
+        statuses = self.transport.probe_many(list(dict.fromkeys(internal_links)), timeout=5)
+        unchecked = [full_url for full_url in internal_links if full_url not in statuses]
+        for full_url in internal_links:
+            if full_url in unchecked:
                 continue
-
-            # Convert relative to absolute
-            full_url = urljoin(base_url, href)
-            parsed_url = urlparse(full_url)
-
-            # Only check internal links
-            if parsed_url.netloc == parsed_base.netloc:
-                internal_links.append(full_url)
-
-                try:
-                    response = self.session.head(full_url, timeout=5, allow_redirects=True)
-                    if response.status_code >= 400:
-                        broken_links.append(full_url)
-                except:
-                    broken_links.append(full_url)
+            status = statuses[full_url]
+            if status is None or status >= 400:
+                broken_links.append(full_url)
 
         if broken_links:
             return {
@@ -534,26 +674,28 @@ class SEOAnalyzer:
                 'recommendation': 'Fix or remove broken internal links'
             }
         else:
+            details = f'No broken links detected (checked {len(internal_links) - len(unchecked)} internal links)'
+            if unchecked:
+                details += f'; {len(unchecked)} not checked (audit time limit reached or host unavailable)'
             return {
                 'status': 'passed',
-                'details': f'No broken links detected (checked {len(internal_links)} internal links)'
+                'details': details
             }
 
-    def _calculate_page_info(self, soup, response, load_time):
+    def _extract_internal_links(self, page, base_url):
+        """Absolute URLs of all same-host links on the page"""
+        return extract_links(base_url, page.anchors, same_host=True)
+
+    def _calculate_page_info(self, page, response, load_time):
         """Calculate page statistics"""
-        title_tag = soup.find('title')
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        images = soup.find_all('img')
-        links = soup.find_all('a', href=True)
-        h1_tags = soup.find_all('h1')
+        page = self.page_facts(page)
 
         # Count internal vs external links
         base_domain = urlparse(response.url).netloc
         internal_links = 0
         external_links = 0
 
-        for link in links:
-            href = link.get('href', '')
+        for href in page.anchors:
             if href.startswith('http'):
                 if urlparse(href).netloc == base_domain:
                     internal_links += 1
@@ -562,17 +704,30 @@ class SEOAnalyzer:
             elif href.startswith('/') or not href.startswith(('mailto:', 'tel:', '#')):
                 internal_links += 1
 
-        # Count words
-        text_content = soup.get_text()
-        words = re.findall(r'\b\w+\b', text_content)
-
         return {
-            'title_length': len(title_tag.string.strip()) if title_tag and title_tag.string else 0,
-            'meta_description_length': len(meta_desc.get('content', '').strip()) if meta_desc else 0,
-            'word_count': len(words),
-            'images_count': len(images),
+            'title_length': len(page.title.strip()) if page.title else 0,
+            'meta_description_length': len(page.meta_description.strip()) if page.meta_description else 0,
+            'word_count': page.word_count,
+            'images_count': page.images,
             'internal_links': internal_links,
             'external_links': external_links,
-            'h1_count': len(h1_tags),
+            'h1_count': page.h1_count,
             'load_time': round(load_time, 2)
         }
+
+
+def _configured_engine():
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, 'SEO_AUDIT_ENGINE', 'tree')
+    except ImportError:
+        pass
+    return 'tree'
+
+
+def _checked_engine(engine):
+    engine = engine or _configured_engine()
+    if engine not in ENGINES:
+        raise Exception(f"Unknown engine: {engine}")
+    return engine
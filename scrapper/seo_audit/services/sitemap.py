@@ -0,0 +1,185 @@
+import gzip
+import logging
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from xml.etree.ElementTree import iterparse, ParseError
+
+import requests
+
+SitemapEntry = namedtuple('SitemapEntry', ['loc', 'lastmod'])
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SitemapReader:
+    """Stream URLs out of XML sitemaps without loading them into memory"""
+
+    def __init__(self, session=None, timeout=30, max_depth=3, max_sitemap_size=50 * 1024 * 1024):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_sitemap_size = max_sitemap_size  # 50MB uncompressed, per the sitemaps.org limit
+
+    def iter_urls(self, sitemap_url, since=None):
+        """Yield SitemapEntry tuples, following sitemap index files recursively.
+
+        When `since` is given, entries whose lastmod is not newer are skipped.
+        Entries without a lastmod are always yielded.
+        """
+        for entry in self._iter_sitemap(sitemap_url, depth=0, seen=set()):
+            if since is not None and entry.lastmod is not None and entry.lastmod <= since:
+                continue
+            yield entry
+
+    def iter_from_robots(self, url, since=None):
+        """Yield entries from every sitemap listed in the site's robots.txt"""
+        for sitemap_url in self.sitemaps_from_robots(url):
+            yield from self.iter_urls(sitemap_url, since=since)
+
+    def sitemaps_from_robots(self, url):
+        """Return sitemap URLs declared in robots.txt, falling back to /sitemap.xml"""
+        parsed_url = urlparse(url)
+        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+        sitemaps = []
+        try:
+            robots_response = self.session.get(f"{base_url}/robots.txt", timeout=10)
+            if robots_response.status_code == 200:
+                for line in robots_response.text.splitlines():
+                    key, _, value = line.partition(':')
+                    if key.strip().lower() == 'sitemap' and value.strip():
+                        sitemaps.append(value.strip())
+        except requests.exceptions.RequestException as e:
+            logging.info(f"Could not read robots.txt for {base_url}: {str(e)}")
+
+        return sitemaps or [f"{base_url}/sitemap.xml"]
+
+    def _iter_sitemap(self, sitemap_url, depth, seen):
+        """Parse one sitemap (or index) and yield its entries"""
+        if sitemap_url in seen:
+            return
+        seen.add(sitemap_url)
+
+        if depth > self.max_depth:
+            logging.warning(f"Sitemap index nesting too deep, skipping {sitemap_url}")
+            return
+
+        try:
+            response = self.session.get(sitemap_url, timeout=self.timeout, stream=True)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not fetch sitemap {sitemap_url}: {str(e)}")
+            return
+
+        try:
+            child_sitemaps = []
+            for kind, entry in self._parse(self._open_stream(response)):
+                if kind == 'sitemap':
+                    # Defer children until this document is closed so only one
+                    # connection and one parser are alive at a time
+                    child_sitemaps.append(entry.loc)
+                else:
+                    yield entry
+        except (ParseError, OSError, EOFError) as e:
+            logging.warning(f"Invalid sitemap {sitemap_url}: {str(e)}")
+            return
+        finally:
+            response.close()
+
+        for child_url in child_sitemaps:
+            yield from self._iter_sitemap(child_url, depth + 1, seen)
+
+    def _open_stream(self, response):
+        """Return a file-like object over the decoded sitemap body"""
+        raw = response.raw
+        raw.decode_content = True  # undo Content-Encoding, but not a .gz payload
+        stream = _SizeLimitedStream(raw, self.max_sitemap_size)
+
+        if stream.peek(2) == GZIP_MAGIC:
+            return _SizeLimitedStream(gzip.GzipFile(fileobj=stream), self.max_sitemap_size)
+        return stream
+
+    def _parse(self, stream):
+        """Incrementally parse <url> and <sitemap> elements, clearing them as we go"""
+        context = iterparse(stream, events=('start', 'end'))
+        _, root = next(context)
+
+        for event, elem in context:
+            if event != 'end':
+                continue
+
+            tag = _local_name(elem.tag)
+            if tag not in ('url', 'sitemap'):
+                continue
+
+            loc = None
+            lastmod = None
+            for child in elem:
+                child_tag = _local_name(child.tag)
+                if child_tag == 'loc' and child.text:
+                    loc = child.text.strip()
+                elif child_tag == 'lastmod' and child.text:
+                    lastmod = parse_lastmod(child.text.strip())
+
+            # Drop the finished element so memory stays flat for 50k-URL files
+            root.clear()
+
+            if loc:
+                yield tag, SitemapEntry(loc, lastmod)
+
+
+class _SizeLimitedStream:
+    """File wrapper that refuses to read past a byte limit"""
+
+    def __init__(self, fileobj, limit):
+        self.fileobj = fileobj
+        self.limit = limit
+        self.consumed = 0
+        self._buffer = b''
+
+    def peek(self, size):
+        while len(self._buffer) < size:
+            chunk = self.fileobj.read(size - len(self._buffer))
+            if not chunk:
+                break
+            self._buffer += chunk
+        return self._buffer[:size]
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 64 * 1024
+
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        if len(data) < size:
+            data += self.fileobj.read(size - len(data)) or b''
+
+        self.consumed += len(data)
+        if self.consumed > self.limit:
+            raise OSError("Sitemap exceeds maximum allowed size")
+        return data
+
+
+def _local_name(tag):
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime lastmod value into an aware datetime (or None)"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
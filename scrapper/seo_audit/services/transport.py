@@ -0,0 +1,623 @@
+import asyncio
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 support is optional
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+    h2 = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .archive import NotArchivedError, default_archive
+from .circuit_breaker import HostUnavailableError, default_breakers
+from .latency import Deadline, default_tracker
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+CHUNK_SIZE = 64 * 1024
+
+# Page fetch statuses that count as a host failure for its circuit breaker
+UNAVAILABLE_STATUSES = (502, 503, 504)
+
+
+def accept_encoding():
+    """Accept-Encoding value listing only the codings we can decode"""
+    encodings = ['gzip', 'deflate']
+    if brotli:
+        encodings.append('br')
+    if zstandard:
+        encodings.append('zstd')
+    return ', '.join(encodings)
+
+
+class StreamingDecoder:
+    """Incrementally undo a (possibly stacked) Content-Encoding"""
+
+    def __init__(self, content_encoding):
+        codings = [c.strip().lower() for c in (content_encoding or '').split(',') if c.strip()]
+        # Codings are listed in the order they were applied, so undo them in reverse
+        self._decoders = [self._make_decoder(c) for c in reversed(codings) if c != 'identity']
+
+    @staticmethod
+    def _make_decoder(coding):
+        if coding in ('gzip', 'x-gzip'):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+        if coding == 'deflate':
+            return _DeflateDecoder().decompress
+        if coding == 'br' and brotli:
+            return brotli.Decompressor().process
+        if coding == 'zstd' and zstandard:
+            return zstandard.ZstdDecompressor().decompressobj().decompress
+        raise Exception(f"Unsupported content encoding: {coding}")
+
+    def decode(self, chunk):
+        for decoder in self._decoders:
+            if not chunk:
+                break
+            chunk = decoder(chunk)
+        return chunk
+
+
+class _DeflateDecoder:
+    """'deflate' is zlib-wrapped per the RFC, but some servers send raw deflate"""
+
+    def __init__(self):
+        self._decoder = zlib.decompressobj()
+        self._first = True
+
+    def decompress(self, chunk):
+        if self._first:
+            self._first = False
+            try:
+                return self._decoder.decompress(chunk)
+            except zlib.error:
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decoder.decompress(chunk)
+
+
+class PageResponse:
+    """A fully downloaded page plus transfer statistics"""
+
+    def __init__(self, url, status_code, headers, content, transfer):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.transfer = transfer
+
+    @property
+    def text(self):
+        charset = content_charset(self.headers.get('content-type', '')) or 'utf-8'
+        try:
+            return self.content.decode(charset, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+
+def content_charset(content_type):
+    """The charset parameter of a Content-Type header, or None"""
+    if 'charset=' not in (content_type or ''):
+        return None
+    return content_type.split('charset=')[-1].split(';')[0].strip().strip('"\'') or None
+
+
+def read_body(chunks, headers, max_size, deadline=None, on_chunk=None):
+    """Decode undecoded wire chunks, counting bytes on both sides of the decoder.
+
+    on_chunk(decoded_bytes) is called as each chunk arrives, so a streaming
+    parser can work while the rest of the body is still downloading.
+    """
+    content_encoding = headers.get('content-encoding', '')
+    decoder = StreamingDecoder(content_encoding)
+
+    wire_bytes = 0
+    body = bytearray()
+    for chunk in chunks:
+        wire_bytes += len(chunk)
+        decoded = decoder.decode(chunk)
+        body += decoded
+        # Checked after decoding so a small compressed body can't expand unbounded
+        if len(body) > max_size:
+            raise Exception("Page content too large")
+        if deadline is not None:
+            deadline.check()
+        if on_chunk is not None and decoded:
+            on_chunk(decoded)
+
+    return bytes(body), {
+        'content_encoding': content_encoding or 'identity',
+        'wire_bytes': wire_bytes,
+        'decoded_bytes': len(body),
+    }
+
+
+class HTTPTransport:
+    """HTTP/1.1 transport built on requests.
+
+    Timeouts passed by callers are ceilings: the per-host latency tracker
+    tightens them for hosts it has seen, and an audit deadline (see
+    start_deadline) caps them further. With `hedge_probes`, a HEAD probe that
+    outlives the host's usual latency is sent a second time and the first
+    answer wins. Requests to hosts whose circuit breaker is open fail at once
+    with HostUnavailableError. With an `archive` (by default the one at
+    settings.SEO_AUDIT_ARCHIVE_DIR, if set) every response is also recorded
+    for later replay.
+    """
+
+    name = 'http1'
+
+    def __init__(self, latency=None, hedge_probes=True, breakers=None, archive=None):
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': accept_encoding(),
+        })
+        self.latency = latency or default_tracker()
+        self.breakers = breakers or default_breakers()
+        self.hedge_probes = hedge_probes
+        self.archive = archive or default_archive()
+        self.deadline = None
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._hedge_pool = None
+        self._hedge_lock = threading.Lock()
+
+    @property
+    def headers(self):
+        return self.session.headers
+
+    def start_deadline(self, seconds):
+        """Cap the total time of every request made from now on (None removes the cap)"""
+        self.deadline = Deadline(seconds) if seconds else None
+        return self.deadline
+
+    def _timeout(self, url, timeout):
+        timeout = self.latency.timeout(url, timeout)
+        if self.deadline is not None:
+            timeout = self.deadline.clamp(timeout)
+        return timeout
+
+    def _timed(self, url, timeout, send, page=False):
+        """Call send(timeout) behind the host's circuit breaker with the adaptive
+        timeout, recording how long the host took and whether it failed"""
+        self.breakers.before_request(url)
+        try:
+            timeout = self._timeout(url, timeout)
+        except requests.exceptions.Timeout:
+            self.breakers.release(url)
+            raise
+
+        start = time.monotonic()
+        try:
+            response = send(timeout)
+        except requests.exceptions.Timeout as e:
+            self.latency.record_timeout(url, timeout)
+            self.breakers.record_failure(url, e)
+            raise
+        except requests.exceptions.ConnectionError as e:
+            self.breakers.record_failure(url, e)
+            raise
+        except Exception:
+            self.breakers.release(url)
+            raise
+
+        self.latency.record(url, time.monotonic() - start)
+        self._record_status(url, response.status_code, page)
+        return response
+
+    def _record_status(self, url, status_code, page=False):
+        # Only a page answering 502/503/504 says the host itself is down; any
+        # other answer, such as a link probe's 500, shows that it is reachable
+        if page and status_code in UNAVAILABLE_STATUSES:
+            self.breakers.record_failure(url)
+        else:
+            self.breakers.record_success(url)
+
+    def _archive_response(self, kind, url, response, content=None):
+        if self.archive is None:
+            return
+        try:
+            self.archive.record(kind, url, response.status_code, response.headers, content, str(response.url))
+        except Exception as e:
+            logging.error(f"Could not archive {url}: {str(e)}")
+
+    def fetch(self, url, timeout, max_size, validate=None, on_chunk=None):
+        """Download a page, calling validate(response) before reading the body
+        and on_chunk(bytes) with each decoded piece of it"""
+        response = self._timed(url, timeout, lambda t: self.session.get(url, timeout=t, allow_redirects=True,
+                                                                        stream=True), page=True)
+        try:
+            if response.status_code >= 400:
+                self._archive_response('page', url, response)
+            response.raise_for_status()
+            if validate:
+                validate(response)
+
+            chunks = response.raw.stream(CHUNK_SIZE, decode_content=False)
+            content, transfer = read_body(chunks, response.headers, max_size, self.deadline, on_chunk)
+            transfer['protocol'] = 'HTTP/1.1'
+            self._archive_response('page', url, response, content)
+            return PageResponse(response.url, response.status_code, response.headers, content, transfer)
+        finally:
+            response.close()
+
+    def get(self, url, timeout):
+        response = self._timed(url, timeout, lambda t: self._send('GET', url, t))
+        self._archive_response('resource', url, response, response.content)
+        return response
+
+    def head(self, url, timeout):
+        response = self._timed(url, timeout, lambda t: self._send('HEAD', url, t))
+        self._archive_response('probe', url, response)
+        return response
+
+    def _send(self, method, url, timeout):
+        return self.session.request(method, url, timeout=timeout, allow_redirects=True)
+
+    def probe_many(self, urls, timeout):
+        """HEAD each URL; returns {url: status_code or None on error}.
+
+        URLs left unprobed when the audit deadline runs out are omitted.
+        """
+        statuses = {}
+        for url in urls:
+            if self._deadline_expired():
+                break
+            if not self.breakers.available(url):
+                continue
+            status = self._hedged_probe(url, timeout)
+            if status is None and self._deadline_expired():
+                break  # cut short by the deadline, so not known to be broken
+            if status is None and not self.breakers.available(url):
+                continue  # the host is down, which says nothing about this link
+            statuses[url] = status
+        return statuses
+
+    def _deadline_expired(self):
+        return self.deadline is not None and self.deadline.expired()
+
+    def _hedged_probe(self, url, timeout):
+        delay = self.latency.hedge_delay(url) if self.hedge_probes else None
+        if delay is None:
+            return self._probe(url, timeout)
+
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=4)
+        first = self._hedge_pool.submit(self._probe, url, timeout)
+        if wait([first], timeout=delay).done:
+            return first.result()
+
+        # Slower than the host's usual latency: race a second request. The loser
+        # can't be cancelled mid-flight; it finishes on the pool within its timeout.
+        self._count_hedge()
+        second = self._hedge_pool.submit(self._probe, url, timeout)
+        pending = {first, second}
+        status = None
+        while pending and status is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    status = future.result()
+                    self._count_hedge(won=future is second)
+                    break
+        return status
+
+    def _count_hedge(self, won=None):
+        """Count a hedged probe (won=None) or its outcome; probes run on several threads"""
+        with self._hedge_lock:
+            if won is None:
+                self.hedged += 1
+            elif won:
+                self.hedge_wins += 1
+
+    def _probe(self, url, timeout):
+        try:
+            return self.head(url, timeout).status_code
+        except Exception:
+            return None
+
+    def close(self):
+        with self._hedge_lock:
+            pool, self._hedge_pool = self._hedge_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+        self.session.close()
+
+
+class HTTP2Transport(HTTPTransport):
+    """Transport that negotiates HTTP/2 via ALPN and multiplexes link probes.
+
+    Servers that don't offer h2 are spoken to over HTTP/1.1 by the same client.
+    `prior_knowledge` forces cleartext HTTP/2 (h2c), which is mainly for tests.
+    """
+
+    name = 'http2'
+
+    def __init__(self, max_concurrent_probes=10, prior_knowledge=False, latency=None, hedge_probes=True,
+                 breakers=None, archive=None):
+        super().__init__(latency=latency, hedge_probes=hedge_probes, breakers=breakers, archive=archive)
+        if not (httpx and h2):
+            raise Exception("HTTP/2 transport requires the 'httpx[http2]' package")
+
+        self.max_concurrent_probes = max_concurrent_probes
+        self.prior_knowledge = prior_knowledge
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            headers=dict(self.session.headers),
+            follow_redirects=True,
+        )
+
+    @property
+    def headers(self):
+        return self.client.headers
+
+    def fetch(self, url, timeout, max_size, validate=None, on_chunk=None):
+        self.breakers.before_request(url)
+        try:
+            timeout = self._timeout(url, timeout)
+        except requests.exceptions.Timeout:
+            self.breakers.release(url)
+            raise
+
+        start = time.monotonic()
+        try:
+            with self.client.stream('GET', url, timeout=timeout) as response:
+                self.latency.record(url, time.monotonic() - start)
+                self._record_status(url, response.status_code, page=True)
+                if response.status_code >= 400:
+                    self._archive_response('page', url, response)
+                response.raise_for_status()
+                if validate:
+                    validate(response)
+
+                content, transfer = read_body(response.iter_raw(CHUNK_SIZE), response.headers, max_size,
+                                              self.deadline, on_chunk)
+                transfer['protocol'] = response.http_version
+                self._archive_response('page', url, response, content)
+                return PageResponse(str(response.url), response.status_code, response.headers, content, transfer)
+        except httpx.TimeoutException as e:
+            self.latency.record_timeout(url, timeout)
+            self.breakers.record_failure(url, e)
+            raise _as_requests_error(e)
+        except httpx.TransportError as e:
+            self.breakers.record_failure(url, e)
+            raise _as_requests_error(e)
+        except httpx.HTTPError as e:
+            raise _as_requests_error(e)
+        finally:
+            self.breakers.release(url)
+
+    def _send(self, method, url, timeout):
+        try:
+            return self.client.request(method, url, timeout=timeout)
+        except httpx.HTTPError as e:
+            raise _as_requests_error(e)
+
+    def probe_many(self, urls, timeout):
+        """HEAD all URLs concurrently; same-origin requests share one h2 connection"""
+        if not urls:
+            return {}
+        # httpx's sync client can't safely interleave HTTP/2 streams from several
+        # threads, so the probes run as coroutines on a private event loop
+        return asyncio.run(self._probe_many_async(urls, timeout))
+
+    async def _probe_many_async(self, urls, timeout):
+        semaphore = asyncio.Semaphore(self.max_concurrent_probes)
+        skipped = object()
+
+        async with httpx.AsyncClient(http1=not self.prior_knowledge, http2=True,
+                                     headers=self.client.headers, follow_redirects=True) as client:
+            async def head(url, request_timeout):
+                start = time.monotonic()
+                try:
+                    response = await client.head(url, timeout=request_timeout)
+                except httpx.TimeoutException as e:
+                    self.latency.record_timeout(url, request_timeout)
+                    self.breakers.record_failure(url, e)
+                    return None
+                except httpx.TransportError as e:
+                    self.breakers.record_failure(url, e)
+                    return None
+                except Exception:
+                    return None
+                self.latency.record(url, time.monotonic() - start)
+                self._record_status(url, response.status_code)
+                self._archive_response('probe', url, response)
+                return response.status_code
+
+            async def probe(url):
+                async with semaphore:
+                    try:
+                        self.breakers.before_request(url)
+                    except HostUnavailableError:
+                        return skipped
+                    try:
+                        request_timeout = self._timeout(url, timeout)
+                    except requests.exceptions.Timeout:
+                        self.breakers.release(url)
+                        return skipped  # audit deadline reached
+
+                    try:
+                        status = await self._hedged_head(head, url, request_timeout)
+                    finally:
+                        self.breakers.release(url)
+                    if status is None and (self._deadline_expired() or not self.breakers.available(url)):
+                        return skipped
+                    return status
+
+            statuses = await asyncio.gather(*(probe(url) for url in urls))
+
+        return {url: status for url, status in zip(urls, statuses) if status is not skipped}
+
+    async def _hedged_head(self, head, url, timeout):
+        """Await head(url, timeout), racing a second copy once the host's hedge delay passes"""
+        delay = self.latency.hedge_delay(url) if self.hedge_probes else None
+        first = asyncio.ensure_future(head(url, timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        # Hedge on the same connection; unlike threads, the loser is cancelled
+        self._count_hedge()
+        second = asyncio.ensure_future(head(url, timeout))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        self._count_hedge(won=task is second)
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+class ReplayTransport:
+    """Serves an audit's requests from a ResponseArchive instead of the network.
+
+    Pages, robots.txt and link probes come back as recorded (the latest record
+    no later than `as_of`), so any set of checks can be re-run over archived
+    pages deterministically and at CPU speed. A URL that was never recorded
+    fails like an unreachable host; an unrecorded link probe is reported as
+    not checked.
+    """
+
+    name = 'replay'
+
+    def __init__(self, archive=None, as_of=None):
+        self.archive = archive or default_archive()
+        if self.archive is None:
+            raise Exception("Replay needs an archive (settings.SEO_AUDIT_ARCHIVE_DIR is not set)")
+        self.as_of = as_of
+        self.session = None  # nothing here may reach the network
+        self.headers = {'User-Agent': USER_AGENT}
+        self.deadline = None
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def start_deadline(self, seconds):
+        # Nothing to wait for, so no time budget to enforce
+        return None
+
+    def _lookup(self, url, kinds):
+        archived = self.archive.lookup(url, kinds, self.as_of)
+        if archived is None:
+            raise NotArchivedError(f"{url} is not in the archive")
+        return archived
+
+    def _response(self, archived, transfer=None):
+        return PageResponse(archived.final_url, archived.status_code, archived.headers, archived.content or b'',
+                            transfer)
+
+    def fetch(self, url, timeout, max_size, validate=None, on_chunk=None):
+        archived = self._lookup(url, ('page',))
+        content = archived.content or b''
+        response = self._response(archived, {
+            'protocol': 'replay',
+            'content_encoding': archived.headers.get('content-encoding', 'identity'),
+            'decoded_bytes': len(content),
+            'archived_at': archived.date,
+        })
+        if archived.status_code >= 400:
+            error = requests.exceptions.HTTPError(f"{archived.status_code} Error for url: {url}")
+            error.response = response
+            raise error
+        if validate:
+            validate(response)
+        if len(content) > max_size:
+            raise Exception("Page content too large")
+        if on_chunk is not None:
+            for start in range(0, len(content), CHUNK_SIZE):
+                on_chunk(content[start:start + CHUNK_SIZE])
+        return response
+
+    def get(self, url, timeout):
+        return self._response(self._lookup(url, ('resource', 'page')))
+
+    def head(self, url, timeout):
+        return self._response(self._lookup(url, ('probe', 'page', 'resource')))
+
+    def probe_many(self, urls, timeout):
+        statuses = {}
+        for url in urls:
+            archived = self.archive.lookup(url, ('probe', 'page', 'resource'), self.as_of)
+            if archived is not None:
+                statuses[url] = archived.status_code
+        return statuses
+
+    def close(self):
+        pass
+
+
+def _as_requests_error(e):
+    """Map httpx exceptions onto the requests ones SEOAnalyzer already handles"""
+    if isinstance(e, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(e))
+    if isinstance(e, httpx.HTTPStatusError):
+        error = requests.exceptions.HTTPError(str(e))
+        error.response = e.response
+        return error
+    if isinstance(e, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(e))
+    return requests.exceptions.RequestException(str(e))
+
+
+TRANSPORTS = {
+    'http1': HTTPTransport,
+    'http2': HTTP2Transport,
+}
+
+
+def make_transport(name=None):
+    """Build the named transport, falling back to HTTP/1.1 if it isn't available.
+
+    Without a name, the SEO_AUDIT_TRANSPORT Django setting is used (default 'http1').
+    """
+    if name is None:
+        name = _configured_transport()
+
+    if name not in TRANSPORTS:
+        raise Exception(f"Unknown transport: {name}")
+
+    try:
+        return TRANSPORTS[name]()
+    except Exception as e:
+        logging.warning(f"Falling back to HTTP/1.1 transport: {str(e)}")
+        return HTTPTransport()
+
+
+def _configured_transport():
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, 'SEO_AUDIT_TRANSPORT', 'http1')
+    except ImportError:
+        pass
+    return 'http1'
@@ -3,6 +3,7 @@
 // Configuration
 const CONFIG = {
     API_BASE_URL: '/api/audit',
+    STREAM_URL: '/api/audit/stream',
     TIMEOUT: 30000,
     PROGRESS_STEPS: [
         'Fetching page content...',
@@ -158,13 +159,27 @@ async function performAudit(url) {
     hideResults();
 
     try {
-        const response = await callAuditAPI(url);
+        const data = { url: url, timestamp: new Date().toISOString(), checks: {}, page_info: {} };
+        let shown = false;
 
-        if (response.status === 'success') {
-            displayResults(response.data);
-        } else {
-            throw new Error(response.message || 'Audit failed');
-        }
+        await callAuditStream(url, event => {
+            if (event.event === 'error') {
+                throw new Error(event.message || 'Audit failed');
+            }
+
+            if (event.event === 'page_info') {
+                data.page_info = event.data;
+            } else if (event.event === 'check') {
+                data.checks[event.name] = event.data;
+            } else if (event.event === 'summary') {
+                Object.assign(data, event.data);
+                hideLoadingState();
+            }
+
+            // Render partial results as soon as the first ones arrive
+            displayResults(data, !shown);
+            shown = true;
+        });
 
     } catch (error) {
         console.error('Audit error:', error);
@@ -174,38 +189,50 @@ async function performAudit(url) {
     }
 }
 
-// Call the audit API
-async function callAuditAPI(url) {
-    const requestData = {
-        url: url,
-        timestamp: new Date().toISOString()
-    };
-
-    // Simulate progress updates
+// Call the streaming audit API, invoking onEvent for each NDJSON line
+async function callAuditStream(url, onEvent) {
     simulateProgress();
 
+    let response;
     try {
-        const response = await fetch(CONFIG.API_BASE_URL, {
+        response = await fetch(CONFIG.STREAM_URL, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'application/x-ndjson',
                 'X-CSRFToken': getCSRFToken()
             },
-            body: JSON.stringify(requestData),
-            timeout: CONFIG.TIMEOUT
+            body: JSON.stringify({ url: url })
         });
+    } catch (error) {
+        throw new Error('Network error - please check your connection');
+    }
 
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
+    if (!response.ok) {
+        let message = `HTTP ${response.status}: ${response.statusText}`;
+        try {
+            message = (await response.json()).message || message;
+        } catch (e) {}
+        throw new Error(message);
+    }
 
-        return await response.json();
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
 
-    } catch (error) {
-        if (error.name === 'TypeError') {
-            throw new Error('Network error - please check your connection');
-        }
-        throw error;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+    }
+
+    if (buffer.trim()) {
+        onEvent(JSON.parse(buffer));
     }
 }
 
@@ -264,7 +291,7 @@ function hideResults() {
 }
 
 // Display audit results
-function displayResults(data) {
+function displayResults(data, scroll = true) {
     // Update overall score
     const score = calculateOverallScore(data.checks);
     elements.overallScoreValue.textContent = score.passed;
@@ -290,7 +317,9 @@ function displayResults(data) {
     elements.resultsContainer.style.display = 'block';
 
     // Scroll to results
-    elements.resultsContainer.scrollIntoView({ behavior: 'smooth' });
+    if (scroll) {
+        elements.resultsContainer.scrollIntoView({ behavior: 'smooth' });
+    }
 }
 
 // Calculate overall score
@@ -665,20 +694,3 @@ const EXAMPLE_RESPONSE = {
         }
     }
 };
-
-// For development/testing - remove in production
-// if (window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1') {
-//     console.log('Development mode: Using example response');
-//
-//     // Override API call for testing
-//     const originalCallAuditAPI = callAuditAPI;
-//     callAuditAPI = async function(url) {
-//         // Simulate API delay
-//         await new Promise(resolve => setTimeout(resolve, 3000));
-//
-//         // Return example response with the provided URL
-//         const response = { ...EXAMPLE_RESPONSE };
-//         response.data.url = url;
-//         return response;
-//     };
-// }
\ No newline at end of file
@@ -1,3 +1,1768 @@
-from django.test import TestCase
+import codecs
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import requests
+
+from bs4 import BeautifulSoup
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .loadtest.driver import LoadDriver, build_report
+from .loadtest.synthetic_site import SiteConfig, SyntheticSite, render_page
+from .models import Job, PageAudit, Website
+from .services import job_queue
+from .services.archive import ResponseArchive
+from .services.circuit_breaker import CircuitBreakers, HostUnavailableError
+from .services.frontier import BloomFilter, HostRing, Inbox, ShardedFrontier, URLFrontier
+from .services.incremental import IncrementalAuditor
+from .services.latency import Deadline, LatencyTracker, percentile
+from .services.link_graph import LinkGraph, LinkGraphRegistry, extract_links
+from .services.seo_analyzer import SEOAnalyzer
+from .services.sitemap import SitemapReader
+from .services import transport
+from .services.metrics import MetricsRegistry
+from .services.metrics_store import PageMetricsStore
+from .services.monitor import Monitor, next_slot, phase
+from .services.page_facts import FactParser, PageFacts, parse_facts
+from .services import process_pool
+from .services.process_pool import PoolBusyError, ProcessPool, process_page
+from .services.scheduler import AuditScheduler, QueueTimeoutError, SchedulingPolicy
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.raw = io.BytesIO(body)
+        self.status_code = status_code
+        self.text = body.decode('utf-8', 'replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url not in self.pages:
+            return FakeResponse(b'', status_code=404)
+        return FakeResponse(self.pages[url])
+
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/a</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc>https://example.com/b</loc><lastmod>2024-06-01T10:00:00Z</lastmod></url>
+  <url><loc>https://example.com/c</loc></url>
+</urlset>"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/pages.xml.gz</loc></sitemap>
+  <sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>
+</sitemapindex>"""
+
+
+class SitemapReaderTests(SimpleTestCase):
+    def test_reads_plain_urlset(self):
+        reader = SitemapReader(session=FakeSession({'https://example.com/s.xml': URLSET}))
+        entries = list(reader.iter_urls('https://example.com/s.xml'))
+
+        self.assertEqual([e.loc for e in entries],
+                         ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'])
+        self.assertEqual(entries[1].lastmod, datetime(2024, 6, 1, 10, tzinfo=timezone.utc))
+        self.assertIsNone(entries[2].lastmod)
+
+    def test_follows_gzipped_index_once(self):
+        session = FakeSession({
+            'https://example.com/sitemap.xml': INDEX,
+            'https://example.com/pages.xml.gz': gzip.compress(URLSET),
+        })
+        entries = list(SitemapReader(session=session).iter_urls('https://example.com/sitemap.xml'))
+
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(session.requested.count('https://example.com/sitemap.xml'), 1)
+
+    def test_since_skips_unchanged_entries(self):
+        reader = SitemapReader(session=FakeSession({'https://example.com/s.xml': URLSET}))
+        since = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+        locs = [e.loc for e in reader.iter_urls('https://example.com/s.xml', since=since)]
+        self.assertEqual(locs, ['https://example.com/b', 'https://example.com/c'])
+
+    def test_size_limit_stops_parsing(self):
+        body = URLSET.replace(b'</urlset>', b'<url><loc>https://example.com/x</loc></url>' * 200 + b'</urlset>')
+        reader = SitemapReader(session=FakeSession({'https://example.com/s.xml': body}), max_sitemap_size=1024)
+
+        self.assertLess(len(list(reader.iter_urls('https://example.com/s.xml'))), 200)
+
+    def test_robots_sitemap_discovery(self):
+        session = FakeSession({
+            'https://example.com/robots.txt': b'User-agent: *\nSitemap: https://example.com/s.xml\n',
+            'https://example.com/s.xml': URLSET,
+        })
+        entries = list(SitemapReader(session=session).iter_from_robots('https://example.com/page'))
+        self.assertEqual(len(entries), 3)
+
+
+PAGE = """<html><head><title>{title}</title>
+<meta name="description" content="A description of the page that is here">
+<link rel="canonical" href="https://example.com/"></head>
+<body><h1>A heading for the page</h1><h2>Sub heading</h2>
+<img src="a.png" alt="An image"><a href="/about">About</a>
+<p>{text}</p></body></html>"""
+
+
+class StaticPageAnalyzer(SEOAnalyzer):
+    """Analyzer that serves a fixed page and counts network check calls"""
+
+    def __init__(self, html):
+        super().__init__()
+        self.html = html
+        self.network_calls = 0
+
+    def _fetch_page(self, url, parser=None):
+        response = FakeResponse(self.html.encode('utf-8'))
+        response.content = self.html.encode('utf-8')
+        response.headers = {'content-type': 'text/html; charset=utf-8'}
+        response.url = url
+        return response
+
+    def _check_xml_sitemap(self, page, url):
+        self.network_calls += 1
+        return {'status': 'passed', 'details': 'stubbed'}
+
+    def _check_broken_links(self, page, base_url):
+        self.network_calls += 1
+        return {'status': 'passed', 'details': 'stubbed'}
+
+
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class IncrementalAuditTests(SimpleTestCase):
+    def setUp(self):
+        self.analyzer = StaticPageAnalyzer(PAGE.format(title='Short title', text='word ' * 50))
+        self.auditor = IncrementalAuditor(self.analyzer)
+        self.first = self.auditor.audit('https://example.com/')
+
+    def test_first_audit_runs_everything(self):
+        self.assertEqual(self.first['incremental']['reused'], [])
+        self.assertIsNone(self.first['diff'])
+        self.assertEqual(self.analyzer.network_calls, 2)
+
+    def test_unchanged_page_reuses_all_checks(self):
+        self.analyzer.html = self.analyzer.html.replace('<p>', '  <p>\n')
+        second = self.auditor.audit('https://example.com/', previous=self.first)
+
+        self.assertEqual(second['incremental']['recomputed'], [])
+        self.assertEqual(second['checks'], self.first['checks'])
+        self.assertEqual(self.analyzer.network_calls, 2)
+        self.assertEqual(second['diff']['checks'], {})
+
+    def test_meta_change_recomputes_head_checks_only(self):
+        self.analyzer.html = self.analyzer.html.replace('content="A description', 'content="Another description')
+        second = self.auditor.audit('https://example.com/', previous=self.first)
+
+        self.assertEqual(second['diff']['changed_artifacts'], ['head'])
+        self.assertEqual(sorted(second['incremental']['recomputed']),
+                         ['canonical_url', 'meta_description', 'meta_robots', 'title_tag', 'xml_sitemap'])
+        self.assertIn('meta_description', second['diff']['checks'])
+        self.assertEqual(second['diff']['page_info']['meta_description_length']['after'], len('Another description of the page that is here'))
+
+    def test_title_change_also_invalidates_text_checks(self):
+        self.analyzer.html = PAGE.format(title='A much better and longer title for this page', text='word ' * 50)
+        second = self.auditor.audit('https://example.com/', previous=self.first)
+
+        self.assertEqual(second['diff']['changed_artifacts'], ['head', 'text'])
+        self.assertEqual(second['diff']['checks']['title_tag']['after']['status'], 'passed')
+        self.assertEqual(second['diff']['page_info']['title_length']['before'], len('Short title'))
+
+    def test_stale_network_check_is_rerun(self):
+        self.first['checked_at']['broken_links'] -= 7 * 60 * 60
+        second = self.auditor.audit('https://example.com/', previous=self.first)
+
+        self.assertEqual(second['incremental']['recomputed'], ['broken_links'])
+
+    def test_uses_the_configured_engine(self):
+        stream = StaticPageAnalyzer(self.analyzer.html)
+        stream.engine = 'stream'
+        tree = StaticPageAnalyzer(self.analyzer.html)
+        tree.engine = 'tree'
+        with mock.patch('seo_audit.services.seo_analyzer.BeautifulSoup') as soup:
+            first = IncrementalAuditor(stream).audit('https://example.com/')
+        soup.assert_not_called()
+
+        # Both engines yield the same fingerprint, so switching engines doesn't invalidate stored audits
+        second = IncrementalAuditor(tree).audit('https://example.com/', previous=first)
+        self.assertEqual(second['fingerprint'], first['fingerprint'])
+        self.assertEqual(second['incremental']['recomputed'], [])
+
+
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class PageAuditModelTests(TestCase):
+    def test_round_trip_latest(self):
+        auditor = IncrementalAuditor(StaticPageAnalyzer(PAGE.format(title='Title', text='text')))
+        PageAudit.record(auditor.audit('https://example.com/'))
+        previous = PageAudit.latest_for('https://example.com/')
+
+        second = auditor.audit('https://example.com/', previous=previous)
+        self.assertEqual(second['incremental']['recomputed'], [])
+
+
+@override_settings(SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None, SEO_AUDIT_PROCESS_POOL=None)
+class StreamingAuditTests(SimpleTestCase):
+    def test_iter_analyze_event_order(self):
+        analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='text'))
+        events = list(analyzer.iter_analyze('https://example.com/'))
+
+        self.assertEqual(events[0]['event'], 'page_info')
+        self.assertEqual(events[-1]['event'], 'summary')
+        names = [e['name'] for e in events if e['event'] == 'check']
+        self.assertEqual(sorted(names[-2:]), ['broken_links', 'xml_sitemap'])
+        self.assertEqual(set(events[-1]['data']['checks']), set(SEOAnalyzer.CHECKS))
+
+    def test_stream_endpoint_ndjson(self):
+        page = PAGE.format(title='Title', text='text')
+        with mock.patch('seo_audit.views.SEOAnalyzer', lambda **options: StaticPageAnalyzer(page)):
+            response = self.client.post('/api/audit/stream', json.dumps({'url': 'https://example.com/'}),
+                                        content_type='application/json')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(events), 14)
+        self.assertEqual(events[-1]['data']['checks']['title_tag']['status'], 'failed')
+
+    def test_stream_endpoint_sse(self):
+        page = PAGE.format(title='Title', text='text')
+        with mock.patch('seo_audit.views.SEOAnalyzer', lambda **options: StaticPageAnalyzer(page)):
+            response = self.client.post('/api/audit/stream', json.dumps({'url': 'https://example.com/'}),
+                                        content_type='application/json', HTTP_ACCEPT='text/event-stream')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertTrue(body.startswith('event: page_info\ndata: '))
+        self.assertIn('event: summary', body)
+
+    async def test_async_stream_endpoint(self):
+        page = PAGE.format(title='Title', text='text')
+        with mock.patch('seo_audit.views.SEOAnalyzer', lambda **options: StaticPageAnalyzer(page)):
+            response = await self.async_client.post('/api/audit/stream/async',
+                                                    json.dumps({'url': 'https://example.com/'}),
+                                                    content_type='application/json')
+            lines = [chunk async for chunk in response.streaming_content]
+
+        events = [json.loads(line) for line in b''.join(lines).decode().splitlines()]
+        self.assertEqual(events[0]['event'], 'page_info')
+        self.assertEqual(events[-1]['event'], 'summary')
+
+    def test_stream_endpoint_rejects_bad_url(self):
+        response = self.client.post('/api/audit/stream', json.dumps({'url': 'http://localhost/'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None, SEO_AUDIT_PROCESS_POOL=None)
+class AuthenticatedAsyncStreamTests(TestCase):
+    async def test_logged_in_user_is_the_tenant(self):
+        user = await User.objects.acreate(username='alice')
+        await self.async_client.aforce_login(user)
+        page = PAGE.format(title='Title', text='text')
+        slots = []
+
+        @contextmanager
+        def audit_slot(priority, tenant):
+            slots.append((priority, tenant))
+            yield
+
+        with mock.patch('seo_audit.views.SEOAnalyzer', lambda **options: StaticPageAnalyzer(page)), \
+                mock.patch('seo_audit.views.audit_slot', audit_slot):
+            response = await self.async_client.post('/api/audit/stream/async',
+                                                    json.dumps({'url': 'https://example.com/'}),
+                                                    content_type='application/json')
+            lines = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(lines[-1])['event'], 'summary')
+        self.assertEqual(slots, [('interactive', 'user:alice')])
+
+
+class JobQueueTests(TestCase):
+    def test_lease_complete(self):
+        job = job_queue.enqueue('sleep', {'seconds': 0})
+        queue = job_queue.JobQueue(worker_id='w1')
+
+        leased = queue.lease()
+        self.assertEqual(leased.id, job.id)
+        self.assertIsNone(job_queue.JobQueue(worker_id='w2').lease())
+
+        self.assertTrue(queue.complete(leased, {'ok': True}))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'ok': True})
+
+    def test_expired_lease_is_released_to_other_workers(self):
+        job = job_queue.enqueue('sleep', {})
+        first = job_queue.JobQueue(worker_id='w1', visibility_timeout=-1)
+        first.lease()
+
+        second = job_queue.JobQueue(worker_id='w2')
+        leased = second.lease()
+        self.assertEqual(leased.id, job.id)
+        self.assertEqual(leased.attempts, 2)
+        # The first worker lost its lease, so it can no longer complete the job
+        self.assertFalse(first.complete(leased, {}))
+
+    def test_failures_back_off_then_dead_letter(self):
+        job = job_queue.enqueue('sleep', {}, max_attempts=2)
+        queue = job_queue.JobQueue(worker_id='w1')
+
+        queue.fail(queue.lease(), 'boom')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, job.created_at)
+        self.assertIsNone(queue.lease())
+
+        Job.objects.filter(id=job.id).update(run_after=job.created_at)
+        queue.fail(queue.lease(), 'boom again')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertEqual(job.last_error, 'boom again')
+
+    def test_worker_retries_failing_handler(self):
+        job = job_queue.enqueue('sleep', {})
+
+        def explode(payload):
+            raise Exception('handler error')
+
+        with mock.patch.dict(job_queue.HANDLERS, {'sleep': explode}):
+            worker = job_queue.Worker(job_queue.JobQueue(worker_id='w1'))
+            worker.run(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(worker.failed, 1)
+        self.assertEqual(job.last_error, 'handler error')
+
+    def test_api_enqueue_and_poll(self):
+        response = self.client.post('/api/audit/jobs', json.dumps({'url': 'https://example.com/'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+
+        response = self.client.get(f'/api/audit/jobs/{job_id}')
+        self.assertEqual(response.json()['data']['status'], Job.QUEUED)
+        self.assertEqual(self.client.get('/api/audit/jobs/9999').status_code, 404)
+
+
+class StubHTTPServer:
+    """Local HTTP/1.1 server whose routes map a path to (status, headers, body)"""
+
+    def __init__(self, routes=None, delay=0):
+        self.routes = routes or {}
+        self.delay = delay
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, send_body):
+                stub.requests.append((self.command, self.path))
+                delay = stub.delay(self.path) if callable(stub.delay) else stub.delay
+                if delay:
+                    time.sleep(delay)
+
+                status, headers, body = stub.routes.get(self.path, (404, {}, b'not found'))
+                if 'gzip' in self.headers.get('Accept-Encoding', '') and headers.get('content-type') == 'text/html':
+                    body = gzip.compress(body)
+                    headers = dict(headers, **{'content-encoding': 'gzip'})
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubH2Server:
+    """Minimal cleartext HTTP/2 server that counts connections and streams"""
+
+    def __init__(self, body):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        self.body = body
+        self.connections = 0
+        self.streams = 0
+        self._h2 = h2
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        h2 = self._h2
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+
+        with client:
+            while True:
+                data = client.recv(65535)
+                if not data:
+                    return
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        self.streams += 1
+                        headers = dict(event.headers)
+                        body = self.body
+                        response_headers = [(':status', '200'), ('content-type', 'text/html')]
+                        if b'gzip' in headers.get(b'accept-encoding', b''):
+                            body = gzip.compress(body)
+                            response_headers.append(('content-encoding', 'gzip'))
+                        response_headers.append(('content-length', str(len(body))))
+
+                        if headers.get(b':method') == b'HEAD':
+                            conn.send_headers(event.stream_id, response_headers, end_stream=True)
+                        else:
+                            conn.send_headers(event.stream_id, response_headers)
+                            conn.send_data(event.stream_id, body, end_stream=True)
+                client.sendall(conn.data_to_send())
+
+    def stop(self):
+        self.sock.close()
+
+
+HTML_HEADERS = {'content-type': 'text/html'}
+
+
+class TransportTests(SimpleTestCase):
+    def test_decoder_handles_stacked_and_raw_deflate(self):
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        payload = raw_deflate.compress(b'hello') + raw_deflate.flush()
+        self.assertEqual(transport.StreamingDecoder('deflate').decode(payload), b'hello')
+
+        stacked = gzip.compress(zlib.compress(b'hello'))
+        self.assertEqual(transport.StreamingDecoder('deflate, gzip').decode(stacked), b'hello')
+
+    @unittest.skipUnless(transport.brotli and transport.zstandard, 'brotli/zstandard not installed')
+    def test_decoder_handles_brotli_and_zstd(self):
+        body = b'<p>compressed</p>' * 100
+        self.assertEqual(transport.StreamingDecoder('br').decode(transport.brotli.compress(body)), body)
+        zstd_body = transport.zstandard.ZstdCompressor().compress(body)
+        self.assertEqual(transport.StreamingDecoder('zstd').decode(zstd_body), body)
+
+    def test_http1_fetch_records_wire_and_decoded_bytes(self):
+        body = b'<html><body>' + b'<p>repeated text</p>' * 500 + b'</body></html>'
+        server = StubHTTPServer({'/': (200, HTML_HEADERS, body)})
+        try:
+            response = transport.HTTPTransport().fetch(server.url + '/', timeout=5, max_size=10 ** 6)
+        finally:
+            server.stop()
+
+        self.assertEqual(response.content, body)
+        self.assertEqual(response.transfer['protocol'], 'HTTP/1.1')
+        self.assertEqual(response.transfer['content_encoding'], 'gzip')
+        self.assertEqual(response.transfer['decoded_bytes'], len(body))
+        self.assertLess(response.transfer['wire_bytes'], len(body) / 10)
+
+    def test_decoded_size_limit_applies_to_compressed_bodies(self):
+        server = StubHTTPServer({'/': (200, HTML_HEADERS, b'a' * 100000)})
+        try:
+            with self.assertRaisesMessage(Exception, 'Page content too large'):
+                transport.HTTPTransport().fetch(server.url + '/', timeout=5, max_size=1000)
+        finally:
+            server.stop()
+
+    @override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+    def test_analyzer_closes_only_the_transport_it_created(self):
+        with mock.patch('seo_audit.services.seo_analyzer.make_transport') as make:
+            with SEOAnalyzer():
+                pass
+        make.return_value.close.assert_called_once_with()
+
+        shared = mock.Mock()
+        with SEOAnalyzer(transport=shared):
+            pass
+        shared.close.assert_not_called()
+
+    def test_closed_http1_transport_can_be_reused(self):
+        server = StubHTTPServer({'/': (200, {}, b'')})
+        self.addCleanup(server.stop)
+        http = transport.HTTPTransport(latency=LatencyTracker(min_samples=1), breakers=CircuitBreakers())
+        http.latency.record(server.url + '/', 1)
+        self.assertEqual(http.probe_many([server.url + '/'], timeout=5), {server.url + '/': 200})
+        self.assertIsNotNone(http._hedge_pool)
+
+        http.close()
+        self.assertIsNone(http._hedge_pool)
+        self.assertEqual(http.probe_many([server.url + '/'], timeout=5), {server.url + '/': 200})
+
+
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class AdaptiveTimeoutTests(SimpleTestCase):
+    def _server(self, delays):
+        """Stub whose /slow... paths sleep for the next value in `delays` (0 once exhausted)"""
+        delays = iter(delays)
+        paths = ['/', '/fast', '/slow'] + [f'/slow{i}' for i in range(10)]
+        routes = {path: (200, HTML_HEADERS, b'<html></html>') for path in paths}
+        server = StubHTTPServer(routes, delay=lambda path: next(delays, 0) if path.startswith('/slow') else 0)
+        self.addCleanup(server.stop)
+        return server
+
+    def _warm(self, http, server, count=10):
+        for _ in range(count):
+            http.head(server.url + '/fast', timeout=5)
+
+    def test_tracker_derives_bounded_timeouts(self):
+        tracker = LatencyTracker(min_timeout=0.05)
+        self.assertEqual(tracker.timeout('https://a.example/', 10), 10)
+
+        for _ in range(20):
+            tracker.record('https://a.example/x', 0.1)
+        self.assertAlmostEqual(tracker.timeout('https://a.example/', 10), 0.3)
+        self.assertEqual(tracker.timeout('https://a.example/', 0.2), 0.2)
+        self.assertEqual(tracker.hedge_delay('https://a.example/'), 0.1)
+        floored = LatencyTracker(min_samples=1, min_hedge_delay=0.5)
+        floored.record('https://a.example/', 0.01)
+        self.assertEqual(floored.hedge_delay('https://a.example/'), 0.5)
+        self.assertIsNone(tracker.hedge_delay('https://b.example/'))
+
+        tracker.record_timeout('https://a.example/', 0.3)
+        self.assertAlmostEqual(tracker.timeout('https://a.example/', 10), 0.9)
+        self.assertEqual(tracker.snapshot()['a.example']['timeouts'], 1)
+
+    def test_fast_host_gets_tight_timeout(self):
+        server = self._server([2])
+        http = transport.HTTPTransport(latency=LatencyTracker(min_timeout=0.2), hedge_probes=False)
+        self._warm(http, server)
+
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            http.head(server.url + '/slow', timeout=30)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_hedged_probe_beats_slow_first_attempt(self):
+        server = self._server([1.5])
+        http = transport.HTTPTransport(latency=LatencyTracker(min_timeout=5))
+        self._warm(http, server)
+
+        start = time.monotonic()
+        statuses = http.probe_many([server.url + '/slow'], timeout=5)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(statuses, {server.url + '/slow': 200})
+        self.assertEqual((http.hedged, http.hedge_wins), (1, 1))
+        self.assertEqual(server.requests.count(('HEAD', '/slow')), 2)
+
+    def test_no_hedge_without_history_or_when_disabled(self):
+        server = self._server([0.3, 0.3])
+        http = transport.HTTPTransport(latency=LatencyTracker(min_timeout=5))
+        http.probe_many([server.url + '/slow'], timeout=5)
+
+        unhedged = transport.HTTPTransport(latency=LatencyTracker(min_timeout=5), hedge_probes=False)
+        self._warm(unhedged, server)
+        unhedged.probe_many([server.url + '/slow2'], timeout=5)
+        self.assertEqual(http.hedged + unhedged.hedged, 0)
+
+    def test_deadline_caps_total_audit_time(self):
+        links = ''.join(f'<a href="/slow{i}">p</a>' for i in range(10))
+        server = self._server([0.3] * 10)
+        server.routes['/'] = (200, HTML_HEADERS, f'<html><body>{links}</body></html>'.encode())
+
+        analyzer = SEOAnalyzer(transport=transport.HTTPTransport(latency=LatencyTracker(), hedge_probes=False))
+        analyzer.max_audit_time = 1
+        start = time.monotonic()
+        result = analyzer.analyze(server.url + '/', names=['broken_links'])
+
+        self.assertLess(time.monotonic() - start, 1.6)
+        self.assertIn('not checked (audit time limit reached', result['checks']['broken_links']['details'])
+
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        with self.assertRaises(requests.exceptions.Timeout):
+            deadline.clamp(5)
+
+
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.breakers = CircuitBreakers(failure_threshold=2, cooldown=0.2, negative_ttl=0.1, metrics=self.metrics)
+        self.metrics.register_collector(self.breakers.collect)
+        self.http = transport.HTTPTransport(latency=LatencyTracker(), breakers=self.breakers)
+
+    def _state(self, server):
+        return self.breakers.snapshot()['hosts'][server.url[len('http://'):]]['state']
+
+    def _fetch(self, url):
+        try:
+            return self.http.fetch(url, 5, 10 ** 6).status_code
+        except requests.exceptions.HTTPError as e:
+            return e.response.status_code
+
+    def test_server_errors_open_circuit_until_trial_succeeds(self):
+        server = StubHTTPServer({'/': (503, {}, b'down')})
+        self.addCleanup(server.stop)
+
+        self.assertEqual(self._fetch(server.url + '/'), 503)
+        self._fetch(server.url + '/')
+        with self.assertRaisesMessage(HostUnavailableError, 'after 2 consecutive failures'):
+            self._fetch(server.url + '/')
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(self._state(server), 'open')
+
+        # A failed trial re-opens with a longer cool-down
+        time.sleep(0.25)
+        self._fetch(server.url + '/')
+        time.sleep(0.25)
+        with self.assertRaises(HostUnavailableError):
+            self._fetch(server.url + '/')
+
+        server.routes['/'] = (200, {}, b'up')
+        time.sleep(0.2)
+        self.assertEqual(self._fetch(server.url + '/'), 200)
+        self.assertEqual(self._state(server), 'closed')
+
+        samples = self.metrics.snapshot()
+        transitions = {s['labels']['to']: s['value'] for s in samples['seo_audit_circuit_transitions_total']}
+        self.assertEqual(transitions, {'open': 2, 'half_open': 2, 'closed': 1})
+        self.assertIn('seo_audit_circuit_state{host=', self.metrics.render_text())
+
+    def test_stopped_server_fails_fast(self):
+        server = StubHTTPServer({'/': (200, HTML_HEADERS, b'<html></html>')})
+        server.stop()
+        analyzer = SEOAnalyzer(transport=self.http)
+
+        with self.assertRaisesMessage(Exception, 'Connection error'):
+            analyzer.analyze(server.url + '/')
+        with self.assertRaisesMessage(Exception, 'is unreachable (connection failed)'):
+            analyzer.analyze(server.url + '/')
+
+        time.sleep(0.15)
+        with self.assertRaisesMessage(Exception, 'Connection error'):
+            analyzer.analyze(server.url + '/')
+        with self.assertRaisesMessage(Exception, 'unavailable after 2 consecutive failures'):
+            analyzer.analyze(server.url + '/')
+        self.assertEqual(self._state(server), 'open')
+
+        rejections = {s['labels']['reason']: s['value']
+                      for s in self.metrics.snapshot()['seo_audit_circuit_rejections_total']}
+        self.assertEqual(rejections, {'negative_cache': 1, 'open': 1})
+
+    def test_broken_links_do_not_open_the_circuit(self):
+        links = [f'/broken-{i}' for i in range(6)]
+        page = '<html><body>' + ''.join(f'<a href="{link}">x</a>' for link in links) + '</body></html>'
+        routes = {link: (500, {}, b'error') for link in links}
+        routes['/'] = (200, HTML_HEADERS, page.encode('utf-8'))
+        routes['/robots.txt'] = (500, {}, b'error')
+        server = StubHTTPServer(routes)
+        self.addCleanup(server.stop)
+        analyzer = SEOAnalyzer(transport=self.http)
+
+        for _ in range(2):
+            result = analyzer.analyze(server.url + '/', names=['broken_links', 'xml_sitemap'])
+            self.assertEqual(result['checks']['broken_links']['details'], '6 broken internal links found')
+        self.assertTrue(self.breakers.available(server.url + '/'))
+        self.assertEqual(self.breakers.snapshot()['hosts'], {})
+
+    def test_probes_to_unavailable_host_are_unchecked_not_broken(self):
+        server = StubHTTPServer({'/': (200, HTML_HEADERS, b'<html></html>')})
+        server.stop()
+        statuses = self.http.probe_many([server.url + '/a', server.url + '/b'], timeout=5)
+        self.assertEqual(statuses, {})
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get('/api/metrics').json()['status'], 'success')
+        response = self.client.get('/api/metrics', {'format': 'prometheus'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4')
+
+
+@unittest.skipUnless(transport.httpx and transport.h2, 'httpx[http2] not installed')
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class HTTP2TransportTests(SimpleTestCase):
+    body = b'<html><body>' + b'<p>multiplexed</p>' * 200 + b'</body></html>'
+
+    def test_probes_share_one_connection(self):
+        server = StubH2Server(self.body)
+        # Hedged probes would add streams of their own
+        client = transport.HTTP2Transport(prior_knowledge=True, hedge_probes=False)
+        try:
+            urls = [f"{server.url}/page-{i}" for i in range(15)]
+            statuses = client.probe_many(urls, timeout=5)
+            probe_connections = server.connections
+            response = client.fetch(server.url + '/', timeout=5, max_size=10 ** 6)
+        finally:
+            client.close()
+            server.stop()
+
+        self.assertEqual(set(statuses.values()), {200})
+        self.assertEqual(probe_connections, 1)
+        self.assertEqual(server.streams, 16)
+        self.assertEqual(response.transfer['protocol'], 'HTTP/2')
+        self.assertEqual(response.content, self.body)
+        self.assertLess(response.transfer['wire_bytes'], response.transfer['decoded_bytes'])
+
+    def test_breakers_are_forwarded(self):
+        breakers = CircuitBreakers()
+        client = transport.HTTP2Transport(hedge_probes=False, breakers=breakers)
+        self.addCleanup(client.close)
+        self.assertIs(client.breakers, breakers)
+
+    def test_falls_back_to_http1(self):
+        server = StubHTTPServer({'/': (200, HTML_HEADERS, self.body)})
+        client = transport.HTTP2Transport()
+        try:
+            response = client.fetch(server.url + '/', timeout=5, max_size=10 ** 6)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.fetch(server.url + '/missing', timeout=5, max_size=10 ** 6)
+        finally:
+            client.close()
+            server.stop()
+
+        self.assertEqual(response.transfer['protocol'], 'HTTP/1.1')
+        self.assertEqual(response.content, self.body)
+
+    def test_analyzer_uses_transport_for_link_probes(self):
+        links = ''.join(f'<a href="/p{i}">p</a>' for i in range(5))
+        server = StubH2Server(f'<html><body>{links}</body></html>'.encode())
+        analyzer = SEOAnalyzer(transport=transport.HTTP2Transport(prior_knowledge=True))
+        try:
+            result = analyzer.analyze(server.url + '/', names=['broken_links'])
+        finally:
+            analyzer.transport.close()
+            server.stop()
+
+        self.assertEqual(result['checks']['broken_links']['status'], 'passed')
+        self.assertEqual(result['transfer']['protocol'], 'HTTP/2')
+        # One connection for the page fetch, one shared by all five probes
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(server.streams, 6)
+
+
+class SyntheticSiteTests(SimpleTestCase):
+    def test_pages_follow_config(self):
+        config = SiteConfig(pages=5, page_size=8000, link_count=7)
+        with SyntheticSite(config) as site:
+            response = requests.get(site.page_url(3), timeout=5)
+            sitemap = requests.get(site.url + '/sitemap.xml', timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(len(response.content), 8000)
+        self.assertEqual(response.text.count('<a href="/page/'), 7)
+        self.assertEqual(sitemap.text.count('<loc>'), 5)
+
+    def test_error_rate_and_latency(self):
+        config = SiteConfig(pages=1, error_rate=1.0, latency=0.05)
+        with SyntheticSite(config) as site:
+            start = time.perf_counter()
+            response = requests.get(site.page_url(0), timeout=5)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_report_percentiles(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+        report = build_report([(0.1, 'ok'), (0.3, 'ok'), (0.0, 'http_500')], elapsed=2.0, memory_samples=[2 ** 20])
+        self.assertEqual(report['throughput'], 1.0)
+        self.assertEqual(report['errors'], {'http_500': 1})
+        self.assertEqual(report['latency']['p99'], 0.3)
+        self.assertEqual(report['server_memory']['peak_mb'], 1.0)
+
+
+@override_settings(SEO_AUDIT_ALLOW_PRIVATE_TARGETS=True, SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None,
+                   SEO_AUDIT_PROCESS_POOL=None)
+class LoadDriverTests(LiveServerTestCase):
+    def test_closed_loop_against_live_app(self):
+        with SyntheticSite(SiteConfig(pages=3, link_count=3)) as site:
+            driver = LoadDriver(self.live_server_url, [site.page_url(n) for n in range(3)])
+            elapsed = driver.run_closed(concurrency=2, total=4)
+
+        report = build_report(driver.results, elapsed)
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['error_rate'], 0)
+
+    @override_settings(SEO_AUDIT_TRUST_CLIENT_HEADERS=True)
+    def test_each_user_is_its_own_tenant(self):
+        tenants = []
+
+        @contextmanager
+        def audit_slot(priority, tenant):
+            tenants.append(tenant)
+            yield
+
+        with SyntheticSite(SiteConfig(pages=2, link_count=2)) as site, \
+                mock.patch('seo_audit.views.audit_slot', audit_slot):
+            driver = LoadDriver(self.live_server_url, [site.page_url(0)])
+            driver.run_closed(concurrency=2, total=4)
+
+        self.assertEqual(len(tenants), 4)
+        self.assertLessEqual(set(tenants), {'loadtest-user0', 'loadtest-user1'})
+
+    def test_async_stream_endpoint(self):
+        with SyntheticSite(SiteConfig(pages=2, link_count=2)) as site:
+            driver = LoadDriver(self.live_server_url, [site.page_url(n) for n in range(2)],
+                                endpoint='api/audit/stream/async')
+            driver.run_closed(concurrency=1, total=2)
+
+        self.assertEqual([outcome for _, outcome in driver.results], ['ok', 'ok'])
+
+    def test_jobs_are_timed_until_finished(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=job_queue.Worker(poll_interval=0.05).run, args=(stop,))
+        worker.start()
+        try:
+            with SyntheticSite(SiteConfig(pages=2, link_count=2)) as site:
+                driver = LoadDriver(self.live_server_url, [site.page_url(0)], endpoint='api/audit/jobs',
+                                    poll_interval=0.05)
+                driver.run_closed(concurrency=1, total=2)
+        finally:
+            stop.set()
+            worker.join()
+
+        self.assertEqual([outcome for _, outcome in driver.results], ['ok', 'ok'])
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(), 2)
+
+
+class PageMetricsStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = PageMetricsStore(self.tmp.name)
+
+    def _fill(self, count):
+        self.store.append_many([
+            (f"https://{'a' if n % 2 else 'b'}.example/{n}", {'word_count': n, 'load_time': n / 100}, None)
+            for n in range(count)
+        ])
+
+    def test_grows_past_initial_capacity_and_is_shared_across_instances(self):
+        self._fill(5000)
+        other = PageMetricsStore(self.tmp.name)
+
+        self.assertEqual(len(other), 5000)
+        self.assertEqual(other.summary('word_count')['max'], 4999)
+        self.assertEqual(other.url(4321), 'https://a.example/4321')
+
+    def test_latest_audit_per_url_only(self):
+        self.store.append('https://a.example/x', {'word_count': 10})
+        self.store.append('https://a.example/x', {'word_count': 30})
+        self.store.append('https://a.example/y', {'word_count': 20})
+
+        self.assertEqual(sorted(self.store.values('word_count').tolist()), [20, 30])
+        self.assertEqual(len(self.store.values('word_count', latest=False)), 3)
+
+    def test_aggregates(self):
+        self._fill(1000)
+
+        self.assertEqual(self.store.percentiles('word_count', [50])['50'], 499.5)
+        self.assertEqual(sum(self.store.histogram('word_count', bins=10)['counts']), 1000)
+        outliers = self.store.threshold('word_count', minimum=5, limit=2)
+        self.assertEqual(outliers['count'], 5)
+        self.assertEqual(outliers['pages'][0]['value'], 0)
+
+        hosts = self.store.group_by_host('word_count', percentile=50)
+        self.assertEqual(hosts['a.example']['count'], 500)
+        self.assertEqual(hosts['a.example']['mean'], 500)
+        self.assertEqual(hosts['b.example']['p50'], 498)
+        self.assertEqual(self.store.summary('word_count', host='b.example')['min'], 0)
+
+    def test_threshold_ranks_by_distance_outside_both_bounds(self):
+        for n, words in enumerate([0, 95, 105, 120, 50]):
+            self.store.append(f'https://a.example/{n}', {'word_count': words})
+
+        outliers = self.store.threshold('word_count', minimum=100, maximum=110)
+        self.assertEqual([page['value'] for page in outliers['pages']], [0, 50, 120, 95])
+
+    def test_concurrent_appends_and_reads(self):
+        errors = []
+
+        def writer(offset):
+            for n in range(300):
+                self.store.append(f'https://a.example/{offset}-{n}', {'word_count': n})
+
+        def reader():
+            try:
+                for _ in range(300):
+                    self.store.summary('word_count')
+                    self.store.threshold('word_count', maximum=100, limit=5)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(3)] + [threading.Thread(target=reader)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.store), 900)
+
+    def test_api_endpoint(self):
+        self._fill(100)
+        with override_settings(SEO_AUDIT_METRICS_DIR=self.tmp.name):
+            response = self.client.get('/api/page-metrics', {'metric': 'word_count', 'op': 'percentiles', 'p': '50'})
+            self.assertEqual(response.json()['data'], {'50.0': 49.5})
+
+            response = self.client.get('/api/page-metrics', {'metric': 'nope'})
+            self.assertEqual(response.status_code, 400)
+
+            for params in ({'op': 'hosts', 'p': '150'}, {'op': 'hosts', 'p': '-5'}, {'op': 'percentiles', 'p': '50,101'},
+                           {'op': 'threshold', 'max': '10', 'limit': '-1'}, {'op': 'histogram', 'bins': '10000000'},
+                           {'op': 'histogram', 'bins': '0'}, {'op': 'hosts', 'p': 'nan'}):
+                with self.subTest(params=params):
+                    response = self.client.get('/api/page-metrics', dict(params, metric='word_count'))
+                    self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_arguments_are_rejected(self):
+        self._fill(10)
+        for call in (lambda: self.store.group_by_host('word_count', percentile=150),
+                     lambda: self.store.group_by_host('word_count', percentile=-1),
+                     lambda: self.store.threshold('word_count', maximum=1, limit=-1),
+                     lambda: self.store.histogram('word_count', bins=0)):
+            with self.assertRaises(ValueError):
+                call()
+
+
+class LinkGraphTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = LinkGraphRegistry(self.tmp.name)
+
+    def test_pagerank_matches_dense_power_iteration(self):
+        src = np.array([0, 0, 1, 2, 2, 3, 3, 3, 0], dtype=np.int32)
+        dst = np.array([1, 2, 2, 0, 0, 0, 1, 3, 1], dtype=np.int32)  # duplicate and self-link dropped
+        graph = LinkGraph(5, src, dst)
+
+        matrix = np.zeros((5, 5))
+        for s, d in {(0, 1), (0, 2), (1, 2), (2, 0), (3, 0), (3, 1)}:
+            matrix[d, s] = 1
+        out = matrix.sum(axis=0)
+        transition = np.where(out > 0, matrix / np.where(out > 0, out, 1), 1 / 5)
+        expected = np.full(5, 0.2)
+        for _ in range(200):
+            expected = 0.85 * transition @ expected + 0.15 / 5
+
+        self.assertEqual(graph.num_edges, 6)
+        np.testing.assert_allclose(graph.pagerank(), expected, atol=1e-6)
+        self.assertEqual(graph.click_depth(3).tolist(), [1, 1, 2, 0, -1])
+        self.assertEqual(graph.orphans(root=0).tolist(), [3, 4])
+        self.assertEqual(graph.dead_ends().tolist(), [4])
+
+    def test_site_graph_from_audited_pages(self):
+        site = 'https://example.com'
+        self.registry.record_page(f'{site}/', [f'{site}/a', f'{site}/b#top'])
+        self.registry.record_page(f'{site}/a', [f'{site}/b', f'{site}/'])
+        self.registry.record_page(f'{site}/b', [])
+        metrics = self.registry.record_page(f'{site}/lost', [f'{site}/a'])
+
+        self.assertTrue(metrics['is_orphan'])
+        self.assertEqual(metrics['click_depth'], -1)
+        b = self.registry.page_metrics(f'{site}/b')
+        self.assertEqual((b['click_depth'], b['incoming_links'], b['is_dead_end']), (1, 2, True))
+        self.assertEqual(b['site_pages'], 4)
+
+        # A re-audit replaces the page's links, so /b stops being a dead end
+        self.registry.record_page(f'{site}/b', [f'{site}/lost'])
+        self.assertFalse(self.registry.page_metrics(f'{site}/lost')['is_orphan'])
+        self.assertFalse(self.registry.page_metrics(f'{site}/b')['is_dead_end'])
+
+        report = LinkGraphRegistry(self.tmp.name).site_report(site)
+        self.assertEqual(report['pages'], 4)
+        self.assertEqual(report['depth_histogram'], [1, 2, 1])
+        self.assertIsNone(self.registry.site_report('https://other.example'))
+
+    def test_analyzer_attaches_link_metrics(self):
+        analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='text'))
+        analyzer.link_graph = self.registry
+        result = analyzer.analyze('https://example.com/')
+
+        self.assertEqual(result['link_graph']['outgoing_links'], 1)
+        self.assertEqual(result['link_graph']['click_depth'], 0)
+        self.assertEqual(self.registry.page_metrics('https://example.com/about')['click_depth'], 1)
+
+    def test_redirected_page_is_recorded_under_its_final_url(self):
+        analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='text'))
+        analyzer.link_graph = self.registry
+        fetch = analyzer._fetch_page
+
+        def redirected(url, parser=None):
+            response = fetch(url, parser)
+            response.url = 'https://www.example.com/'
+            return response
+
+        analyzer._fetch_page = redirected
+        result = analyzer.analyze('http://example.com/')
+
+        self.assertEqual(result['link_graph']['outgoing_links'], 1)
+        self.assertEqual(self.registry.page_metrics('https://www.example.com/about')['click_depth'], 1)
+        self.assertIsNone(self.registry.site_report('http://example.com/'))
+
+    def test_api_endpoint(self):
+        self.registry.record_page('https://example.com/', ['https://example.com/a'])
+        with override_settings(SEO_AUDIT_LINK_GRAPH_DIR=self.tmp.name):
+            response = self.client.get('/api/link-graph', {'site': 'example.com'})
+            self.assertEqual(response.json()['data']['top_pages'][0]['url'], 'https://example.com/a')
+
+            response = self.client.get('/api/link-graph', {'site': 'unknown.org'})
+            self.assertEqual(response.status_code, 404)
+
+
+TRICKY_PAGE = """<!DOCTYPE html><HTML><HEAD><TITLE>Caf\u00e9 &amp; cr\u00e8me \u2014 a title of some length</TITLE>
+<meta name="description" content="  Spaces &quot;quoted&quot; around  ">
+<meta name="Robots" content="noindex"><meta name="robots" content="NOINDEX, follow">
+<link rel="alternate canonical" href="https://example.com/x"><link rel="canonical" href="/second">
+<link type="application/xml" href="/feed.xml">
+<script type="application/ld+json">{"@type": "Thing", "text": "<h1>not a heading</h1>"}</script>
+<style>h1 { color: red }</style></HEAD>
+<body><!-- <h1>commented out</h1> --><h2>Starts at two</h2><H1>First <b>bold</b> heading&nbsp;text</H1>
+<h1>Second</h1><h4>Skips</h4><template><h3>in template</h3> hidden words</template>
+<p>Words split<span>across</span>tags, don't-stop 42 times_2 na\u00efve &#169; &unknown; end.</p>
+<img src="a.png"><img src="b.png" alt><img src="c.png" alt="  "><img src="d.png" alt="D">
+<a href="">empty</a><a>no href</a><a href="/sitemap-index.XML">map</a><a href="mailto:x@y.z">mail</a>
+<svg><title>svg title</title></svg><![CDATA[cdata words]]>
+</body></HTML>"""
+
+
+class PageFactsParityTests(SimpleTestCase):
+    """The streaming engine must produce the same facts and check results as the tree engine"""
+
+    def pages(self):
+        yield PAGE.format(title='Title', text='word ' * 50)
+        yield PAGE.format(title='A much better and longer title for this page', text='lorem ipsum ' * 400)
+        yield TRICKY_PAGE
+        yield '<html><head><title><!-- c -->Split title</title></head><body><h1>Unclosed'
+        yield '<html><body><p>No head at all</p></body></html>'
+        yield ''
+        for number in range(3):
+            yield render_page(SiteConfig(page_size=30 * 1024), number).decode('utf-8')
+
+    def test_facts_match_tree_engine(self):
+        for html in self.pages():
+            with self.subTest(html=html[:60]):
+                tree = PageFacts.from_soup(BeautifulSoup(html, 'html.parser'))
+                self.assertEqual(parse_facts(html).as_dict(), tree.as_dict())
+
+    def test_chunked_bytes_match_whole_document(self):
+        body = TRICKY_PAGE.encode('utf-8')
+        parser = FactParser(charset='utf-8')
+        for start in range(0, len(body), 7):  # splits tags, entities and multi-byte characters
+            parser.feed_bytes(body[start:start + 7])
+        self.assertEqual(parser.close().as_dict(), parse_facts(TRICKY_PAGE).as_dict())
+
+    def legacy_pages(self):
+        """(body, HTTP charset) pairs for pages not in UTF-8 or with a BOM"""
+        text = 'Café résumé – “naïve” façade ' * 20
+        meta = '<html><head><meta charset="windows-1252"><title>Café résumé</title></head><body><p>{}</p></body></html>'
+        http_equiv = ('<html><head><meta http-equiv="Content-Type" content="text/html; charset=iso-8859-15">'
+                      '<title>Café €</title></head><body><h1>€5</h1><p>{}</p></body></html>')
+        plain = '<html><head><title>Café résumé</title></head><body><p>{}</p></body></html>'
+        yield meta.format(text).encode('cp1252'), None
+        yield http_equiv.format('déjà vu ' * 20).encode('iso-8859-15'), None
+        yield plain.format(text).encode('cp1252'), 'windows-1252'
+        yield codecs.BOM_UTF8 + plain.format(text).encode('utf-8'), None
+        yield codecs.BOM_UTF16_LE + plain.format(text).encode('utf-16-le'), None
+        # Declaration past the first chunk the download hands over
+        yield meta.format(text).replace('<html>', '<html>' + ' ' * 3000).encode('cp1252'), None
+
+    def test_legacy_encodings_match_tree_engine(self):
+        for body, charset in self.legacy_pages():
+            with self.subTest(body=body[:40], charset=charset):
+                tree = PageFacts.from_soup(BeautifulSoup(body, 'html.parser', from_encoding=charset))
+                self.assertIn(tree.title, ('Café résumé', 'Café €'))
+                self.assertEqual(parse_facts(body, charset).as_dict(), tree.as_dict())
+
+                parser = FactParser(charset)
+                for start in range(0, len(body), 1000):
+                    parser.feed_bytes(body[start:start + 1000])
+                self.assertEqual(parser.close().as_dict(), tree.as_dict())
+
+    def test_undeclared_legacy_page_falls_back_to_windows_1252(self):
+        body = '<html><head><title>Café résumé</title></head></html>'.encode('cp1252')
+        self.assertEqual(parse_facts(body).title, 'Café résumé')
+        self.assertEqual(parse_facts('<title>Café</title>'.encode('utf-8')).title, 'Café')
+
+    def test_check_results_match(self):
+        analyzer = StaticPageAnalyzer('')
+        names = [name for name in SEOAnalyzer.CHECKS if name not in SEOAnalyzer.NETWORK_CHECKS]
+        for html in self.pages():
+            with self.subTest(html=html[:60]):
+                self.assertEqual(analyzer.run_checks(parse_facts(html), 'https://example.com/', names),
+                                 analyzer.run_checks(BeautifulSoup(html, 'html.parser'), 'https://example.com/', names))
+
+    @override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+    def test_streaming_engine_parses_during_download(self):
+        body = render_page(SiteConfig(page_size=200 * 1024), 1)
+        # Not plain 'text/html', so the stub sends it uncompressed in several chunks
+        server = StubHTTPServer({'/': (200, {'content-type': 'text/html; charset=utf-8'}, body)})
+        self.addCleanup(server.stop)
+
+        chunks = []
+        analyzer = SEOAnalyzer(engine='stream')
+        parser = FactParser()
+        feed_bytes = parser.feed_bytes
+        parser.feed_bytes = lambda chunk: chunks.append(len(chunk)) or feed_bytes(chunk)
+        response = analyzer._fetch_page(server.url + '/', parser)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(chunks), len(body))
+        self.assertEqual(parser.close().as_dict(),
+                         PageFacts.from_soup(BeautifulSoup(response.content, 'html.parser')).as_dict())
+
+        stream = SEOAnalyzer(engine='stream').analyze(server.url + '/', names=['title_tag', 'h1_tag'])
+        tree = SEOAnalyzer(engine='tree').analyze(server.url + '/', names=['title_tag', 'h1_tag'])
+        self.assertEqual(stream['checks'], tree['checks'])
+        self.assertEqual(stream['page_info']['word_count'], tree['page_info']['word_count'])
+
+
+class BusyPool:
+    def process_page(self, *args):
+        raise PoolBusyError("Server busy: all 2 page processing slots are in use")
+
+
+@override_settings(SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None)
+class ProcessPoolTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pool = ProcessPool(processes=2, max_tasks_per_child=3, max_pending=2, task_timeout=1,
+                               queue_timeout=0.2, metrics=MetricsRegistry()).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        super().tearDownClass()
+
+    def test_pooled_analysis_matches_in_process(self):
+        page = PAGE.format(title='A much better and longer title for this page', text='lorem ipsum ' * 400)
+        for engine in ('stream', 'tree'):
+            with self.subTest(engine=engine):
+                local = StaticPageAnalyzer(page)
+                local.engine = engine
+                pooled = StaticPageAnalyzer(page)
+                pooled.engine = engine
+                pooled.pool = self.pool
+
+                expected = local.analyze('https://example.com/')
+                result = pooled.analyze('https://example.com/')
+                self.assertEqual(result['checks'], expected['checks'])
+                self.assertEqual(result['page_info']['word_count'], expected['page_info']['word_count'])
+                self.assertEqual(pooled.network_calls, 2)
+
+                events = list(pooled.iter_analyze('https://example.com/'))
+                self.assertEqual(events[-1]['data']['checks'], expected['checks'])
+
+    def test_workers_parse_without_network_resources(self):
+        page = PAGE.format(title='Title', text='text')
+        with mock.patch('seo_audit.services.seo_analyzer.make_transport') as make, \
+                mock.patch('seo_audit.services.seo_analyzer.default_link_graph') as link_graph, \
+                mock.patch.dict('seo_audit.services.process_pool._analyzers', clear=True):
+            facts, checks = process_page(page.encode('utf-8'), 'https://example.com/', 'utf-8', 'stream',
+                                         ['title_tag', 'h1_tag'])
+            analyzer = process_pool._analyzers['stream']
+        make.assert_not_called()
+        link_graph.assert_not_called()
+        self.assertIsNone(analyzer.transport)
+        self.assertEqual(checks['title_tag'], StaticPageAnalyzer(page).run_check('title_tag', facts, 'https://example.com/'))
+
+    def test_backpressure_rejects_when_all_slots_are_taken(self):
+        threads = [threading.Thread(target=self.pool.submit, args=(time.sleep, 0.5)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        with self.assertRaises(PoolBusyError):
+            self.pool.submit(time.sleep, 0)
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNone(self.pool.submit(time.sleep, 0))
+        self.assertEqual(self.pool.pending(), 0)
+
+    def test_task_timeout_interrupts_the_worker(self):
+        start = time.monotonic()
+        with self.assertRaisesRegex(Exception, 'did not finish within 1s'):
+            self.pool.submit(time.sleep, 10)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(self.pool.retired, 0)
+        self.assertIsNone(self.pool.submit(time.sleep, 0))
+
+    def test_workers_are_recycled(self):
+        pids = {self.pool.submit(os.getpid) for _ in range(12)}
+        # 2 workers with 3 tasks each can't have served 12 tasks
+        self.assertGreater(len(pids), 2)
+
+    def test_audit_view_returns_503_when_busy(self):
+        def make_analyzer(pool=None):
+            analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='text'))
+            analyzer.pool = pool
+            return analyzer
+
+        with mock.patch('seo_audit.views.SEOAnalyzer', make_analyzer), \
+                mock.patch('seo_audit.views.default_pool', BusyPool):
+            response = self.client.post('/api/audit', json.dumps({'url': 'https://example.com/'}),
+                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+
+ARCHIVED_PAGE = PAGE.format(title='A much better and longer title for this page', text='lorem ipsum ' * 400).replace(
+    '<a href="/about">About</a>', '<a href="/about">About</a><a href="/missing">Missing</a>')
+
+
+@override_settings(SEO_AUDIT_LINK_GRAPH_DIR=None)
+class ResponseArchiveTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_identical_bodies_are_stored_once(self):
+        archive = ResponseArchive(self.tmp.name)
+        first = archive.record('page', 'https://example.com/', 200, {'content-type': 'text/html'}, b'<p>same</p>')
+        archive.record('page', 'https://example.com/copy', 200, {'content-type': 'text/html'}, b'<p>same</p>')
+        archive.record('probe', 'https://example.com/about', 404, {})
+        archive.record('page', 'https://example.com/', 200, {'content-type': 'text/html'}, b'<p>changed</p>')
+
+        self.assertEqual(first['type'], 'response')
+        # A second instance (another process) indexes what the first appended
+        reopened = ResponseArchive(self.tmp.name)
+        stats = reopened.stats()
+        self.assertEqual((stats['records'], stats['payloads'], stats['revisits']), (4, 2, 1))
+        self.assertEqual(reopened.lookup('https://example.com/copy').content, b'<p>same</p>')
+        self.assertEqual(reopened.lookup('https://example.com/').content, b'<p>changed</p>')
+        self.assertEqual(reopened.lookup('https://example.com/', as_of=first['date']).content, b'<p>same</p>')
+        self.assertIsNone(reopened.lookup('https://example.com/about').content)
+        self.assertIsNone(reopened.lookup('https://example.com/about', kinds=('page',)))
+        self.assertEqual(sorted(reopened.urls()), ['https://example.com/', 'https://example.com/copy'])
+
+        archive.record('page', 'https://example.com/new', 200, {}, b'new')
+        self.assertIn('https://example.com/new', reopened.urls())
+
+    def record_site(self):
+        server = StubHTTPServer({
+            '/': (200, {'content-type': 'text/html'}, ARCHIVED_PAGE.encode('utf-8')),
+            '/about': (200, {'content-type': 'text/html'}, b'about'),
+            '/robots.txt': (200, {'content-type': 'text/plain'}, b'User-agent: *\nSitemap: /sitemap.xml\n'),
+        })
+        archive = ResponseArchive(self.tmp.name)
+        try:
+            live = SEOAnalyzer(transport=transport.HTTPTransport(archive=archive, hedge_probes=False))
+            return server.url, live.analyze(server.url + '/')
+        finally:
+            server.stop()
+
+    def test_replay_matches_live_audit_without_network(self):
+        url, live = self.record_site()
+
+        replayed = SEOAnalyzer(transport=transport.ReplayTransport(ResponseArchive(self.tmp.name)))
+        result = replayed.analyze(url + '/')
+        self.assertEqual(result['checks'], live['checks'])
+        self.assertEqual(live['checks']['broken_links']['status'], 'failed')
+        self.assertEqual(live['checks']['xml_sitemap']['details'], 'XML sitemap referenced in robots.txt')
+        self.assertEqual(result['transfer']['protocol'], 'replay')
+
+        with self.assertRaisesRegex(Exception, 'not in the archive'):
+            replayed.analyze(url + '/never-fetched')
+
+    def test_replay_command(self):
+        url, live = self.record_site()
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('replay_archive', archive=self.tmp.name, processes=2, checks='title_tag,broken_links',
+                     stdout=out, stderr=err)
+
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['checks'], {name: live['checks'][name] for name in ('title_tag', 'broken_links')})
+        self.assertIn('Replayed 1 pages', err.getvalue())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SchedulerTests(SimpleTestCase):
+    def scheduler(self, **options):
+        self.clock = FakeClock()
+        return AuditScheduler(clock=self.clock, metrics=MetricsRegistry(), **options)
+
+    def test_interactive_overtakes_queued_bulk(self):
+        scheduler = self.scheduler(capacity=1)
+        running = scheduler.submit('bulk', 'crawler')
+        scheduler.dispatch()
+        bulk = scheduler.submit('bulk', 'crawler')
+        self.clock.now = 1
+        interactive = scheduler.submit('interactive', 'alice')
+
+        self.clock.now = 2
+        scheduler.finish(running)
+        self.assertEqual(scheduler.dispatch(), [interactive])
+        self.assertEqual(interactive.waited, 1)
+        self.assertIsNone(bulk.granted_at)
+
+    def test_aging_prevents_starvation(self):
+        scheduler = self.scheduler(capacity=1, aging=30)
+        running = scheduler.submit('interactive', 'alice')
+        scheduler.dispatch()
+        bulk = scheduler.submit('bulk', 'crawler')
+        self.clock.now = 61  # two classes up: level with interactive, and older
+        interactive = scheduler.submit('interactive', 'bob')
+
+        scheduler.finish(running)
+        self.assertEqual(scheduler.dispatch(), [bulk])
+        self.assertIsNone(interactive.granted_at)
+
+    def test_tenant_quota_and_weighted_share(self):
+        scheduler = self.scheduler(capacity=4, tenant_limit=2, tenant_weights={'big': 2})
+        for tenant in ('small', 'small', 'big'):
+            scheduler.submit('interactive', tenant)
+        scheduler.dispatch()
+
+        third_small = scheduler.submit('interactive', 'small')
+        big = scheduler.submit('interactive', 'big')
+        # small is at its quota; big runs 1 at weight 2, so it has room to grow
+        self.assertEqual(scheduler.dispatch(), [big])
+        self.assertIsNone(third_small.granted_at)
+
+        policy = SchedulingPolicy(tenant_weights={'big': 2})
+        ranked = policy.order([('bulk', 'small', 5, 'a'), ('bulk', 'big', 1, 'b')], {'small': 1, 'big': 1})
+        self.assertEqual([item for _, item in ranked], ['b', 'a'])
+
+    def test_class_limit_keeps_slots_for_interactive(self):
+        scheduler = self.scheduler(capacity=3, class_limits={'bulk': 2})
+        for _ in range(3):
+            scheduler.submit('bulk', 'crawler')
+        self.assertEqual(len(scheduler.dispatch()), 2)
+
+        interactive = scheduler.submit('interactive', 'alice')
+        self.assertEqual(scheduler.dispatch(), [interactive])
+        snapshot = scheduler.snapshot()
+        self.assertEqual((snapshot['bulk']['running'], snapshot['bulk']['waiting']), (2, 1))
+
+    def test_blocking_acquire_and_wait_metrics(self):
+        metrics = MetricsRegistry()
+        scheduler = AuditScheduler(capacity=1, metrics=metrics)
+        held = scheduler.acquire('bulk', 'crawler')
+        with self.assertRaises(QueueTimeoutError):
+            scheduler.acquire('interactive', 'alice', timeout=0.05)
+
+        threading.Timer(0.1, scheduler.release, args=(held,)).start()
+        with scheduler.slot('interactive', 'alice') as ticket:
+            self.assertGreater(ticket.waited, 0.05)
+
+        counts = {sample['labels']['priority']: sample['value']
+                  for sample in metrics.snapshot()['seo_audit_queue_wait_seconds_count']}
+        self.assertEqual(counts, {'bulk': 1, 'interactive': 1})
+        self.assertEqual(metrics.snapshot()['seo_audit_scheduler_rejected_total'][0]['value'], 1)
+
+
+class JobPriorityTests(TestCase):
+    def test_lease_order_follows_priority_and_tenant_quota(self):
+        bulk = job_queue.enqueue('sleep', {}, priority='bulk', tenant='crawler')
+        first = job_queue.enqueue('sleep', {}, tenant='alice')
+        second = job_queue.enqueue('sleep', {}, tenant='alice')
+
+        queue = job_queue.JobQueue(worker_id='w1', policy=SchedulingPolicy(tenant_limit=1))
+        leased = queue.lease()
+        self.assertIn(leased.id, (first.id, second.id))
+        # alice is at her quota, so her other job waits behind the bulk one
+        self.assertEqual(queue.lease().id, bulk.id)
+        self.assertIsNone(queue.lease())
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED, tenant='alice').count(), 1)
+
+    @override_settings(SEO_AUDIT_TRUST_CLIENT_HEADERS=True)
+    def test_api_accepts_priority_and_tenant(self):
+        response = self.client.post('/api/audit/jobs', json.dumps({'url': 'https://example.com/', 'priority': 'bulk'}),
+                                    content_type='application/json', HTTP_X_TENANT='crawler')
+        job = Job.objects.get(id=response.json()['job_id'])
+        self.assertEqual((job.priority, job.tenant), ('bulk', 'crawler'))
+
+        response = self.client.post('/api/audit', json.dumps({'url': 'https://example.com/', 'priority': 'urgent'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_untrusted_clients_cannot_pick_tenant_or_jump_the_queue(self):
+        response = self.client.post('/api/audit/jobs', json.dumps({'url': 'https://example.com/'}),
+                                    content_type='application/json', HTTP_X_TENANT='someone-else')
+        job = Job.objects.get(id=response.json()['job_id'])
+        self.assertEqual((job.priority, job.tenant), ('scheduled', '127.0.0.1'))
+
+        response = self.client.post('/api/audit/jobs',
+                                    json.dumps({'url': 'https://example.com/', 'priority': 'interactive'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class MonitorScheduleTests(SimpleTestCase):
+    def test_phase_is_stable_and_spread(self):
+        self.assertEqual(phase('https://example.com/', 3600), phase('https://example.com/', 3600))
+        minutes = [int(phase(f'https://site{i}.example/', 3600) // 60) for i in range(6000)]
+        counts = [minutes.count(minute) for minute in range(60)]
+        # ~100 sites per minute; nowhere near all of them at the top of the hour
+        self.assertLess(max(counts), 150)
+        self.assertGreater(min(counts), 50)
+
+    def test_next_slot_stays_on_the_sites_grid(self):
+        after = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        first = next_slot('https://example.com/', 3600, after)
+        second = next_slot('https://example.com/', 3600, first)
+
+        self.assertGreater(first, after)
+        self.assertLessEqual(first - after, timedelta(hours=1))
+        self.assertEqual(second - first, timedelta(hours=1))
+        self.assertAlmostEqual(first.timestamp() % 3600, phase('https://example.com/', 3600), places=3)
+
+    def test_zero_interval_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'interval must be at least 1 second'):
+            next_slot('https://example.com/', 0, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def test_jitter_is_bounded_by_the_interval(self):
+        after = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        base = next_slot('https://example.com/', 300, after)
+        for _ in range(50):
+            jittered = next_slot('https://example.com/', 300, after, jitter=600)
+            self.assertTrue(base <= jittered <= base + timedelta(seconds=30))
+
+    def test_host_delay_spaces_audits_of_one_host(self):
+        monitor = Monitor(host_delay=10, metrics=MetricsRegistry())
+        self.assertEqual(monitor._host_wait('a.example'), 0)
+        self.assertAlmostEqual(monitor._host_wait('a.example'), 10, places=1)
+        self.assertAlmostEqual(monitor._host_wait('a.example'), 20, places=1)
+        self.assertEqual(monitor._host_wait('b.example'), 0)
+
+
+@override_settings(SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None)
+class MonitorTests(TestCase):
+    def setUp(self):
+        self.analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='word ' * 50))
+        self.metrics = MetricsRegistry()
+        self.monitor = Monitor(host_delay=0, jitter=0, analyzer_factory=lambda: self.analyzer, metrics=self.metrics)
+        self.site = Website.objects.create(name='Example', url='https://example.com/', interval=3600)
+        self.now = datetime.now(timezone.utc)
+
+    def test_new_sites_get_their_slot_and_are_claimed_once_due(self):
+        self.monitor.schedule_new(self.now)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.next_run_at, next_slot(self.site.url, 3600, self.now))
+        self.assertEqual(self.monitor.claim_due(self.now, 10), [])
+
+        due = self.site.next_run_at
+        claimed = self.monitor.claim_due(due, 10)
+        self.assertEqual([(site.id, planned) for site, planned in claimed], [(self.site.id, due)])
+        # Another monitor that read the old next_run_at loses the race
+        other = Monitor(metrics=MetricsRegistry())
+        self.assertEqual(other.claim_due(due, 10), [])
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.next_run_at, due + timedelta(hours=1))
+
+    def test_unchanged_content_skips_the_checks(self):
+        planned = self.now - timedelta(seconds=2)
+        self.assertEqual(self.monitor.audit_site(self.site, planned), 'changed')
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.last_status, 'changed')
+        self.assertEqual(self.analyzer.network_calls, 2)
+        self.assertEqual(self.site.last_result['url'], 'https://example.com/')
+
+        self.analyzer.html = self.analyzer.html.replace('<p>', '\n  <p>')
+        self.assertEqual(self.monitor.audit_site(self.site, planned), 'unchanged')
+        self.assertEqual(self.analyzer.network_calls, 2)
+
+        self.analyzer.html = PAGE.format(title='A new title', text='word ' * 50)
+        self.assertEqual(self.monitor.audit_site(self.site, planned), 'changed')
+        # The head changed, so the sitemap check re-ran; the links didn't
+        self.assertEqual(self.analyzer.network_calls, 3)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.last_result['incremental']['reused'][-1], 'broken_links')
+
+        snapshot = self.metrics.snapshot()
+        runs = {sample['labels']['outcome']: sample['value'] for sample in snapshot['seo_audit_monitor_runs_total']}
+        self.assertEqual(runs, {'changed': 2, 'unchanged': 1})
+        self.assertEqual(snapshot['seo_audit_monitor_drift_seconds_count'][0]['value'], 3)
+        self.assertGreaterEqual(self.monitor.snapshot()['drift']['p50'], 2)
+
+    def test_stale_network_checks_are_refreshed(self):
+        self.monitor.audit_site(self.site, self.now)
+        self.site.refresh_from_db()
+        self.site.last_result['checked_at']['broken_links'] -= 7 * 60 * 60
+
+        self.assertEqual(self.monitor.audit_site(self.site, self.now), 'unchanged')
+        self.assertEqual(self.analyzer.network_calls, 3)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.last_result['incremental']['recomputed'], ['broken_links'])
+
+        self.analyzer._check_broken_links = lambda page, base_url: {'status': 'failed', 'details': '1 broken link'}
+        monitor = Monitor(host_delay=0, jitter=0, analyzer_factory=lambda: self.analyzer, freshness={'broken_links': 0},
+                          metrics=MetricsRegistry())
+        self.assertEqual(monitor.audit_site(self.site, self.now), 'changed')
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.last_result['checks']['broken_links']['status'], 'failed')
+
+    def test_sites_with_a_bad_interval_are_skipped(self):
+        broken = Website.objects.create(name='Broken', url='https://broken.example/', interval=0)
+        with self.assertRaises(ValidationError):
+            broken.full_clean()
+
+        with self.assertLogs(level='ERROR') as logs:
+            self.monitor.schedule_new(self.now)
+            self.monitor.schedule_new(self.now)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Not monitoring https://broken.example/', logs.output[0])
+        broken.refresh_from_db()
+        self.assertIsNone(broken.next_run_at)
+
+        # A scheduled site whose interval is later set to 0 is dropped from the due set, not crashed on
+        Website.objects.filter(id=broken.id).update(next_run_at=self.now, interval=0)
+        self.monitor.schedule_new(self.now)
+        self.site.refresh_from_db()
+        claimed = self.monitor.claim_due(self.site.next_run_at, 10)
+        self.assertEqual([site.id for site, _ in claimed], [self.site.id])
+        broken.refresh_from_db()
+        self.assertIsNone(broken.next_run_at)
+
+    def test_failure_keeps_the_previous_hash(self):
+        self.monitor.audit_site(self.site, self.now)
+        self.site.refresh_from_db()
+        content_hash = self.site.content_hash
+
+        self.analyzer._fetch_page = mock.Mock(side_effect=Exception("Connection error"))
+        self.assertEqual(self.monitor.audit_site(self.site, self.now), 'failed')
+        self.site.refresh_from_db()
+        self.assertEqual((self.site.last_status, self.site.last_error), ('failed', 'Analysis failed: Connection error'))
+        self.assertEqual(self.site.content_hash, content_hash)
+
+
+@override_settings(SEO_AUDIT_METRICS_DIR=None, SEO_AUDIT_LINK_GRAPH_DIR=None)
+class MonitorRunTests(TransactionTestCase):
+    def test_run_once_audits_due_sites(self):
+        analyzer = StaticPageAnalyzer(PAGE.format(title='Title', text='word ' * 50))
+        past = datetime.now(timezone.utc) - timedelta(minutes=5)
+        for i in range(3):
+            Website.objects.create(name=f'Site {i}', url=f'https://site{i}.example/', interval=3600, next_run_at=past)
+        Website.objects.create(name='Paused', url='https://paused.example/', enabled=False, next_run_at=past)
+
+        monitor = Monitor(concurrency=2, host_delay=0, analyzer_factory=lambda: analyzer, metrics=MetricsRegistry())
+        monitor.run(poll_interval=0.05, once=True)
+
+        statuses = dict(Website.objects.values_list('url', 'last_status'))
+        self.assertEqual(statuses, {'https://site0.example/': 'changed', 'https://site1.example/': 'changed',
+                                    'https://site2.example/': 'changed', 'https://paused.example/': ''})
+        self.assertFalse(Website.objects.filter(enabled=True, next_run_at__lte=datetime.now(timezone.utc)).exists())
+
+
+SYNTHETIC_HOSTS = 6
+SYNTHETIC_PAGES = 40
+
+
+def synthetic_links(url):
+    """hrefs on a page of a small multi-host site graph"""
+    host = int(url.split('//h')[1].split('.')[0])
+    page = int(url.rsplit('-', 1)[1])
+    return [
+        f'/page-{(page + 1) % SYNTHETIC_PAGES}',
+        f'page-{(page * 7 + 3) % SYNTHETIC_PAGES}#section',
+        f'https://h{(host + 1) % SYNTHETIC_HOSTS}.example/page-{page}',
+        '#top',
+        'mailto:someone@example.com',
+    ]
+
+
+def _frontier_node(root, nodes, node, pending, results):
+    """One stand-in crawler node; `pending` counts queued plus in-transit URLs across all nodes"""
+    frontier = ShardedFrontier(root, nodes, node, capacity=1000)
+    fetched = []
+    while pending.value > 0:
+        taken, queued = frontier.drain_inbox()
+        if taken:
+            with pending.get_lock():
+                pending.value += queued - taken
+
+        rows = frontier.pop(5)
+        if not rows:
+            time.sleep(0.01)
+            continue
+        for _, url, depth in rows:
+            fetched.append(url)
+            queued, sent = frontier.add(extract_links(url, synthetic_links(url)), depth + 1)
+            with pending.get_lock():
+                pending.value += queued + sent
+        frontier.done(row[0] for row in rows)
+        with pending.get_lock():
+            pending.value -= len(rows)
+    frontier.close()
+    results.put((node, fetched))
+
+
+class URLFrontierTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(os.path.join(self.tmp.name, 'seen.bloom'), capacity=5000, error_rate=0.01)
+        added = [f'https://example.com/{i}' for i in range(5000)]
+        bloom.add_many(added)
+        self.assertTrue(bloom.contains_many(added).all())
+
+        false_positives = bloom.contains_many([f'https://example.org/{i}' for i in range(5000)]).mean()
+        self.assertLess(false_positives, 0.03)
+        self.assertLess(bloom.nbytes, 7000)
+
+    def test_add_deduplicates_exactly(self):
+        frontier = URLFrontier(self.tmp.name, capacity=100)
+        self.assertEqual(frontier.add(['https://Example.com/a', 'https://example.com/a#x', 'https://example.com']), 2)
+        self.assertEqual(frontier.add(['https://example.com/a', 'https://example.com/b']), 1)
+        # Even with a filter that reports everything as seen, only the table decides
+        frontier.bloom.bits[:] = 0xff
+        self.assertEqual(frontier.add(['https://example.com/a', 'https://example.com/c']), 1)
+        self.assertEqual(frontier.stats()['seen'], 4)
+        frontier.close()
+
+    def test_pop_is_breadth_first_and_leases_expire(self):
+        frontier = URLFrontier(self.tmp.name, capacity=100, lease_timeout=60)
+        frontier.add(['https://example.com/deep'], depth=2)
+        frontier.add(['https://example.com/a', 'https://example.com/b'], depth=0)
+
+        rows = frontier.pop(2)
+        self.assertEqual([url for _, url, _ in rows], ['https://example.com/a', 'https://example.com/b'])
+        frontier.done([rows[0][0]])
+        self.assertEqual([url for _, url, _ in frontier.pop(5)], ['https://example.com/deep'])
+        self.assertEqual(frontier.pop(5), [])
+
+        with mock.patch('seo_audit.services.frontier.time.time', return_value=time.time() + 120):
+            self.assertEqual(sorted(url for _, url, _ in frontier.pop(5)),
+                             ['https://example.com/b', 'https://example.com/deep'])
+        self.assertEqual(frontier.stats()['done'], 1)
+        frontier.close()
+
+    def test_reopen_rebuilds_a_missing_filter(self):
+        frontier = URLFrontier(self.tmp.name, capacity=100)
+        frontier.add([f'https://example.com/{i}' for i in range(50)])
+        frontier.close()
+        os.remove(os.path.join(self.tmp.name, 'seen.bloom'))
+
+        frontier = URLFrontier(self.tmp.name, capacity=100)
+        self.assertTrue(frontier.bloom.contains_many([f'https://example.com/{i}' for i in range(50)]).all())
+        self.assertEqual(frontier.add(['https://example.com/7', 'https://example.com/50']), 1)
+        frontier.close()
+
+    def test_host_ring_is_balanced_and_stable(self):
+        hosts = [f'site{i}.example' for i in range(3000)]
+        ring = HostRing(['n0', 'n1', 'n2'])
+        owners = {host: ring.node_for(host) for host in hosts}
+        for node in ring.nodes:
+            self.assertGreater(list(owners.values()).count(node), 800)
+        self.assertEqual(ring.node_for('https://SITE7.example/some/page'), owners['site7.example'])
+
+        # A fourth node takes about a quarter of the hosts, all from the others
+        grown = HostRing(['n0', 'n1', 'n2', 'n3'])
+        moved = [host for host in hosts if grown.node_for(host) != owners[host]]
+        self.assertTrue(all(grown.node_for(host) == 'n3' for host in moved))
+        self.assertLess(len(moved), 1100)
+
+    def test_extract_links_resolves_and_filters(self):
+        links = extract_links('https://example.com/dir/page', ['../a', ' b?x=1 ', '#top', ' tel:123', 'ftp://x/', '',
+                                                              'https://other.example/'])
+        self.assertEqual(links, ['https://example.com/a', 'https://example.com/dir/b?x=1', 'https://other.example/'])
+        self.assertEqual(extract_links('https://example.com/dir/page', ['../a', 'https://other.example/'], same_host=True),
+                         ['https://example.com/a'])
+
+    def test_failed_drain_leaves_the_inbox_intact(self):
+        frontier = URLFrontier(os.path.join(self.tmp.name, 'node'), capacity=1000)
+        self.addCleanup(frontier.close)
+        frontier.inbox.put([('https://a.example/1', 0), ('https://a.example/2', 1)])
+
+        with mock.patch.object(frontier, '_insert', side_effect=sqlite3.OperationalError('disk I/O error')):
+            with self.assertRaises(sqlite3.OperationalError):
+                frontier.drain_inbox()
+        self.assertEqual(frontier.stats()['inbox'], 2)
+        self.assertFalse(frontier.bloom.contains_many(['https://a.example/1']).any())
+
+        self.assertEqual(frontier.drain_inbox(), (2, 2))
+        self.assertEqual(frontier.stats()['inbox'], 0)
+        self.assertTrue(frontier.bloom.contains_many(['https://a.example/1', 'https://a.example/2']).all())
+
+    def test_worker_processes_fetch_each_host_on_one_node(self):
+        nodes = ['node0', 'node1', 'node2']
+        ring = HostRing(nodes)
+        seed = 'https://h0.example/page-0'
+        Inbox(os.path.join(self.tmp.name, ring.node_for(seed))).put([(seed, 0)])
+
+        pending = multiprocessing.Value('i', 1)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_frontier_node, args=(self.tmp.name, nodes, node, pending, results))
+                     for node in nodes]
+        for process in processes:
+            process.start()
+        fetched = dict(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join(10)
+
+        every = [url for urls in fetched.values() for url in urls]
+        self.assertEqual(len(every), SYNTHETIC_HOSTS * SYNTHETIC_PAGES)
+        self.assertEqual(len(set(every)), len(every))
+        for node, urls in fetched.items():
+            self.assertTrue(all(ring.node_for(url) == node for url in urls))
+        self.assertGreater(min(len(urls) for urls in fetched.values()), 0)
@@ -5,4 +5,11 @@ from . import views
 urlpatterns = [
     path("",views.index, name="index"),
     path("api/audit",views.audit, name="audit"),
+    path("api/audit/stream",views.audit_stream, name="audit_stream"),
+    path("api/audit/stream/async",views.audit_stream_async, name="audit_stream_async"),
+    path("api/audit/jobs",views.audit_jobs, name="audit_jobs"),
+    path("api/audit/jobs/<int:job_id>",views.audit_job, name="audit_job"),
+    path("api/page-metrics",views.page_metrics, name="page_metrics"),
+    path("api/link-graph",views.link_graph, name="link_graph"),
+    path("api/metrics",views.metrics, name="metrics"),
 ]
\ No newline at end of file
@@ -1,6 +1,19 @@
 import json
-from django.http import HttpResponse, JsonResponse
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template import loader
+from django.views.decorators.csrf import ensure_csrf_cookie
+from .models import Job
+from .services import job_queue
+from .services.circuit_breaker import default_breakers
+from .services.link_graph import default_link_graph
+from .services.metrics import registry
+from .services.metrics_store import MAX_BINS, MAX_LIMIT, METRIC_COLUMNS, check_range, get_store, record_result
+from .services.process_pool import PoolBusyError, default_pool
+from .services.scheduler import PRIORITIES, QueueTimeoutError, audit_slot
 from .services.seo_analyzer import SEOAnalyzer
 import logging
 from .utils.helper import validate_url, is_safe_url
@@ -8,54 +21,353 @@ from .utils.helper import validate_url, is_safe_url
 
 # Create your views here.
 
+@ensure_csrf_cookie
 def index(request):
     template = loader.get_template('index.html')
     return HttpResponse(template.render({}, request))
 
 
-def audit(request):
+def _parse_audit_request(request):
+    """Return (url, None) for a valid audit request, or (None, error_response)"""
     try:
-        # Parse request data
         data = json.loads(request.body)
-        url = data.get('url', '').strip()
+    except json.JSONDecodeError:
+        return None, JsonResponse({
+            'status': 'error',
+            'message': 'Invalid JSON data'
+        }, status=400)
 
-        if not url:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'URL is required'
-            }, status=400)
+    url = data.get('url', '').strip()
 
-        # Validate URL
-        if not validate_url(url):
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Invalid URL format'
-            }, status=400)
+    if not url:
+        return None, JsonResponse({
+            'status': 'error',
+            'message': 'URL is required'
+        }, status=400)
 
-        # Security check
-        if not is_safe_url(url):
-            return JsonResponse({
-                'status': 'error',
-                'message': 'URL not allowed'
-            }, status=400)
+    # Validate URL
+    if not validate_url(url):
+        return None, JsonResponse({
+            'status': 'error',
+            'message': 'Invalid URL format'
+        }, status=400)
+
+    # Security check
+    if not is_safe_url(url) and not settings.SEO_AUDIT_ALLOW_PRIVATE_TARGETS:
+        return None, JsonResponse({
+            'status': 'error',
+            'message': 'URL not allowed'
+        }, status=400)
+
+    return url, None
+
+
+def _scheduling(request, default='interactive', user=None):
+    """Return (priority, tenant, None) for an audit request, or (None, None, error_response).
+
+    The priority class comes from the JSON body; a class above the endpoint's
+    default needs a staff user or a trusted front end. The tenant is the
+    authenticated user, else the client address; the X-Tenant header is only
+    honoured with SEO_AUDIT_TRUST_CLIENT_HEADERS, when a proxy in front of
+    the app sets it. Async views pass the `user` they resolved with
+    request.auser(), since request.user can't be loaded from them.
+    """
+    priority = json.loads(request.body).get('priority', default)
+    if priority not in PRIORITIES:
+        return None, None, JsonResponse({
+            'status': 'error',
+            'message': f"Invalid priority (expected one of: {', '.join(PRIORITIES)})"
+        }, status=400)
+
+    trusted = getattr(settings, 'SEO_AUDIT_TRUST_CLIENT_HEADERS', False)
+    if user is None:
+        user = getattr(request, 'user', None)
+    if PRIORITIES.index(priority) < PRIORITIES.index(default) and not (trusted or (user and user.is_staff)):
+        return None, None, JsonResponse({
+            'status': 'error',
+            'message': f"Priority '{priority}' is not allowed for this request"
+        }, status=403)
+
+    if trusted and request.headers.get('X-Tenant'):
+        tenant = request.headers['X-Tenant']
+    elif user and user.is_authenticated:
+        tenant = f"user:{user.get_username()}"
+    else:
+        tenant = request.META.get('REMOTE_ADDR', '')
+    return priority, tenant[:100], None
+
+
+def audit(request):
+    try:
+        url, error_response = _parse_audit_request(request)
+        if error_response:
+            return error_response
+        priority, tenant, error_response = _scheduling(request)
+        if error_response:
+            return error_response
 
         # Perform SEO analysis
-        analyzer = SEOAnalyzer()
-        analysis_result = analyzer.analyze(url)
+        with audit_slot(priority, tenant), SEOAnalyzer(pool=default_pool()) as analyzer:
+            analysis_result = analyzer.analyze(url)
+        record_result(analysis_result)
 
         return JsonResponse({
             'status': 'success',
             'data': analysis_result
         })
 
-    except json.JSONDecodeError:
-        return JsonResponse({
+    except (PoolBusyError, QueueTimeoutError) as e:
+        logging.error(f"SEO analysis rejected: {str(e)}")
+        response = JsonResponse({
             'status': 'error',
-            'message': 'Invalid JSON data'
-        }, status=400)
+            'message': str(e)
+        }, status=503)
+        response['Retry-After'] = '5'
+        return response
     except Exception as e:
         logging.error(f"SEO analysis error: {str(e)}")
         return JsonResponse({
             'status': 'error',
             'message': 'Analysis failed. Please try again.'+e.__str__()
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+def _wants_sse(request):
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def _format_event(event, sse):
+    """Serialize one analyzer event as an SSE frame or an NDJSON line"""
+    payload = json.dumps(event, cls=DjangoJSONEncoder)
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _error_event(e):
+    logging.error(f"SEO analysis error: {str(e)}")
+    return {'event': 'error', 'message': 'Analysis failed. Please try again.' + e.__str__()}
+
+
+def _streaming_response(request, events):
+    sse = _wants_sse(request)
+    response = StreamingHttpResponse(
+        events,
+        content_type='text/event-stream' if sse else 'application/x-ndjson'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+
+def _scheduled_events(url, priority, tenant):
+    """iter_analyze events, holding a scheduler slot from the first event to the last"""
+    with audit_slot(priority, tenant), SEOAnalyzer(pool=default_pool()) as analyzer:
+        yield from analyzer.iter_analyze(url)
+
+
+def audit_stream(request):
+    """Stream check results as they complete (NDJSON, or SSE when requested)"""
+    url, error_response = _parse_audit_request(request)
+    if error_response:
+        return error_response
+    priority, tenant, error_response = _scheduling(request)
+    if error_response:
+        return error_response
+
+    sse = _wants_sse(request)
+
+    def events():
+        try:
+            for event in _scheduled_events(url, priority, tenant):
+                if event['event'] == 'summary':
+                    record_result(event['data'])
+                yield _format_event(event, sse)
+        except Exception as e:
+            yield _format_event(_error_event(e), sse)
+
+    return _streaming_response(request, events())
+
+
+async def audit_stream_async(request):
+    """ASGI variant of audit_stream that doesn't pin a worker thread while waiting"""
+    url, error_response = _parse_audit_request(request)
+    if error_response:
+        return error_response
+    user = await request.auser() if hasattr(request, 'auser') else None
+    priority, tenant, error_response = _scheduling(request, user=user)
+    if error_response:
+        return error_response
+
+    sse = _wants_sse(request)
+
+    async def events():
+        iterator = _scheduled_events(url, priority, tenant)
+        next_event = sync_to_async(next, thread_sensitive=False)
+        try:
+            while True:
+                event = await next_event(iterator, None)
+                if event is None:
+                    break
+                if event['event'] == 'summary':
+                    await sync_to_async(record_result, thread_sensitive=False)(event['data'])
+                yield _format_event(event, sse)
+        except Exception as e:
+            yield _format_event(_error_event(e), sse)
+
+    return _streaming_response(request, events())
+
+
+def audit_jobs(request):
+    """Enqueue a background audit and return its job ID immediately"""
+    if request.method != 'POST':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Method not allowed'
+        }, status=405)
+
+    url, error_response = _parse_audit_request(request)
+    if error_response:
+        return error_response
+    priority, tenant, error_response = _scheduling(request, default='scheduled')
+    if error_response:
+        return error_response
+
+    job = job_queue.enqueue('audit', {'url': url}, priority=priority, tenant=tenant)
+
+    return JsonResponse({
+        'status': 'queued',
+        'job_id': job.id
+    }, status=202)
+
+
+def audit_job(request, job_id):
+    """Poll the status (and result, once finished) of a background audit"""
+    try:
+        job = Job.objects.get(id=job_id, kind='audit')
+    except Job.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Job not found'
+        }, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'data': job.to_dict()
+    })
+
+
+def page_metrics(request):
+    """Aggregate page_info metrics across stored audits for dashboards"""
+    store = get_store()
+    if store is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Page metrics store is disabled'
+        }, status=404)
+
+    metric = request.GET.get('metric', 'word_count')
+    op = request.GET.get('op', 'summary')
+    if metric not in METRIC_COLUMNS:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Unknown metric. Choose one of: {", ".join(METRIC_COLUMNS)}'
+        }, status=400)
+
+    try:
+        filters = {
+            'host': request.GET.get('host') or None,
+            'since': float(request.GET['since']) if request.GET.get('since') else None,
+            'latest': request.GET.get('all') != '1',
+        }
+
+        start = time.perf_counter()
+        if op == 'summary':
+            data = store.summary(metric, **filters)
+        elif op == 'percentiles':
+            percentiles = [check_range(float(p), 'p', 0, 100) for p in request.GET.get('p', '50,90,95,99').split(',')]
+            data = store.percentiles(metric, percentiles, **filters)
+        elif op == 'histogram':
+            bins = check_range(int(request.GET.get('bins', 20)), 'bins', 1, MAX_BINS)
+            data = store.histogram(metric, bins=bins, **filters)
+        elif op == 'threshold':
+            minimum = float(request.GET['min']) if request.GET.get('min') else None
+            maximum = float(request.GET['max']) if request.GET.get('max') else None
+            limit = check_range(int(request.GET.get('limit', 100)), 'limit', 0, MAX_LIMIT)
+            data = store.threshold(metric, minimum, maximum, limit=limit, **filters)
+        elif op == 'hosts':
+            percentile = check_range(float(request.GET.get('p', 95)), 'p', 0, 100)
+            data = store.group_by_host(metric, percentile=percentile, **filters)
+        else:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Unknown op. Choose one of: summary, percentiles, histogram, threshold, hosts'
+            }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Invalid numeric parameter: {str(e)}'
+        }, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'metric': metric,
+        'op': op,
+        'data': data,
+        'query_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+
+def link_graph(request):
+    """Site-wide internal link report: top PageRank pages, orphans, dead ends, click depth"""
+    registry = default_link_graph()
+    if registry is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Link graph is disabled'
+        }, status=404)
+
+    site = request.GET.get('site', '').strip()
+    if site and not site.startswith(('http://', 'https://')):
+        site = 'https://' + site
+    if not site or not validate_url(site):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Please provide a valid site URL'
+        }, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid numeric parameter'
+        }, status=400)
+
+    start = time.perf_counter()
+    data = registry.site_report(site, limit=limit)
+    if data is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'No audited pages for this site'
+        }, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'site': site,
+        'data': data,
+        'query_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+
+def metrics(request):
+    """Process metrics: circuit breaker states, host latency, counters"""
+    default_breakers()  # registers its collector on first use
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(registry.render_text(), content_type='text/plain; version=0.0.4')
+
+    return JsonResponse({
+        'status': 'success',
+        'metrics': registry.snapshot(),
+        'circuit_breakers': default_breakers().snapshot()
+    })